@@ -0,0 +1,734 @@
+"""
+asyncio counterpart of dregcli Client, Repository and Image
+(requires Python 3.7+ and aiohttp)
+
+same registry workflows (auth, pagination, cache) than the blocking API,
+through coroutines: manifests fetches of many tags multiplexed on one event
+loop, bounded by a semaphore and a connection pool that can be shared
+"""
+import asyncio
+import collections
+import json
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from dregcli.dregcli import (
+    CircuitOpenError,
+    DeadlineExceeded,
+    DRegCliException,
+    Client,
+    Repository,
+    Image,
+    Tools,
+)
+
+
+class AsyncResponse(object):
+    """
+    response of AsyncClient._request, body already read
+    (the connection is released to the pool)
+    """
+    def __init__(self, status_code, headers, content):
+        super().__init__()
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+
+class AsyncMemo(object):
+    """
+    asyncio memoization: value computed once per key,
+    concurrent getters of a key being computed await its value
+    """
+    def __init__(self):
+        super().__init__()
+        self._futures = {}
+
+    async def get(self, key, func):
+        """
+        :param func: coroutine function without argument computing key value
+        """
+        future = self._futures.get(key)
+        if future is None:
+            future = self._futures[key] = asyncio.ensure_future(func())
+        try:
+            return await asyncio.shield(future)
+        except BaseException:
+            if future.done() and self._futures.get(key) is future:
+                # failed: next getters compute it again (see Memo)
+                self._futures.pop(key)
+            raise
+
+
+class AsyncClient(Client):
+    class Meta(Client.Meta):
+        concurrency = 10
+
+    def __init__(
+        self,
+        url,
+        verbose=False,
+        concurrency=0,
+        session=None,
+        semaphore=None,
+        cache=None,
+        retry=None,
+        max_rps=0.,
+        max_delete_rps=0.,
+        connect_timeout=0.,
+        read_timeout=0.,
+        deadline=0.,
+        hedge=False,
+        breaker=None,
+        read_urls=(),
+        snapshot=False
+    ):
+        """
+        :param concurrency: max requests in flight
+            (and connections of own session)
+        :param session: aiohttp.ClientSession to share connection pool with
+            other clients, not closed by client
+        :param semaphore: asyncio.Semaphore to share requests limit with
+            other clients
+        other params: see Client
+        """
+        if aiohttp is None:
+            raise DRegCliException("AsyncClient: aiohttp is required")
+
+        assert isinstance(concurrency, int)
+        assert session is None or isinstance(session, aiohttp.ClientSession)
+        assert semaphore is None or \
+            isinstance(semaphore, asyncio.Semaphore)
+
+        self.concurrency = concurrency or self.Meta.concurrency
+        self._shared_session = session
+        super().__init__(
+            url,
+            verbose=verbose,
+            pool_maxsize=self.concurrency,
+            cache=cache,
+            retry=retry,
+            max_rps=max_rps,
+            max_delete_rps=max_delete_rps,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            deadline=deadline,
+            hedge=hedge,
+            breaker=breaker,
+            read_urls=read_urls,
+            snapshot=snapshot
+        )
+
+        self.semaphore = semaphore or asyncio.Semaphore(self.concurrency)
+        # config blob digest: image date (see AsyncImage.get_date)
+        self._configs_dates = AsyncMemo()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def __enter__(self):
+        raise TypeError("use 'async with' with AsyncClient")
+
+    def _new_session(self):
+        # own session created in event loop at first request
+        return self._shared_session
+
+    def _get_session(self):
+        """
+        :rtype aiohttp.ClientSession
+        """
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_maxsize)
+            )
+        return self.session
+
+    async def close(self):
+        """release own session connections (shared one left open)"""
+        if self.session is not None and self.session is not \
+                self._shared_session:
+            await self.session.close()
+            self.session = None
+
+    async def repositories(self, page_size=0, prefix=''):
+        """
+        :return list of AsyncRepository
+        """
+        return [
+            repo async for repo in self.iter_repositories(
+                page_size=page_size, prefix=prefix)
+        ]
+
+    async def iter_repositories(self, page_size=0, prefix=''):
+        """
+        see Client.iter_repositories
+        :return async generator of AsyncRepository
+        """
+        async for repo in self._paginate(self._catalog_url(), 'repositories',
+                                         page_size=page_size, prefix=prefix):
+            yield AsyncRepository(self, repo)
+
+    async def _paginate(self, url, key, page_size=0, prefix=''):
+        """see Client._paginate"""
+        url = self._first_page_url(url, page_size=page_size, prefix=prefix)
+        while url:
+            response = await self._request(url, headers={})
+            items, last_page = self._page_items(response, key, prefix)
+            for item in items:
+                yield item
+            url = not last_page and self._next_page_url(response) or ''
+
+    async def map(self, func, items, concurrency=0):
+        """
+        apply coroutine function func to each item
+        (requests bounded by client semaphore)
+        :param items: iterable or async iterable: items of an async
+            generator are scheduled while it is iterated
+        :param concurrency: max func running at once, 0 for no limit
+            other than client semaphore
+        :return list of func results, in items order
+        :raise DeadlineExceeded: see Client.map
+        """
+        assert isinstance(concurrency, int)
+
+        limit = concurrency > 0 and asyncio.Semaphore(concurrency) or None
+
+        async def run(item):
+            if limit is None:
+                return await func(item)
+            async with limit:
+                return await func(item)
+
+        tasks = []
+        try:
+            if hasattr(items, '__aiter__'):
+                async for item in items:
+                    tasks.append(asyncio.ensure_future(run(item)))
+            else:
+                tasks = [asyncio.ensure_future(run(item)) for item in items]
+            return list(await asyncio.gather(*tasks))
+        except BaseException as e:
+            # first error: cancel pending items
+            for task in tasks:
+                task.cancel()
+            if isinstance(e, DeadlineExceeded):
+                e.partial = [
+                    task.result() for task in tasks
+                    if task.done() and not task.cancelled() and
+                    not task.exception()
+                ]
+            raise
+
+    async def _request(
+        self,
+        url,
+        headers={},
+        verb=False,
+        expected_code=200,
+        hedge=False
+    ):
+        """
+        see Client._request
+        :rtype AsyncResponse
+        """
+        assert isinstance(url, str)
+        assert not headers or isinstance(headers, dict)
+        assert not verb or isinstance(verb, str)
+
+        if hedge and self.hedge and verb in (False, 'GET'):
+            return await self._hedged_request(url, headers, expected_code)
+
+        verb = verb or 'GET'
+
+        # transient failures retried, see RetryPolicy
+        attempt = 0
+        while True:
+            self._check_deadline()
+            try:
+                response = await self._send(url, headers, verb)
+            except CircuitOpenError as e:
+                if not self.retry.should_retry(verb, attempt):
+                    raise
+                # host cooldown waited out while retry budget left
+                await asyncio.sleep(
+                    self._circuit_delay(e.host, verb, attempt)
+                )
+                attempt += 1
+                continue
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self._check_deadline()  # timeout bounded by deadline
+                if not self.retry.should_retry(verb, attempt):
+                    self.stats.incr('errors')
+                    raise
+                response = None
+            else:
+                if not self.retry.should_retry(verb, attempt,
+                                               response.status_code):
+                    break
+            await asyncio.sleep(
+                self._retry_delay(url, verb, attempt, response)
+            )
+            attempt += 1
+
+        return self._check_response(response, verb, attempt, expected_code)
+
+    async def _hedged_request(self, url, headers, expected_code):
+        """
+        see Client._hedged_request, losing request cancelled
+        :rtype AsyncResponse
+        """
+        def request():
+            return asyncio.ensure_future(self._request(
+                url,
+                headers=headers,
+                expected_code=expected_code
+            ))
+
+        delay = self._hedge_delay()
+        if not delay:
+            return await self._request(url, headers=headers,
+                                       expected_code=expected_code)
+
+        primary = request()
+        hedge = None
+        try:
+            done, _ = await asyncio.wait([primary], timeout=delay)
+            if done or not self._take_hedge():
+                return await primary
+
+            self.display_debug('hedge', url)
+            hedge = request()
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self.stats.incr(
+                            task is hedge and 'hedges_won' or 'hedges_wasted'
+                        )
+                        return task.result()
+                    error = error or task.exception()  # other one chance
+            raise error
+        finally:
+            for task in (primary, hedge):
+                if task and not task.done():
+                    task.cancel()
+
+    async def _send(self, url, headers, verb):
+        """
+        see Client._send
+        :rtype AsyncResponse
+        """
+        self.display(verb, url)
+
+        # auth: attach up front a cached token of a previous challenge
+        token = await self._auth_cached_token(url, verb)
+        response = await self._rate_fetch(
+            verb,
+            url,
+            token and self._auth_decorate_headers(headers, token) or headers
+        )
+        self.display_debug('response headers', response.headers)
+
+        if self.auth and response.status_code == 401:
+            # auth: challenge flow (see Client._send)
+            token = await self._auth_get_token(response, url=url, verb=verb,
+                                               rejected=token)
+            response = await self._rate_fetch(
+                verb,
+                url,
+                self._auth_decorate_headers(headers, token)
+            )
+            self.display_debug('response headers 2', response.headers)
+
+        return response
+
+    async def _rate_fetch(self, verb, url, headers):
+        """registry request at rate limit (see Client._dispatch)"""
+        wait = self._rate_wait(verb)
+        if wait:
+            self._check_deadline(wait)
+            await asyncio.sleep(wait)
+        url = self._route(url, verb)
+        if self.router:
+            self.router.start(url)
+        probe = self._check_breaker(url)
+
+        start = time.monotonic()
+        try:
+            self.stats.incr('requests')
+            response = await self._fetch(verb, url, headers)
+        except asyncio.CancelledError:
+            # cancelled (map first error, hedge losing request): no outcome
+            self._cancel_request(url, probe=probe)
+            raise
+        except BaseException:
+            self._track_response(url, verb, time.monotonic() - start,
+                                 0, probe=probe)  # connection error
+            raise
+        self._track_response(url, verb, time.monotonic() - start,
+                             response.status_code, probe=probe)
+        return response
+
+    async def _fetch(self, verb, url, headers, auth=None):
+        """
+        send request, read response body
+        :rtype AsyncResponse
+        """
+        session = self._get_session()
+        async with self.semaphore:
+            connect_timeout, read_timeout = self._request_timeout()
+            async with session.request(
+                verb,
+                url,
+                headers=headers,
+                auth=auth,
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=connect_timeout,
+                    sock_read=read_timeout
+                )
+            ) as response:
+                content = await response.read()
+                return AsyncResponse(
+                    response.status,
+                    response.headers,
+                    content
+                )
+
+    async def _auth_cached_token(self, url, verb):
+        """see Client._auth_cached_token"""
+        key, token = self._auth_cached_token_entry(url, verb)
+        if not key or token:
+            return token
+
+        try:
+            return await self._auth_fetch_token(*key)
+        except DRegCliException:
+            # refresh failed: fallback on challenge flow
+            with self._auth_lock:
+                self._auth_tokens.pop(key, None)
+            return ''
+
+    async def _auth_get_token(self, response, url='', verb='GET',
+                              rejected=None):
+        """see Client._auth_get_token"""
+        if not self.auth:
+            return False
+
+        key = self._auth_challenge(response, url=url, verb=verb)
+        if rejected is not None:
+            token = self._auth_valid_token(key, rejected=rejected)
+            if token:
+                return token
+        return await self._auth_fetch_token(*key)
+
+    async def _auth_fetch_token(self, realm, service, scope):
+        """see Client._auth_fetch_token"""
+        get_token_url = self._auth_token_url(realm, service, scope)
+        self.display_debug('get token', get_token_url)
+        get_token_response = await self._fetch(
+            'GET',
+            get_token_url,
+            {},
+            auth=aiohttp.BasicAuth(
+                self.auth['login'],
+                self.auth['password']
+            )
+        )
+        self.display_debug('get token response headers',
+                           get_token_response.headers)
+
+        return self._auth_store_token(
+            (realm, service, scope),
+            get_token_response
+        )
+
+
+class AsyncRepository(Repository):
+    async def tags(self, page_size=0, prefix=''):
+        """
+        :return list of tags (each tag an str)
+        """
+        return [
+            tag async for tag in self.iter_tags(
+                page_size=page_size, prefix=prefix)
+        ]
+
+    def iter_tags(self, page_size=0, prefix=''):
+        """
+        see Repository.iter_tags
+        :return async generator of tags (each tag an str)
+        """
+        return self.client._paginate(self._tags_list_url(), 'tags',
+                                     page_size=page_size, prefix=prefix)
+
+    async def get_tags_by_date(self, concurrency=0, page_size=0, prefix=''):
+        """
+        see Repository.get_tags_by_date
+        :param concurrency: max images fetched at once, 0 for client
+            concurrency
+        """
+        snapshot = self._load_snapshot()
+
+        async def get_tag_data(tag):
+            entry = snapshot and snapshot.get(tag)
+            digest = entry and await self.tag_digest(tag) or ''
+            if entry and digest == entry['digest']:
+                # tag not moved since snapshot: no manifest, no blob
+                image = self._new_snapshot_image(tag, entry)
+            else:
+                image = await (digest and self.image(tag, digest=digest) or
+                               self.image(tag))
+            return {
+                'tag': tag,
+                'image': image,
+                'date': await image.get_date(),
+            }
+
+        try:
+            images = await self.client.map(
+                get_tag_data,
+                self.iter_tags(page_size=page_size, prefix=prefix),
+                concurrency=concurrency
+            )
+        except DeadlineExceeded as e:
+            e.partial = self._sort_tags_by_date(e.partial or [])
+            raise
+        self._save_snapshot(snapshot, images, prefix=prefix)
+
+        return self._sort_tags_by_date(images)
+
+    async def get_tags_by_date_by_digest(self, concurrency=0, page_size=0,
+                                         prefix=''):
+        """see Repository.get_tags_by_date_by_digest"""
+        snapshot = self._load_snapshot()
+        snapshot_digests = self._snapshot_digests(snapshot)
+
+        async def get_tag_digest(tag):
+            return tag, await self.tag_digest(tag)
+
+        async def get_dated_image(digest):
+            if digest in snapshot_digests:
+                return self._new_snapshot_image(digest,
+                                                snapshot_digests[digest])
+            image = await self.image(digest)
+            await image.get_date()
+            return image
+
+        try:
+            tags_digests = await self.client.map(
+                get_tag_digest,
+                self.iter_tags(page_size=page_size, prefix=prefix),
+                concurrency=concurrency
+            )
+        except DeadlineExceeded as e:
+            e.partial = []
+            raise
+        digests = list(dict.fromkeys(digest for _, digest in tags_digests))
+        try:
+            images = dict(zip(digests, await self.client.map(
+                get_dated_image,
+                digests,
+                concurrency=concurrency
+            )))
+        except DeadlineExceeded as e:
+            images = {image.digest: image for image in e.partial or []}
+            e.partial = self._sort_tags_by_date(
+                self._digests_tags_data(tags_digests, images)
+            )
+            raise
+
+        tags_data = self._digests_tags_data(tags_digests, images)
+        self._save_snapshot(snapshot, tags_data, prefix=prefix)
+        return self._sort_tags_by_date(tags_data)
+
+    async def group_tags(self, concurrency=0, page_size=0, prefix='',
+                         by_digest=False):
+        """see Repository.group_tags"""
+        get_tags_by_date = by_digest and self.get_tags_by_date_by_digest \
+            or self.get_tags_by_date
+        try:
+            tags_by_date = await get_tags_by_date(
+                concurrency=concurrency,
+                page_size=page_size,
+                prefix=prefix
+            )
+        except DeadlineExceeded as e:
+            e.partial = self._group_tags_data(e.partial or [],
+                                              by_digest=by_digest)
+            raise
+        return self._group_tags_data(tags_by_date, by_digest=by_digest)
+
+    async def tag_digest(self, tag):
+        """see Repository.tag_digest"""
+        assert isinstance(tag, str)
+
+        response = await self.client._request(
+            self._manifest_url(tag),
+            headers=self.Meta.manifests_headers,
+            verb='HEAD'
+        )
+        return self._response_digest(response)
+
+    async def supports_tag_delete(self):
+        """see Repository.supports_tag_delete"""
+        if self.client.tag_delete is None:
+            try:
+                await self.client._request(
+                    self._tag_delete_probe_url(),
+                    headers=self.Meta.manifests_headers,
+                    verb='DELETE',
+                    expected_code=404
+                )
+                self.client.tag_delete = True
+            except DRegCliException as e:
+                if not self._is_tag_delete_unsupported(e):
+                    raise e
+                self.client.tag_delete = False
+        return self.client.tag_delete
+
+    async def delete_tags(self, tags, concurrency=0, tag_delete=False):
+        """see Repository.delete_tags"""
+        async def get_tag_image(tag):
+            digest = '' if tag_delete else await self.tag_digest(tag)
+            return self._new_image(tag, digest, {})
+
+        images = await self.client.map(get_tag_image, tags,
+                                       concurrency=concurrency)
+        return await self.delete_images(images, concurrency=concurrency,
+                                        tag_delete=tag_delete)
+
+    async def delete_images(self, images, concurrency=0, tag_delete=False,
+                            journal=None, missing_ok=False):
+        """see Repository.delete_images"""
+        references = collections.OrderedDict()
+        for image in images:
+            references.setdefault(
+                self.delete_reference(image, tag_delete),
+                image
+            )
+
+        async def delete(image):
+            try:
+                if tag_delete:
+                    await image.delete_tag()
+                else:
+                    await image.delete()
+                error = ''
+            except (DRegCliException, aiohttp.ClientConnectionError,
+                    asyncio.TimeoutError) as e:  # deadline exceeded included
+                error = str(e) or e.__class__.__name__
+                if missing_ok and getattr(e, 'status_code', 0) == 404:
+                    error = ''
+                elif isinstance(e, DeadlineExceeded):
+                    return error  # not sent: not journaled
+            if journal:
+                journal.done(self.delete_reference(image, tag_delete), error)
+            return error
+
+        return collections.OrderedDict(zip(
+            references.keys(),
+            await self.client.map(delete, list(references.values()),
+                                  concurrency=concurrency)
+        ))
+
+    async def image(self, tag, digest=''):
+        """
+        see Repository.image
+        :rtype AsyncImage
+        """
+        assert isinstance(tag, str)
+        assert isinstance(digest, str)
+
+        if self.client.cache:
+            known_digest = self._known_digest(tag)
+            digest = digest or (known_digest if Tools.is_digest(tag) else
+                                known_digest and await self.tag_digest(tag))
+            image = self._cached_image(tag, digest, known_digest)
+            if image:
+                return image
+
+        response = await self.client._request(
+            self._manifest_url(tag),
+            headers=self.Meta.manifests_headers,
+            hedge=True
+        )
+        return self._response_image(tag, response)
+
+    def _new_image(self, tag, digest, data):
+        return AsyncImage(
+            self.client,
+            self.name,
+            tag,
+            digest=digest,
+            data=data
+        )
+
+
+class AsyncImage(Image):
+    async def get_date(self):
+        """
+        see Image.get_date
+        (memoized)
+        """
+        if self.date:
+            return self.date
+
+        if self.schema_version == 1:
+            self.date = self._get_history_date()
+
+        elif self.schema_version > 1:
+            self.date = await self.client._configs_dates.get(
+                self.config_digest,
+                self._get_config_date
+            )
+
+        return self.date
+
+    async def _get_config_date(self):
+        data = self._cached_config_blob()
+        if data is None:
+            response = await self.client._request(
+                self._config_blob_url(),
+                headers=Repository.Meta.manifests_headers,
+                hedge=True
+            )
+            data = response.json()
+            self._cache_config_blob(data)
+        return self._parse_config_date(data)
+
+    async def delete(self):
+        """see Image.delete"""
+        await self.client._request(
+            self._manifest_url(),
+            headers=Repository.Meta.manifests_headers,
+            verb='DELETE',
+            expected_code=202
+        )
+
+    async def delete_tag(self):
+        """see Image.delete_tag"""
+        await self.client._request(
+            self._manifest_url(self.tag),
+            headers=Repository.Meta.manifests_headers,
+            verb='DELETE',
+            expected_code=202
+        )
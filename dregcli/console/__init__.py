@@ -8,6 +8,14 @@ from .tags import TagsCommandHandler
 from .image import ImageCommandHandler
 from .images import ImagesCommandHandler
 from .delete import DeleteCommandHandler
+from .apply import ApplyCommandHandler
+from dregcli.dregcli import (
+    CircuitBreaker,
+    Client,
+    DiskCache,
+    RetryPolicy,
+    Tools,
+)
 
 
 def main():
@@ -24,6 +32,123 @@ def main():
         action='store_true',
         help='debug mode (response headers, ...)'
     )
+    parser.add_argument(
+        '--cache-dir',
+        default=DiskCache.default_path(),
+        help='persistent cache directory of manifests and config blobs '
+             '(by digest). default: {path}'.format(
+                 path=DiskCache.default_path()
+             )
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='do not use persistent cache'
+    )
+    parser.add_argument(
+        '--snapshot',
+        action='store_true',
+        help='keep a snapshot per repository (tag, digest, layers, date) '
+             'in persistent cache: next scans only fetch manifests and '
+             'config blobs of new or moved tags'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=RetryPolicy.Meta.retries,
+        help='max retries of a request failing with a transient error '
+             '(status {codes}, connection error), with exponential backoff '
+             'or server Retry-After delay. 0 to disable. default: '
+             '{retries}'.format(
+                 codes=', '.join(map(str, RetryPolicy.Meta.status_codes)),
+                 retries=RetryPolicy.Meta.retries
+             )
+    )
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=Client.Meta.connect_timeout,
+        help='request connect timeout in seconds. default: {timeout}'.format(
+            timeout=Client.Meta.connect_timeout
+        )
+    )
+    parser.add_argument(
+        '--read-timeout',
+        type=float,
+        default=Client.Meta.read_timeout,
+        help='request read timeout in seconds. default: {timeout}'.format(
+            timeout=Client.Meta.read_timeout
+        )
+    )
+    parser.add_argument(
+        '--deadline',
+        type=Tools.parse_duration,
+        default=0.,
+        help='time budget of the command (seconds, or with s/m/h/d unit): '
+             'outstanding requests are cancelled when reached, with partial '
+             'result. example: --deadline=15m'
+    )
+    parser.add_argument(
+        '--http2',
+        action='store_true',
+        help='HTTP/2 transport (requires httpx[http2]): concurrent requests '
+             'multiplexed on a connection per registry host'
+    )
+    parser.add_argument(
+        '--read-url',
+        action='append',
+        default=[],
+        dest='read_urls',
+        help='read replica (or pull-through mirror) url, repeatable: reads '
+             'balanced across replicas by health and latency, deletes sent '
+             'to command url. example: --read-url=http://mirror1:5001'
+    )
+    parser.add_argument(
+        '--breaker-threshold',
+        type=float,
+        default=CircuitBreaker.Meta.threshold,
+        help='error rate (0-1, 5xx and connection errors) of last requests '
+             'to a registry host opening its circuit: requests wait (or '
+             'fail fast without retries left), a probe is sent after '
+             '{cooldown:.0f}s. 0 to disable. default: {threshold}'.format(
+                 cooldown=CircuitBreaker.Meta.cooldown,
+                 threshold=CircuitBreaker.Meta.threshold
+             )
+    )
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        help='hedge manifests and config blobs GETs: duplicate a request '
+             'slower than p95 latency, first response wins (duplicates '
+             'capped to {ratio:.0%} of requests)'.format(
+                 ratio=Client.Meta.hedge_ratio
+             )
+    )
+    parser.add_argument(
+        '--max-rps',
+        type=float,
+        default=0.,
+        help='max read requests per second (all workers). example: '
+             '--max-rps=20'
+    )
+    parser.add_argument(
+        '--max-delete-rps',
+        type=float,
+        default=0.,
+        help='max DELETE requests per second (all workers), '
+             'budget separate from --max-rps. example: --max-delete-rps=2'
+    )
+    parser.add_argument(
+        '--adaptive',
+        action='store_true',
+        help='adapt requests in flight to registry latency and throttling '
+             '(AIMD), up to --concurrency workers'
+    )
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='print requests stats (json) on stderr at command end'
+    )
     subparsers = parser.add_subparsers(help='sub-commands')
 
     RepositoriesCommandHandler.set_parser(subparsers)
@@ -31,8 +156,12 @@ def main():
     ImagesCommandHandler.set_parser(subparsers)
     ImageCommandHandler.set_parser(subparsers)
     DeleteCommandHandler.set_parser(subparsers)
+    ApplyCommandHandler.set_parser(subparsers)
 
     arguments = parser.parse_args()
+    if arguments.snapshot and arguments.no_cache:
+        parser.error('--snapshot requires persistent cache, '
+                     'not allowed with --no-cache')
     if hasattr(arguments, 'func'):
         arguments.func(arguments)
     else:
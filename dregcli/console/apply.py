@@ -0,0 +1,115 @@
+import json
+
+from .delete import DeleteCommandHandler
+from .handler import closing_client
+from dregcli.dregcli import (
+    DeadlineExceeded,
+    DRegCliException,
+    Repository,
+)
+
+
+class ApplyCommandHandler(DeleteCommandHandler):
+    """
+    run a delete plan (see delete --plan) without rescanning repository:
+    only planned tags digests are checked (HEAD), manifests and config
+    blobs are not fetched again
+    """
+    class Meta:
+        command = "apply"
+        plan_version = DeleteCommandHandler.Meta.plan_version
+        tag_delete_requested = DeleteCommandHandler.Meta.tag_delete_requested
+
+    @classmethod
+    def set_parser(cls, subparsers):
+        subparser_apply = subparsers.add_parser(
+            cls.Meta.command,
+            help="apply a delete plan written by delete --plan, "
+                 "without rescan. Tags moved to another image since plan "
+                 "are not deleted."
+        )
+
+        subparser_apply.add_argument(
+            'plan',
+            help='Delete plan file. example: cleanup.json'
+        )
+        subparser_apply.add_argument(
+            '-j', '--json',
+            action='store_true',
+            help='Json output.'
+        )
+        cls.add_concurrency_argument(subparser_apply)
+
+        subparser_apply.set_defaults(
+            func=lambda args: cls().run(
+                args.plan,
+                args.json,
+                user=args.user,
+                debug=args.debug,
+                concurrency=args.concurrency,
+                **cls.client_options(args)
+            )
+        )
+        return subparser_apply
+
+    @closing_client
+    def run(self, plan, json_output, user=False, debug=False, concurrency=1,
+            **client_options):
+        try:
+            plan = self._read_plan(plan)
+        except DRegCliException as e:
+            res = str(e)
+            if json_output:
+                res = json.dumps({'error': res})
+            print(res)
+            return
+
+        # registry client of plan
+        super(DeleteCommandHandler, self).run(
+            plan['url'],
+            json_output,
+            user=user,
+            debug=debug,
+            concurrency=concurrency,
+            **client_options
+        )
+        self.dry_run = False
+
+        deleted = []
+        try:
+            repository = Repository(self.client, plan['repo'])
+            deleted, errors = self._apply_plan(repository, plan)
+            res = self._format_deleted(deleted, json_output, errors=errors)
+        except DeadlineExceeded as e:
+            # deadline reached before deletions
+            res = self._format_deleted(deleted, json_output, error=str(e))
+        except DRegCliException as e:
+            res = str(e)
+            if json_output:
+                res = json.dumps({'error': res})
+        print(res)
+        self.display_stats()
+        return [d[0] for d in deleted]  # return only deleted tags
+
+    def _read_plan(self, path):
+        """
+        :rtype dict
+        :raise DRegCliException: unreadable or invalid plan
+        """
+        try:
+            with open(path) as f:
+                plan = json.load(f)
+        except (OSError, ValueError) as e:
+            raise DRegCliException(
+                "Invalid plan {path}: {error}".format(path=path, error=e)
+            )
+
+        if not isinstance(plan, dict) or \
+                plan.get('version') != self.Meta.plan_version:
+            raise DRegCliException(
+                "Invalid plan {path}: version {version} expected".format(
+                    path=path,
+                    version=self.Meta.plan_version
+                )
+            )
+        return plan
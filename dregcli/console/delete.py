@@ -1,18 +1,38 @@
+import collections
 import datetime
 import json
 from tabulate import tabulate
 
-from .handler import CommandHandler
-from dregcli.dregcli import DRegCliException, Repository, Tools
+from .handler import CommandHandler, closing_client
+from dregcli.dregcli import (
+    DeadlineExceeded,
+    DRegCliException,
+    Image,
+    Journal,
+    Repository,
+    Tools,
+)
 
 
 class DeleteCommandHandler(CommandHandler):
     class Meta:
         command = "delete"
+        plan_version = 1  # delete plan file format, see --plan
+        # tag delete mode requested, registry support not probed yet
+        # (dry run, plan), see _resolve_tag_delete
+        tag_delete_requested = 'requested'
 
     def __init__(self):
         super().__init__()
         self.dry_run = False
+        self.prefix = ''
+        self.by_digest = False
+        # tag delete mode: tags deleted one by one, cotags kept
+        self.tag_delete = False
+        # scanned tags data, see _get_tags
+        self.tags = []
+        # write-ahead journal of deletions, see --journal
+        self.journal = None
 
     @classmethod
     def set_parser(cls, subparsers):
@@ -100,14 +120,70 @@ class DeleteCommandHandler(CommandHandler):
                  '--from-count=21 --single-tag="^master-". --from-count using'
                  " same index rule as alone --from-count option."
         )
+        cls.add_concurrency_argument(subparser_delete)
+        subparser_delete.add_argument(
+            '--prefix',
+            type=str,
+            default='',
+            help="to use with any another delete option. "
+                 "Only tags starting with given literal prefix, "
+                 "seeked directly in registry tags listing. "
+                 "DISCLAIMER: tags out of prefix are not scanned, "
+                 "they will be deleted too if on same layer than a deleted "
+                 "tag, without being reported as cotags. "
+                 "example: --prefix=master-"
+        )
+        cls.add_by_digest_argument(subparser_delete)
+        subparser_delete.add_argument(
+            '--tag-delete',
+            action='store_true',
+            help="Delete tags only (OCI tag delete endpoint), "
+                 "cotags on same image are kept. "
+                 "Falls back to delete by digest (cotags deleted too) if not "
+                 "supported by registry (detected when deleting only: dry "
+                 "run and plan report tag delete)."
+        )
+
+        subparser_delete.add_argument(
+            '--plan',
+            type=str,
+            default='',
+            help="Write delete plan (tags, digests, dates, cotags) to given "
+                 "file instead of deleting, to review then run it with "
+                 "'apply' command without rescan. "
+                 "example: --plan=cleanup.json"
+        )
+
+        subparser_delete.add_argument(
+            '--journal',
+            type=str,
+            default='',
+            help="Journal deletions to given file (plan, then deleted "
+                 "digests), to resume an interrupted deletion with --resume. "
+                 "example: --journal=cleanup.journal"
+        )
+        subparser_delete.add_argument(
+            '--resume',
+            action='store_true',
+            help="Resume deletion of --journal without rescan: deletes "
+                 "journal plan tags not confirmed deleted, if unchanged "
+                 "(HEAD). Other delete options are ignored."
+        )
 
         subparser_delete.set_defaults(
-            func=lambda args: DeleteCommandHandler().run(
+            func=lambda args: cls().run(
                 args.url,
                 args.repo,
                 args.json,
                 user=args.user,
                 debug=args.debug,
+                concurrency=args.concurrency,
+                prefix=args.prefix,
+                by_digest=args.by_digest,
+                tag_delete=args.tag_delete,
+                plan=args.plan,
+                journal=args.journal,
+                resume=args.resume,
                 dry_run=args.null,
                 yes=args.yes,
                 all=args.all,
@@ -119,10 +195,12 @@ class DeleteCommandHandler(CommandHandler):
                 # deletion of an unexcluded tag could cause deletion of an
                 # excluded tag
                 # exclude=args.exclude and args.exclude.strip("\"'") or '',
+                **cls.client_options(args)
             )
         )
         return subparser_delete
 
+    @closing_client
     def run(
         self,
         url,
@@ -137,10 +215,24 @@ class DeleteCommandHandler(CommandHandler):
         from_date=0,
         single_tag='',
         include='',
-        exclude=''
+        exclude='',
+        concurrency=1,
+        prefix='',
+        by_digest=False,
+        tag_delete=False,
+        plan='',
+        journal='',
+        resume=False,
+        **client_options
     ):
-        super().run(url, json_output, user=user, debug=debug)
-        self.dry_run = dry_run
+        super().run(url, json_output, user=user, debug=debug,
+                    concurrency=concurrency, **client_options)
+        # plan written instead of deleting
+        self.dry_run = dry_run or bool(plan)
+        self.prefix = prefix
+        self.by_digest = by_digest
+        self.tag_delete = False
+        self.tags = []
 
         # delete options count, single_tag filter excepted
         options = [
@@ -153,13 +245,16 @@ class DeleteCommandHandler(CommandHandler):
         options_on_count = len([o for o in options if o])
 
         err_msg = ''
-        if options_on_count == 0:
+        if resume:
+            if not journal:
+                err_msg = '--resume requires --journal. delete aborted'
+        elif options_on_count == 0:
             err_msg = 'no option selected (criteria). delete aborted'
         elif options_on_count > 1:
             err_msg = '--all, --from_count, --from_date, --include, ' \
                 '--exclude are exclusives. --delete aborted'
 
-        if not err_msg and from_date:
+        if not err_msg and not resume and from_date:
             if len(from_date) == 26:  # with hms
                 from_date = datetime.datetime.strptime(from_date,
                                                        '%Y-%m-%d %H:%M:%S.%f')
@@ -181,71 +276,310 @@ class DeleteCommandHandler(CommandHandler):
         deleted = []
         try:
             repository = Repository(self.client, repo)
+            self.tag_delete = tag_delete and self.Meta.tag_delete_requested
 
-            if all:
-                deleted = self._all(repository, single_tag=single_tag)
-            elif include:
-                deleted = self._include_exclude(
-                    repository,
-                    include,
-                    single_tag=single_tag
-                )
-            # exclude desactivated: for layers with multiple tags,
-            # deletion of an unexcluded tag could cause deletion of an
-            # excluded tag
-            # elif exclude:
-            #     deleted = self._include_exclude(
-            #         repository,
-            #         exclude,
-            #         single_tag=single_tag,
-            #         exclude=True
-            #     )
-            elif from_count:
-                    deleted = self._from_count(
-                        repository,
-                        from_count,
-                        single_tag=single_tag
-                    )
-            elif from_date:
-                deleted = self._from_date(
-                    repository,
-                    from_date,
-                    single_tag=single_tag
-                )
+            # write-ahead journal (nothing deleted in dry run)
+            self.journal = journal and not self.dry_run and \
+                Journal(journal) or None
 
-            # display delete result
-            # deleted: [[tag, ['cotag1',], ...], see self._parse_codeleted
-            if json_output:
-                res = json.dumps({
-                    'result': [
-                        {'tag': d[0], 'cotags': d[1]} for d in deleted
-                    ]
-                })
+            if resume:
+                deleted, errors = self._resume(repository, journal)
             else:
-                res = tabulate(
-                    [[d[0], ", ".join(d[1])] for d in deleted],
-                    headers=['Tag', 'Cotags (deleted too)']
+                deleted, errors = self._delete(
+                    repository,
+                    all=all,
+                    include=include,
+                    from_count=from_count,
+                    from_date=from_date,
+                    single_tag=single_tag,
+                    plan=plan
                 )
+            res = self._format_deleted(deleted, json_output, errors=errors)
+        except DeadlineExceeded as e:
+            # deadline reached before deletions
+            res = self._format_deleted(deleted, json_output, error=str(e))
         except DRegCliException as e:
             res = str(e)
             if json_output:
                 res = json.dumps({'error': res})
+        finally:
+            if self.journal:
+                self.journal.close()
         print(res)
+        self.display_stats()
         return [d[0] for d in deleted]  # return only deleted tags
 
-    def _delete_image(self, repository, tag):
-        if not self.dry_run:
+    def _delete(
+        self,
+        repository,
+        all=False,
+        include='',
+        from_count=0,
+        from_date=0,
+        single_tag='',
+        plan=''
+    ):
+        """
+        plan tags to delete (repository scan), then delete them
+        :param plan: plan file path, see _write_plan
+        :return see _delete_images
+        """
+        self._resolve_tag_delete(repository)
+
+        # plan: images of tags to delete
+        images = []
+        if all:
+            images = self._all(repository, single_tag=single_tag)
+        elif include:
+            images = self._include_exclude(
+                repository,
+                include,
+                single_tag=single_tag
+            )
+        # exclude desactivated: for layers with multiple tags,
+        # deletion of an unexcluded tag could cause deletion of an
+        # excluded tag
+        # elif exclude:
+        #     images = self._include_exclude(
+        #         repository,
+        #         exclude,
+        #         single_tag=single_tag,
+        #         exclude=True
+        #     )
+        elif from_count:
+                images = self._from_count(
+                    repository,
+                    from_count,
+                    single_tag=single_tag
+                )
+        elif from_date:
+            images = self._from_date(
+                repository,
+                from_date,
+                single_tag=single_tag
+            )
+
+        if plan or self.journal:
+            plan_data = self._get_plan(repository, images)
+            if plan:
+                self._write_plan(plan, plan_data)
+            if self.journal:
+                self.journal.write_plan(plan_data)  # before any DELETE
+
+        # execution
+        return self._delete_images(repository, images)
+
+    def _resume(self, repository, journal):
+        """
+        resume journal plan: tags not confirmed deleted, without rescan
+        :param journal: journal file path
+        :return see _delete_images
+        """
+        plan, done = Journal.read(journal)
+        if not plan or plan['repo'] != repository.name:
+            raise DRegCliException(
+                "No {repo} plan in journal {path}".format(
+                    repo=repository.name,
+                    path=journal
+                )
+            )
+
+        self.tag_delete = plan['tag_delete']
+        plan['tags'] = [
+            tag_data for tag_data in plan['tags']
+            if done.get(self._reference(tag_data)) != ''
+        ]
+        # deleted after last journal sync: not found
+        return self._apply_plan(repository, plan, missing_ok=True)
+
+    def _format_deleted(self, deleted, json_output, error='', errors=()):
+        """
+        display delete result
+        :param deleted: [[tag, ['cotag1',], ...], see self._parse_codeleted
+        :param error: error that interrupted deletion (partial result)
+        :param errors: deletions failed, see self._delete_images
+        """
+        if json_output:
+            res = {
+                'result': [
+                    {'tag': d[0], 'cotags': d[1]} for d in deleted
+                ]
+            }
+            if errors:
+                res['errors'] = [
+                    {'reference': e[0], 'tags': e[1], 'error': e[2]}
+                    for e in errors
+                ]
+            if error:
+                res['error'] = error
+            return json.dumps(res)
+
+        res = tabulate(
+            [[d[0], ", ".join(d[1])] for d in deleted],
+            headers=['Tag', 'Cotags (deleted too)']
+        )
+        if errors:
+            res += "\n\n" + tabulate(
+                [[e[0], ", ".join(e[1]), e[2]] for e in errors],
+                headers=['Not deleted', 'Tags', 'Error']
+            )
+        if error:
+            res += "\n{error}, partial result".format(error=error)
+        return res
+
+    def _get_plan(self, repository, images):
+        """
+        delete plan, see ApplyCommandHandler (apply command)
+        :param images: images of tags to delete, see _delete_images
+        :rtype dict
+        """
+        cotags = dict(self._parse_codeleted(
+            [image.tag for image in images],
+            self.tags
+        ))
+        return {
+            'version': self.Meta.plan_version,
+            'url': self.client.url,
+            'repo': repository.name,
+            'tag_delete': self.tag_delete,
+            'tags': [{
+                'tag': image.tag,
+                'digest': image.digest,
+                'date': image.date and self.date2str(image.date) or '',
+                'cotags': cotags[image.tag],
+            } for image in images],
+        }
+
+    def _write_plan(self, path, plan):
+        """
+        :param plan: see _get_plan
+        """
+        with open(path, 'w') as f:
+            json.dump(plan, f, indent=2)
+
+    def _apply_plan(self, repository, plan, missing_ok=False):
+        """
+        delete plan tags without rescan: a reference (see
+        Repository.delete_images) is deleted only if all its plan tags are
+        unchanged, see _get_changed
+        :param plan: see _get_plan
+        :param missing_ok: tags not found counted as deleted
+            (resumed deletion)
+        :return see _delete_images
+        """
+        self.tag_delete = plan['tag_delete']
+        self._resolve_tag_delete(repository)
+        self.tags = plan['tags']  # cotags of plan
+
+        changed = self._get_changed(repository, plan['tags'],
+                                    missing_ok=missing_ok)
+        images = [
+            Image(
+                self.client,
+                repository.name,
+                tag_data['tag'],
+                digest=tag_data['digest']
+            )
+            for tag_data in plan['tags']
+            if self._reference(tag_data) not in changed
+        ]
+
+        deleted, errors = self._delete_images(repository, images,
+                                              missing_ok=missing_ok)
+        return deleted, list(changed.values()) + errors
+
+    def _resolve_tag_delete(self, repository):
+        """
+        resolve requested tag delete mode with registry capability probe
+        (see Repository.supports_tag_delete), only when deleting: the probe
+        is a DELETE request, never sent in dry run
+        """
+        if self.tag_delete == self.Meta.tag_delete_requested and \
+                not self.dry_run:
+            self.tag_delete = repository.supports_tag_delete()
+
+    def _reference(self, tag_data):
+        """reference deleted for plan tag, see Repository.delete_images"""
+        return self.tag_delete and tag_data['tag'] or tag_data['digest']
+
+    def _get_changed(self, repository, tags, missing_ok=False):
+        """
+        plan tags not on their plan digest anymore
+        (HEAD requests, no manifest download): their references are not
+        deleted, a digest being deleted only if all its plan tags are
+        unchanged
+        :param tags: plan tags data
+        :param missing_ok: see _apply_plan
+        :rtype collections.OrderedDict
+        :return reference: [reference, [tag,], error], see _delete_images
+        """
+        def get_error(tag_data):
             try:
-                repository.image(tag).delete()
+                digest = repository.tag_digest(tag_data['tag'])
+            except DeadlineExceeded:
+                raise
             except DRegCliException as e:
-                if str(e) != 'Status code error 404':
-                    raise e
-                # 404 tolerated during image(tag) or delete():
-                # tag in common with same commit tag
-                # and already deleted by previous tag
-                # exemple:
-                # master-6da64c000cf59c30e4841371e0dac3dd02c31aaa-1385 old-prod
-                # representing same image
+                if missing_ok and e.status_code == 404:
+                    return ''
+                return str(e)
+            if digest != tag_data['digest']:
+                return 'moved to {digest}'.format(digest=digest)
+            return ''
+
+        errors = self.client.map(get_error, tags,
+                                 concurrency=self.concurrency)
+
+        changed = collections.OrderedDict()
+        for tag_data, error in zip(tags, errors):
+            if error:
+                changed.setdefault(self._reference(tag_data), [
+                    self._reference(tag_data),
+                    [],
+                    'changed since plan ({tag}: {error})'.format(
+                        tag=tag_data['tag'],
+                        error=error
+                    )
+                ])
+        for tag_data in tags:
+            reference = self._reference(tag_data)
+            if reference in changed:
+                changed[reference][1].append(tag_data['tag'])
+        return changed
+
+    def _delete_images(self, repository, images, missing_ok=False):
+        """
+        execution stage: delete planned images with concurrent workers,
+        a DELETE per manifest digest (per tag in tag delete mode),
+        see Repository.delete_images
+        :param images: images of tags to delete (scanned, no manifest
+            refetch), in report order
+        :param missing_ok: see Repository.delete_images
+        :rtype tuple
+        :return deleted ([[tag, ['cotag1',], ...], see _parse_codeleted),
+            errors ([[reference, [tag,], error], ...])
+        """
+        results = {}
+        if not self.dry_run:
+            results = repository.delete_images(
+                images,
+                concurrency=self.concurrency,
+                tag_delete=self.tag_delete,
+                journal=self.journal,
+                missing_ok=missing_ok
+            )
+
+        deleted = []
+        errors = collections.OrderedDict()
+        for image in images:
+            reference = Repository.delete_reference(image, self.tag_delete)
+            error = results.get(reference)
+            if error:
+                errors.setdefault(reference, [reference, [], error])
+                errors[reference][1].append(image.tag)
+            else:
+                deleted.append(image.tag)
+
+        return self._parse_codeleted(deleted, self.tags), list(errors.values())
 
     def _get_tags(self, repository, single_tag=False):
         """
@@ -256,7 +590,12 @@ class DeleteCommandHandler(CommandHandler):
         """
         # group tags: that will add a 'cotags' entry to tags items,
         # see Repository.group_tags
-        groups, tags = repository.group_tags()
+        groups, tags = repository.group_tags(
+            concurrency=self.concurrency,
+            prefix=self.prefix,
+            by_digest=self.by_digest
+        )
+        self.tags = tags
 
         if single_tag:
             # grab layers concerned by a single tag
@@ -276,35 +615,31 @@ class DeleteCommandHandler(CommandHandler):
         :rtype list
         :return [[tag, ['cotag1',], ...]
         """
-        def search_tag_data(tag):
-            for tag_data in tags:
-                if tag_data['tag'] == tag:
-                    return tag_data
-            return None
+        tags_data = {tag_data['tag']: tag_data for tag_data in tags}
 
         new_deleted = []
 
         for deleted_tag in deleted:
-            # TODO improve repository.group_tags() could return a dict
-            # in its return tuple, tag data dict with tag name key
-            tag_data = search_tag_data(deleted_tag)
+            tag_data = tags_data.get(deleted_tag)
 
-            cotags = tag_data and tag_data['cotags'] or []
+            # tag delete mode: cotags kept
+            cotags = not self.tag_delete and tag_data and \
+                tag_data['cotags'] or []
             cotags = [ct for ct in cotags]
             new_deleted.append([deleted_tag, cotags])
 
         return new_deleted
 
     def _all(self, repository, single_tag=''):
+        """
+        :return images of tags to delete, see _delete_images
+        """
         tags, filtered_tags, _ = self._get_tags(repository, single_tag)
 
-        deleted = []
-        for tag_data in tags:
-            if not filtered_tags or tag_data['tag'] in filtered_tags:
-                self._delete_image(repository, tag_data['tag'])
-                deleted.append(tag_data['tag'])
-
-        return self._parse_codeleted(deleted, tags)
+        return [
+            tag_data['image'] for tag_data in tags
+            if not filtered_tags or tag_data['tag'] in filtered_tags
+        ]
 
     def _include_exclude(
         self,
@@ -313,6 +648,9 @@ class DeleteCommandHandler(CommandHandler):
         single_tag='',
         exclude=False
     ):
+        """
+        :return images of tags to delete, see _delete_images
+        """
         tags, filtered_tags, _ = self._get_tags(repository, single_tag)
         include_excluted_tag_names = Tools.search(
             [tag_data['tag'] for tag_data in tags],
@@ -320,14 +658,13 @@ class DeleteCommandHandler(CommandHandler):
             exclude=exclude
         )
 
-        deleted = []
+        images = []
         for tag_data in tags:
             if not filtered_tags or tag_data['tag'] in filtered_tags:
                 if tag_data['tag'] in include_excluted_tag_names:
-                    self._delete_image(repository, tag_data['tag'])
-                    deleted.append(tag_data['tag'])
+                    images.append(tag_data['image'])
 
-        return self._parse_codeleted(deleted, tags)
+        return images
 
     def _from_count(
         self,
@@ -335,12 +672,15 @@ class DeleteCommandHandler(CommandHandler):
         from_count,
         single_tag=''
     ):
+        """
+        :return images of tags to delete, see _delete_images
+        """
         tags, filtered_tags, group_images_date_desc = self._get_tags(
             repository,
             single_tag
         )
 
-        deleted = []
+        images = []
         if from_count:
             if from_count <= len(group_images_date_desc):
                 if from_count > 1:
@@ -349,20 +689,14 @@ class DeleteCommandHandler(CommandHandler):
                 else:
                     group_images_date_desc_to_delete = group_images_date_desc
                 for group_entry in group_images_date_desc_to_delete:
-                    if filtered_tags:
-                        layer_tags = [
-                            img.tag for img in group_entry[0]
-                            if img.tag in filtered_tags
-                        ]
-                    else:
-                        layer_tags = [img.tag for img in group_entry[0]]
-
-                    if layer_tags:
-                        # just delete the first one, will delete cotags
-                        self._delete_image(repository, layer_tags[0])
-                        deleted += layer_tags
+                    # each distinct manifest of layer deleted (cotags too),
+                    # or each tag in tag delete mode
+                    images += [
+                        img for img in group_entry[0]
+                        if not filtered_tags or img.tag in filtered_tags
+                    ]
 
-        return self._parse_codeleted(deleted, tags)
+        return images
 
     def _from_date(
         self,
@@ -370,14 +704,16 @@ class DeleteCommandHandler(CommandHandler):
         from_date,
         single_tag=''
     ):
+        """
+        :return images of tags to delete, see _delete_images
+        """
         tags, filtered_tags, _ = self._get_tags(repository, single_tag)
 
-        deleted = []
+        images = []
         if from_date:
             for tag_data in tags:
                 if tag_data['date'] <= from_date:  # from desc order
                     if not filtered_tags or tag_data['tag'] in filtered_tags:
-                        self._delete_image(repository, tag_data['tag'])
-                        deleted.append(tag_data['tag'])
+                        images.append(tag_data['image'])
 
-        return self._parse_codeleted(deleted, tags)
+        return images
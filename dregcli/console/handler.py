@@ -1,23 +1,150 @@
 import datetime
+import functools
+import json
+import sys
 
-from dregcli.dregcli import Client
+from dregcli.dregcli import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    Client,
+    DiskCache,
+    RetryPolicy,
+)
 
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 
+def closing_client(run):
+    """
+    command run decorator: client closed when run ends (pooled
+    connections, hedging workers), whatever its outcome
+    """
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return run(self, *args, **kwargs)
+        finally:
+            if self.client:
+                self.client.close()
+    return wrapper
+
+
 class CommandHandler(object):
     def __init__(self):
         self.client = None
+        self.concurrency = 1
+        self.stats = False
 
     def date2str(self, dt):
         return dt.strftime(DATE_FORMAT)
 
-    def run(self, url, json_output, user=False, debug=False):
+    @staticmethod
+    def client_options(args):
+        """client options from main parser global arguments"""
+        return {
+            'cache_dir': not args.no_cache and args.cache_dir or '',
+            'retries': args.retries,
+            'connect_timeout': args.connect_timeout,
+            'read_timeout': args.read_timeout,
+            'deadline': args.deadline,
+            'http2': args.http2,
+            'read_urls': args.read_urls,
+            'breaker_threshold': args.breaker_threshold,
+            'hedge': args.hedge,
+            'max_rps': args.max_rps,
+            'max_delete_rps': args.max_delete_rps,
+            'adaptive': args.adaptive,
+            'stats': args.stats,
+            'snapshot': args.snapshot,
+        }
+
+    @staticmethod
+    def add_concurrency_argument(subparser):
+        subparser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of images fetched concurrently. example: '
+                 '--concurrency=8'
+        )
+
+    @staticmethod
+    def add_by_digest_argument(subparser):
+        subparser.add_argument(
+            '--by-digest',
+            action='store_true',
+            help='Group tags by manifest digest (HEAD requests), '
+                 'manifest and config fetched once per distinct digest. '
+                 'cotags are then tags of the same manifest'
+        )
+
+    @staticmethod
+    def add_prefix_argument(subparser, items):
+        subparser.add_argument(
+            '--prefix',
+            type=str,
+            default='',
+            help='Only {items} starting with given literal prefix, '
+                 'seeked directly in registry listing. '
+                 'example: --prefix=release-'.format(items=items)
+        )
+
+    def run(
+        self,
+        url,
+        json_output,
+        user=False,
+        debug=False,
+        concurrency=1,
+        cache_dir='',
+        retries=RetryPolicy.Meta.retries,
+        connect_timeout=0.,
+        read_timeout=0.,
+        deadline=0.,
+        http2=False,
+        read_urls=(),
+        breaker_threshold=CircuitBreaker.Meta.threshold,
+        hedge=False,
+        max_rps=0.,
+        max_delete_rps=0.,
+        adaptive=False,
+        stats=False,
+        snapshot=False
+    ):
         if not json_output:
             print(self.Meta.command)
-        self.client = Client(url, verbose=not json_output)
+        self.concurrency = max(concurrency, 1)
+        self.client = Client(
+            url,
+            verbose=not json_output,
+            # a pooled connection per worker
+            pool_maxsize=max(self.concurrency, Client.Meta.pool_maxsize),
+            cache=cache_dir and DiskCache(cache_dir) or None,
+            retry=RetryPolicy(retries=retries),
+            # workers count as max requests in flight
+            limiter=adaptive and AdaptiveLimiter(
+                max_limit=self.concurrency
+            ) or None,
+            max_rps=max_rps,
+            max_delete_rps=max_delete_rps,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            deadline=deadline,
+            hedge=hedge,
+            breaker=CircuitBreaker(threshold=breaker_threshold),
+            read_urls=read_urls,
+            http2=http2,
+            snapshot=snapshot
+        )
+        self.stats = stats
         if debug:
             self.client.set_debug(True)
         if user:
             login, password = user.split(':')
             self.client.set_auth(login, password)
+
+    def display_stats(self):
+        """client requests stats on stderr (--stats)"""
+        if self.stats and self.client:
+            print(json.dumps({'stats': self.client.stats.as_dict()}),
+                  file=sys.stderr)
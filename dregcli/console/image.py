@@ -1,6 +1,6 @@
 import json
 
-from .handler import CommandHandler
+from .handler import CommandHandler, closing_client
 from dregcli.dregcli import DRegCliException, Repository
 
 
@@ -61,14 +61,17 @@ class ImageCommandHandler(CommandHandler):
                 args.delete,
                 args.yes,
                 user=args.user,
-                debug=args.debug
+                debug=args.debug,
+                **cls.client_options(args)
             )
         )
         return subparser_image
 
+    @closing_client
     def run(self, url, repo, tag, manifest, json_output, delete, yes,
-            user=False, debug=False):
-        super().run(url, json_output, user=user, debug=debug)
+            user=False, debug=False, **client_options):
+        super().run(url, json_output, user=user, debug=debug,
+                    **client_options)
 
         if delete and manifest:
             print('--delete is incompatible with --manifest')
@@ -109,3 +112,4 @@ class ImageCommandHandler(CommandHandler):
             if json_output:
                 res = json.dumps({'error': res})
         print(res)
+        self.display_stats()
@@ -1,8 +1,8 @@
 import json
 from tabulate import tabulate
 
-from .handler import CommandHandler
-from dregcli.dregcli import DRegCliException, Repository
+from .handler import CommandHandler, closing_client
+from dregcli.dregcli import DeadlineExceeded, DRegCliException, Repository
 
 
 class ImagesCommandHandler(CommandHandler):
@@ -30,6 +30,8 @@ class ImagesCommandHandler(CommandHandler):
             action='store_true',
             help='Json output'
         )
+        cls.add_concurrency_argument(subparser_image)
+        cls.add_by_digest_argument(subparser_image)
 
         subparser_image.set_defaults(
             func=lambda args: cls().run(
@@ -37,39 +39,71 @@ class ImagesCommandHandler(CommandHandler):
                 args.repo,
                 args.json,
                 user=args.user,
-                debug=args.debug
+                debug=args.debug,
+                concurrency=args.concurrency,
+                by_digest=args.by_digest,
+                **cls.client_options(args)
             )
         )
         return subparser_image
 
-    def run(self, url, repo, json_output, user=False, debug=False):
-        super().run(url, json_output, user=user, debug=debug)
+    @closing_client
+    def run(self, url, repo, json_output, user=False, debug=False,
+            concurrency=1, by_digest=False, **client_options):
+        super().run(url, json_output, user=user, debug=debug,
+                    concurrency=concurrency, **client_options)
 
         try:
             repository = Repository(self.client, repo)
-            groups, _ = repository.group_tags()
+            groups, _ = repository.group_tags(
+                concurrency=self.concurrency,
+                by_digest=by_digest
+            )
             tags_date_desc = repository.group_images_date_desc(
                 groups,
                 result_tag=True
             )
-
-            if json_output:
-                res = json.dumps({
-                    'result': [{
-                        'tags': tdd[0],
-                        'date': self.date2str(tdd[1])
-                    } for tdd in tags_date_desc]
-                })
-            else:
-                res = tabulate(
-                    [
-                        [','.join(tdd[0]), self.date2str(tdd[1])]
-                        for tdd in tags_date_desc
-                    ],
-                    headers=['Tags', 'Date']
-                )
+            res = self._format_images(tags_date_desc, json_output)
+        except DeadlineExceeded as e:
+            # images of tags scanned before deadline
+            groups, _ = e.partial or ({}, [])
+            tags_date_desc = repository.group_images_date_desc(
+                groups,
+                result_tag=True
+            )
+            res = self._format_images(tags_date_desc, json_output,
+                                      error=str(e))
         except DRegCliException as e:
             res = str(e)
             if json_output:
                 res = json.dumps({'error': res})
         print(res)
+        self.display_stats()
+
+    def _format_images(self, tags_date_desc, json_output, error=''):
+        """
+        display images
+        :param tags_date_desc: see Repository.group_images_date_desc
+        :param error: error that interrupted scan (partial result)
+        """
+        if json_output:
+            res = {
+                'result': [{
+                    'tags': tdd[0],
+                    'date': self.date2str(tdd[1])
+                } for tdd in tags_date_desc]
+            }
+            if error:
+                res['error'] = error
+            return json.dumps(res)
+
+        res = tabulate(
+            [
+                [','.join(tdd[0]), self.date2str(tdd[1])]
+                for tdd in tags_date_desc
+            ],
+            headers=['Tags', 'Date']
+        )
+        if error:
+            res += "\n{error}, partial result".format(error=error)
+        return res
@@ -1,7 +1,7 @@
 import json
 
-from .handler import CommandHandler
-from dregcli.dregcli import DRegCliException
+from .handler import CommandHandler, closing_client
+from dregcli.dregcli import DeadlineExceeded, DRegCliException
 
 
 class RepositoriesCommandHandler(CommandHandler):
@@ -24,30 +24,72 @@ class RepositoriesCommandHandler(CommandHandler):
             action='store_true',
             help='Json output'
         )
+        subparser_repositories.add_argument(
+            '--page-size',
+            type=int,
+            default=0,
+            help='Repositories per catalog request (registry default if not '
+                 'set). example: --page-size=1000'
+        )
+
+        cls.add_prefix_argument(subparser_repositories, 'repositories')
 
         subparser_repositories.set_defaults(
             func=lambda args: cls().run(
                 args.url,
                 args.json,
                 user=args.user,
-                debug=args.debug
+                debug=args.debug,
+                page_size=args.page_size,
+                prefix=args.prefix,
+                **cls.client_options(args)
             )
         )
         return subparser_repositories
 
-    def run(self, url, json_output, user=False, debug=False):
-        super().run(url, json_output, user=user, debug=debug)
+    @closing_client
+    def run(self, url, json_output, user=False, debug=False, page_size=0,
+            prefix='', **client_options):
+        """
+        :return repositories names (json output only: text output is
+            printed page per page as they arrive, without keeping them)
+        """
+        super().run(url, json_output, user=user, debug=debug,
+                    **client_options)
 
         repositories = []
         try:
-            repositories = list(map(str, self.client.repositories()))
-            if json_output:
-                res = json.dumps({"result": repositories})
-            else:
-                res = "\n".join(repositories)
+            for repository in self.client.iter_repositories(
+                page_size=page_size,
+                prefix=prefix
+            ):
+                if json_output:
+                    repositories.append(str(repository))
+                else:
+                    print(repository)
+            res = self._format_repositories(repositories, json_output)
+        except DeadlineExceeded as e:
+            # repositories listed before deadline
+            res = self._format_repositories(repositories, json_output,
+                                            error=str(e))
         except DRegCliException as e:
             res = str(e)
             if json_output:
                 res = json.dumps({'error': res})
-        print(res)
+        if res:
+            print(res)
+        self.display_stats()
         return repositories
+
+    def _format_repositories(self, repositories, json_output, error=''):
+        """
+        display repositories (text output: already printed page per page)
+        :param error: error that interrupted listing (partial result)
+        """
+        if json_output:
+            res = {'result': repositories}
+            if error:
+                res['error'] = error
+            return json.dumps(res)
+
+        return error and "{error}, partial result".format(error=error) or ''
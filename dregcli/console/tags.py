@@ -1,8 +1,8 @@
 import json
 from tabulate import tabulate
 
-from .handler import CommandHandler
-from dregcli.dregcli import DRegCliException, Repository
+from .handler import CommandHandler, closing_client
+from dregcli.dregcli import DeadlineExceeded, DRegCliException, Repository
 
 
 class TagsCommandHandler(CommandHandler):
@@ -29,6 +29,15 @@ class TagsCommandHandler(CommandHandler):
             action='store_true',
             help='Json output'
         )
+        cls.add_concurrency_argument(subparser_tags)
+        subparser_tags.add_argument(
+            '--page-size',
+            type=int,
+            default=0,
+            help='Tags per tags list request (registry default if not set). '
+                 'example: --page-size=1000'
+        )
+        cls.add_prefix_argument(subparser_tags, 'tags')
 
         subparser_tags.set_defaults(
             func=lambda args: cls().run(
@@ -36,36 +45,65 @@ class TagsCommandHandler(CommandHandler):
                 args.repo,
                 args.json,
                 user=args.user,
-                debug=args.debug
+                debug=args.debug,
+                concurrency=args.concurrency,
+                page_size=args.page_size,
+                prefix=args.prefix,
+                **cls.client_options(args)
             )
         )
         return subparser_tags
 
-    def run(self, url, repo, json_output, user=False, debug=False):
-        super().run(url, json_output, user=user, debug=debug)
+    @closing_client
+    def run(self, url, repo, json_output, user=False, debug=False,
+            concurrency=1, page_size=0, prefix='', **client_options):
+        super().run(url, json_output, user=user, debug=debug,
+                    concurrency=concurrency, **client_options)
 
         tags_by_date = []
         try:
             repository = Repository(self.client, repo)
-            tags_by_date = repository.get_tags_by_date()
-
-            if json_output:
-                res = json.dumps({
-                    'result': [
-                        {
-                            'tag': tag_data['tag'],
-                            'date': self.date2str(tag_data['date'])
-                        } for tag_data in tags_by_date
-                    ]
-                })
-            else:
-                res = tabulate([
-                    [tag_data['tag'], self.date2str(tag_data['date'])]
-                    for tag_data in tags_by_date
-                ], headers=['Tag', 'Date'])
+            tags_by_date = repository.get_tags_by_date(
+                concurrency=self.concurrency,
+                page_size=page_size,
+                prefix=prefix
+            )
+            res = self._format_tags(tags_by_date, json_output)
+        except DeadlineExceeded as e:
+            # tags scanned before deadline
+            tags_by_date = e.partial or []
+            res = self._format_tags(tags_by_date, json_output, error=str(e))
         except DRegCliException as e:
             res = str(e)
             if json_output:
                 res = json.dumps({'error': res})
         print(res)
+        self.display_stats()
         return tags_by_date
+
+    def _format_tags(self, tags_by_date, json_output, error=''):
+        """
+        display tags
+        :param tags_by_date: see Repository.get_tags_by_date
+        :param error: error that interrupted scan (partial result)
+        """
+        if json_output:
+            res = {
+                'result': [
+                    {
+                        'tag': tag_data['tag'],
+                        'date': self.date2str(tag_data['date'])
+                    } for tag_data in tags_by_date
+                ]
+            }
+            if error:
+                res['error'] = error
+            return json.dumps(res)
+
+        res = tabulate([
+            [tag_data['tag'], self.date2str(tag_data['date'])]
+            for tag_data in tags_by_date
+        ], headers=['Tag', 'Date'])
+        if error:
+            res += "\n{error}, partial result".format(error=error)
+        return res
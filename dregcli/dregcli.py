@@ -1,14 +1,35 @@
 from operator import itemgetter
 from path import Path
+import collections
+import concurrent.futures
 import datetime
+import email.utils
 import functools
+import hashlib
 import json
 import os
+import random
 import re
 import requests
+import threading
+import time
+import urllib.parse
+import uuid
 
 
 class DRegCliException(RuntimeError):
+    # unexpected response status code, 0 if none (see
+    # Client._check_response)
+    status_code = 0
+
+
+class DeadlineExceeded(DRegCliException):
+    # result completed before deadline, of the interrupted call
+    # (see Client.map, Repository.get_tags_by_date, Repository.group_tags)
+    partial = None
+
+
+class CircuitOpenError(DRegCliException):
     pass
 
 
@@ -20,12 +41,88 @@ class Client(object):
         auth_env_password = 'DREGCLI_PWD'
         auth_response_get_token_header = 'Www-Authenticate'
         auth_bearer_pattern = "Bearer {token}"
-
-    def __init__(self, url, verbose=False):
+        # seconds before token expiry to refresh it ahead
+        auth_token_refresh_margin = 10
+        # docker token spec default when no expires_in in token response
+        auth_token_default_expires_in = 60
+        # path parts after repository name (token scope hint)
+        auth_scope_path_markers = ('tags', 'manifests', 'blobs')
+        pool_connections = 10
+        pool_maxsize = 10
+        # hedged GETs: duplicate sent after p95 latency of last GETs
+        hedge_percentile = 95
+        hedge_min_samples = 20  # GETs observed before hedging
+        hedge_ratio = 0.05  # max hedges per request sent
+        connect_timeout = 5.  # seconds
+        read_timeout = 60.  # seconds
+        link_header = 'Link'
+        link_next_pattern = r'<([^>]+)>\s*;\s*rel="?next"?'
+
+    def __init__(
+        self,
+        url,
+        verbose=False,
+        pool_connections=0,
+        pool_maxsize=0,
+        keep_alive=True,
+        cache=None,
+        retry=None,
+        limiter=None,
+        max_rps=0.,
+        max_delete_rps=0.,
+        connect_timeout=0.,
+        read_timeout=0.,
+        deadline=0.,
+        hedge=False,
+        breaker=None,
+        read_urls=(),
+        http2=False,
+        snapshot=False,
+        session=None
+    ):
+        """
+        :param max_rps: max read requests per second (all workers), 0 for no
+            limit
+        :param max_delete_rps: max DELETE requests per second, 0 for no limit
+        :param connect_timeout: seconds, default Meta.connect_timeout
+        :param read_timeout: seconds, default Meta.read_timeout
+        :param deadline: seconds from now for all client requests (retries
+            and waits included), 0 for none: DeadlineExceeded raised then
+        :param hedge: True to hedge GETs of manifests and config blobs,
+            see _hedged_request
+        :param breaker: CircuitBreaker of registries hosts, can be shared
+            by clients, default own one
+        :param read_urls: read replicas (or pull-through mirrors) urls:
+            GET and HEAD requests balanced across them, url (primary)
+            only gets DELETEs (and reads if no replica available)
+        :param http2: True for HTTP/2 transport (dregcli.http2.Http2Session):
+            concurrent requests multiplexed on a connection per host
+        :param snapshot: True to keep a snapshot per repository (tag:
+            digest, layers key, date) in cache: next scans only fetch
+            manifests and config blobs of new or moved tags
+            (see Repository.get_tags_by_date), cache required
+        :param session: transport, requests.Session like (get, head,
+            delete, close), closed with client: default pooled
+            requests.Session (or Http2Session if http2)
+        """
         super().__init__()
 
         assert isinstance(url, str)
         assert isinstance(verbose, bool)
+        assert isinstance(pool_connections, int)
+        assert isinstance(pool_maxsize, int)
+        assert isinstance(keep_alive, bool)
+        assert isinstance(http2, bool)
+        assert isinstance(snapshot, bool)
+        assert cache is None or isinstance(cache, DiskCache)
+        assert retry is None or isinstance(retry, RetryPolicy)
+        assert limiter is None or isinstance(limiter, AdaptiveLimiter)
+        assert isinstance(max_rps, (int, float))
+        assert isinstance(max_delete_rps, (int, float))
+        assert isinstance(deadline, (int, float))
+        assert isinstance(hedge, bool)
+        assert breaker is None or isinstance(breaker, CircuitBreaker)
+        assert all(isinstance(read_url, str) for read_url in read_urls)
 
         self._debug = False
 
@@ -33,6 +130,104 @@ class Client(object):
         self.verbose = verbose
         self.request_kwargs = dict()
         self.auth = False
+        # token cache: (realm, service, scope) key: token entry
+        self._auth_tokens = {}
+        # token scope hint (see _auth_scope_hint): (realm, service, scope)
+        self._auth_scopes = {}
+        self._auth_lock = threading.Lock()
+        # config blob digest: image date (see Image.get_date)
+        self._configs_dates = Memo()
+
+        self.pool_connections = \
+            pool_connections or self.Meta.pool_connections
+        self.pool_maxsize = pool_maxsize or self.Meta.pool_maxsize
+        self.keep_alive = keep_alive
+        self.http2 = http2
+        self.connect_timeout = connect_timeout or self.Meta.connect_timeout
+        self.read_timeout = read_timeout or self.Meta.read_timeout
+        self.deadline = deadline and Deadline(deadline) or None
+        self.session = session or self._new_session()
+        # persistent cache of blobs and manifests by digest
+        self.cache = cache
+        self.snapshot = snapshot
+        self.retry = retry or RetryPolicy()
+        self.stats = Stats()
+        # adaptive limit of requests in flight (all workers)
+        self.limiter = limiter
+        # requests rate limits (all workers), separate budget for deletes
+        self.read_bucket = max_rps and TokenBucket(max_rps) or None
+        self.delete_bucket = max_delete_rps and \
+            TokenBucket(max_delete_rps) or None
+        # GETs latencies (hedging delay)
+        self.latencies = LatencyTracker()
+        self.hedge = hedge
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+        self.breaker = breaker or CircuitBreaker()
+        self.router = read_urls and ReadRouter(read_urls, self.breaker) \
+            or None
+        # OCI tag delete endpoint support: None until detected,
+        # see Repository.supports_tag_delete
+        self.tag_delete = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _new_session(self):
+        """
+        pooled keep-alive session shared by all requests of the client
+        (and so by its repositories and images)
+        :rtype requests.Session (or Http2Session)
+        """
+        if self.http2:
+            from dregcli.http2 import Http2Session
+            return Http2Session(
+                self._request_timeout,
+                max_connections=self.pool_maxsize,
+                keep_alive=self.keep_alive
+            )
+
+        session = requests.Session()
+        adapter = TimeoutHTTPAdapter(
+            timeout=self._request_timeout,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def close(self):
+        """release pooled connections"""
+        if self._hedge_executor:
+            # lost hedges left to complete in background
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        self.session.close()
+
+    def _request_timeout(self):
+        """
+        (connect, read) timeouts of a request, bounded by deadline
+        :raise DeadlineExceeded
+        """
+        timeout = (self.connect_timeout, self.read_timeout)
+        if self.deadline:
+            remaining = self.deadline.check()
+            timeout = tuple(min(t, remaining) for t in timeout)
+        return timeout
+
+    def _check_deadline(self, wait=0.):
+        """
+        :param wait: seconds to wait before next request
+        :raise DeadlineExceeded: deadline reached before end of wait
+        """
+        if self.deadline:
+            self.deadline.check(wait=wait)
 
     def set_debug(self, debug):
         self._debug = debug
@@ -56,6 +251,7 @@ class Client(object):
         assert isinstance(password, str)
 
         self.display("login as user '{login}'".format(login=login))
+        self.reset_auth()  # tokens of previous credentials
         self.auth = {
             'login': login,
             'password': password,
@@ -65,25 +261,142 @@ class Client(object):
 
     def reset_auth(self):
         self.auth = False
+        with self._auth_lock:
+            self._auth_tokens = {}
+            self._auth_scopes = {}
 
     def display(self, *args):
         if self.verbose:
             print(*args)
 
-    def repositories(self):
+    def repositories(self, page_size=0, prefix=''):
         """
         :return list of Repository instances
         """
-        url = str(
+        return list(self.iter_repositories(page_size=page_size,
+                                           prefix=prefix))
+
+    def iter_repositories(self, page_size=0, prefix=''):
+        """
+        iterate over catalog repositories, page per page
+        :param page_size: repositories per page (registry default if 0)
+        :param prefix: only repositories starting with prefix,
+            example: 'team-a/'
+        :return generator of Repository instances
+        """
+        for repo in self._paginate(self._catalog_url(), 'repositories',
+                                   page_size=page_size, prefix=prefix):
+            yield Repository(self, repo)
+
+    def _catalog_url(self):
+        return str(
             Path(self.url) /
             self.Meta.api_version /
             self.Meta.repositories
         )
 
-        response = self._request(url, headers={})
+    def _paginate(self, url, key, page_size=0, prefix=''):
+        """
+        iterate over a paginated list (catalog, tags)
+        following Link header next pages
+        :param key: list key in response json
+        :param page_size: items per page (registry default if 0)
+        :param prefix: literal prefix of items: as the registry lists items
+            in lexical order, seek to prefix with 'last' cursor and stop at
+            first item out of prefix range
+        :return generator of items
+        """
+        url = self._first_page_url(url, page_size=page_size, prefix=prefix)
+        while url:
+            response = self._request(url, headers={})
+            items, last_page = self._page_items(response, key, prefix)
+            for item in items:
+                yield item
+            url = not last_page and self._next_page_url(response) or ''
+
+    @staticmethod
+    def _first_page_url(url, page_size=0, prefix=''):
+        """see _paginate"""
+        assert isinstance(page_size, int)
+        assert isinstance(prefix, str)
+
+        params = {}
+        if page_size:
+            params['n'] = page_size
+        if prefix:
+            params['last'] = Tools.prefix_cursor(prefix)
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        return url
+
+    @staticmethod
+    def _page_items(response, key, prefix=''):
+        """
+        page items in prefix range (see _paginate)
+        :return tuple (items, True if no more items in prefix range)
+        """
+        items = []
+        for item in response.json().get(key, []) or []:
+            if prefix and not item.startswith(prefix):
+                if item > prefix:
+                    return items, True  # out of prefix range
+                continue  # before prefix range (cursor not supported)
+            items.append(item)
+        return items, False
+
+    def _next_page_url(self, response):
+        """
+        next page url from Link header, '' if last page
+        < Link: </v2/_catalog?last=foo&n=100>; rel="next"
+        """
+        match = re.search(
+            self.Meta.link_next_pattern,
+            response.headers.get(self.Meta.link_header, '')
+        )
+        return match and urllib.parse.urljoin(self.url, match.group(1)) or ''
 
-        repositories = response.json().get("repositories", [])
-        return [Repository(self, repo) for repo in repositories]
+    def map(self, func, items, concurrency=1):
+        """
+        apply func to each item, with up to concurrency workers
+        (requests sharing client pooled session)
+        :return list of func results, in items order
+        :raise DeadlineExceeded: with partial results (completed items,
+            in items order)
+        """
+        assert isinstance(concurrency, int)
+
+        if concurrency <= 1:
+            results = []
+            try:
+                for item in items:
+                    results.append(func(item))
+            except DeadlineExceeded as e:
+                e.partial = results
+                raise
+            return results
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=concurrency
+        ) as executor:
+            futures = []
+            try:
+                # items iterated (generator) in try: pending items cancelled
+                # on its error too
+                for item in items:
+                    futures.append(executor.submit(func, item))
+                return [future.result() for future in futures]
+            except BaseException as e:
+                # first error: do not start pending items
+                for future in futures:
+                    future.cancel()
+                if isinstance(e, DeadlineExceeded):
+                    # running items completed or interrupted too
+                    executor.shutdown(wait=True)
+                    e.partial = [
+                        future.result() for future in futures
+                        if not future.cancelled() and not future.exception()
+                    ]
+                raise
 
     def _request(
         self,
@@ -91,47 +404,396 @@ class Client(object):
         headers={},
         method=False,
         verb=False,
-        expected_code=200
+        expected_code=200,
+        hedge=False
     ):
+        """
+        :param hedge: hedgeable request (GET only), see _hedged_request
+        """
         assert isinstance(url, str)
         assert not headers or isinstance(headers, dict)
         assert not verb or isinstance(verb, str)
 
-        method = method or requests.get
+        if hedge and self.hedge and not method and verb in (False, 'GET'):
+            return self._hedged_request(url, headers, expected_code)
+
+        # transient failures retried, see RetryPolicy
+        method = method or self.session.get
         verb = verb or 'GET'
+
+        attempt = 0
+        while True:
+            self._check_deadline()
+            try:
+                response = self._send(url, headers, method, verb)
+            except CircuitOpenError as e:
+                if not self.retry.should_retry(verb, attempt):
+                    raise
+                # host cooldown waited out while retry budget left
+                time.sleep(self._circuit_delay(e.host, verb, attempt))
+                attempt += 1
+                continue
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout):
+                self._check_deadline()  # timeout bounded by deadline
+                if not self.retry.should_retry(verb, attempt):
+                    self.stats.incr('errors')
+                    raise
+                response = None
+            else:
+                if not self.retry.should_retry(verb, attempt,
+                                               response.status_code):
+                    break
+            time.sleep(self._retry_delay(url, verb, attempt, response))
+            attempt += 1
+
+        return self._check_response(response, verb, attempt, expected_code)
+
+    def _hedged_request(self, url, headers, expected_code):
+        """
+        GET request hedged: if not completed after p95 latency of last GETs,
+        a duplicate is sent and first response wins
+        (hedges capped to Meta.hedge_ratio of requests)
+        :rtype requests.Response
+        """
+        def request():
+            return self._request(url, headers=headers,
+                                 expected_code=expected_code)
+
+        delay = self._hedge_delay()
+        if not delay:
+            return request()
+
+        executor = self._get_hedge_executor()
+        primary = executor.submit(request)
+        try:
+            return primary.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+        if not self._take_hedge():
+            return primary.result()
+
+        self.display_debug('hedge', url)
+        hedge = executor.submit(request)
+        errors = []
+        for future in concurrent.futures.as_completed([primary, hedge]):
+            try:
+                response = future.result()
+            except Exception as e:
+                errors.append(e)  # other one chance
+                continue
+            # other one left to complete
+            self.stats.incr(
+                future is hedge and 'hedges_won' or 'hedges_wasted'
+            )
+            return response
+        raise errors[0]
+
+    def _hedge_delay(self):
+        """
+        :return seconds before hedging, 0. if not enough GETs observed
+        """
+        if len(self.latencies) < self.Meta.hedge_min_samples:
+            return 0.
+        return self.latencies.percentile(self.Meta.hedge_percentile)
+
+    def _take_hedge(self):
+        """
+        :return True if a hedge can be sent (budget)
+        """
+        with self._hedge_lock:
+            if self.stats.get('hedges') + 1 > \
+                    self.Meta.hedge_ratio * self.stats.get('requests'):
+                return False
+            self.stats.incr('hedges')
+            return True
+
+    def _get_hedge_executor(self):
+        with self._hedge_lock:
+            if not self._hedge_executor:
+                # primary and hedge of each worker request
+                self._hedge_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.pool_maxsize * 2
+                )
+            return self._hedge_executor
+
+    def _send(self, url, headers, method, verb):
+        """
+        send request, with auth challenge flow
+        :rtype requests.Response
+        """
         self.display(verb, url)
 
-        response = method(url, headers=headers)
+        # auth: attach up front a cached token of a previous challenge
+        token = self._auth_cached_token(url, verb)
+        response = self._dispatch(
+            method,
+            url,
+            token and self._auth_decorate_headers(headers, token) or headers,
+            verb
+        )
         self.display_debug('response headers', response.headers)
-        if response.status_code != expected_code:
-            if not self.auth:  # raise only if no auth
-                msg = "Status code error {code}".format(
-                    code=response.status_code
-                )
-                raise DRegCliException(msg)
 
-        if self._auth_get_token(response):
-            # auth: request again with token obtained through previous response
-            response2 = requests.get(
+        if self.auth and response.status_code == 401:
+            # auth: no token yet for this scope, or token rejected:
+            # challenge flow, request again with token obtained through
+            # previous response
+            token = self._auth_get_token(response, url=url, verb=verb,
+                                         rejected=token)
+            response = self._dispatch(
+                method,
                 url,
-                headers=self._auth_decorate_headers(headers)
+                self._auth_decorate_headers(headers, token),
+                verb
             )
-            self.display_debug('response headers 2', response2.headers)
-            if response2.status_code != expected_code:
-                msg = "Status code error {code}".format(
-                    code=response2.status_code
-                )
-                raise DRegCliException(msg)
+            self.display_debug('response headers 2', response.headers)
 
-            return response2
-        else:
+        return response
+
+    def _dispatch(self, method, url, headers, verb):
+        """
+        http request, at rate limit and in a limiter slot if any
+        :rtype requests.Response
+        """
+        wait = self._rate_wait(verb)
+        if wait:
+            self._check_deadline(wait)
+            time.sleep(wait)
+
+        url = self._route(url, verb)
+        if self.limiter:
+            self.limiter.acquire()
+        if self.router:
+            self.router.start(url)
+        # breaker check right before request: probe outcome always recorded
+        probe = self._check_breaker(url)
+        start = time.monotonic()
+        status_code = 0  # connection error
+        try:
+            self.stats.incr('requests')
+            response = method(url, headers=headers)
+            status_code = response.status_code
+            return response
+        finally:
+            self._track_response(url, verb, time.monotonic() - start,
+                                 status_code, probe=probe)
+
+    def _check_breaker(self, url):
+        """
+        :return probe token, see CircuitBreaker.before
+        :raise CircuitOpenError: host circuit open, fail fast (request
+            slots released)
+        """
+        try:
+            return self.breaker.before(self._host(url))
+        except CircuitOpenError:
+            self.stats.incr('circuit_rejected')
+            self._cancel_request(url)
+            raise
+
+    def _cancel_request(self, url, probe=False):
+        """
+        release request slots (read router, limiter, breaker probe) of a
+        request not sent or cancelled, without outcome
+        """
+        self.breaker.release_probe(self._host(url), probe)
+        if self.router:
+            self.router.cancel(url)
+        if self.limiter:
+            self.limiter.cancel()
+
+    @staticmethod
+    def _host(url):
+        return urllib.parse.urlsplit(url).netloc
+
+    def _route(self, url, verb):
+        """
+        read request (GET, HEAD) of primary url routed to a read replica
+        :return url to request
+        """
+        primary_url = self.url.rstrip('/')
+        if not self.router or verb not in ReadRouter.Meta.verbs or \
+                not url.startswith(primary_url):
+            return url
+        read_url = self.router.choose()
+        if not read_url:
+            self.stats.incr('reads_primary_fallback')
+            return url
+        return read_url + url[len(primary_url):]
+
+    def _track_response(self, url, verb, latency, status_code, probe=False):
+        """
+        :param status_code: response status code, 0 for a connection error
+        :param probe: probe token, see CircuitBreaker.before
+        """
+        if self.breaker.record(self._host(url), status_code, probe=probe):
+            self.stats.incr('circuit_opened')
+        if self.router:
+            self.router.done(url, latency, status_code)
+        if status_code and verb == 'GET':
+            self.latencies.add(latency)  # hedging delay
+        if self.limiter:
+            self.limiter.release(latency, status_code)
+            self.stats.set('concurrency_limit', self.limiter.limit)
+            self.stats.set('latency_p95', round(self.limiter.latency_p95, 3))
+
+    def _rate_wait(self, verb):
+        """
+        reserve a request of verb budget
+        :return seconds to wait before sending it
+        """
+        bucket = self.delete_bucket if verb == 'DELETE' else self.read_bucket
+        wait = bucket and bucket.reserve() or 0.
+        if wait:
+            self.stats.incr('rate_limited')
+        return wait
+
+    def _retry_delay(self, url, verb, attempt, response=None):
+        """
+        count a retry and return its delay
+        :param response: failed response, None for a connection error
+        """
+        self.stats.incr('retries')
+        delay = self.retry.delay(attempt, response=response)
+        self.display_debug('retry {verb} {url}'.format(verb=verb, url=url),
+                           '{status} retry #{attempt} in {delay:.2f}s'.format(
+                               status=response is not None and
+                               response.status_code or 'connection error',
+                               attempt=attempt + 1,
+                               delay=delay
+                           ))
+        self._check_deadline(delay)
+        return delay
+
+    def _circuit_delay(self, host, verb, attempt):
+        """
+        count a retry of a request rejected by an open circuit and return
+        its delay: host cooldown left, at least retry backoff (probe of
+        another request in flight)
+        """
+        self.stats.incr('retries')
+        delay = max(self.breaker.retry_in(host), self.retry.delay(attempt))
+        self.display_debug('retry {verb} {host}'.format(verb=verb, host=host),
+                           'circuit open, retry #{attempt} in '
+                           '{delay:.2f}s'.format(attempt=attempt + 1,
+                                                 delay=delay))
+        self._check_deadline(delay)
+        return delay
+
+    def _check_response(self, response, verb, attempt, expected_code):
+        """
+        :param attempt: retries count of request
+        :raise DRegCliException: unexpected status code
+        """
+        if verb == 'DELETE' and attempt and response.status_code == 404:
+            # deleted by a previous attempt whose response was lost
+            # (or by a concurrent client): deleted anyway
+            self.stats.incr('deletes_404_after_retry')
             return response
 
-    def _auth_get_token(self, response):
-        """get token workflow (from current response)"""
+        if response.status_code != expected_code:
+            if response.status_code in self.retry.Meta.status_codes:
+                self.stats.incr('retries_exhausted')
+            self.stats.incr('errors')
+            msg = "Status code error {code}".format(
+                code=response.status_code
+            )
+            error = DRegCliException(msg)
+            error.status_code = response.status_code
+            raise error
+
+        return response
+
+    def _auth_scope_hint(self, url, verb):
+        """
+        token scope hint of a request: registry host, repository
+        (or catalog) and verb. the token scope itself is only known from
+        the registry challenge, the hint maps a request to it.
+        :rtype tuple
+        """
+        parsed = urllib.parse.urlsplit(url)
+        parts = parsed.path.strip('/').split('/')
+        if parts and parts[0] == self.Meta.api_version:
+            parts = parts[1:]
+        for index, part in enumerate(parts):
+            if part in self.Meta.auth_scope_path_markers:
+                parts = parts[:index]
+                break
+        return parsed.netloc, '/'.join(parts), verb
+
+    def _auth_cached_token(self, url, verb):
+        """
+        cached token for request scope if any,
+        refreshed just before its expiry (refresh-ahead)
+        :rtype str
+        """
+        key, token = self._auth_cached_token_entry(url, verb)
+        if not key or token:
+            return token
+
+        try:
+            return self._auth_fetch_token(*key)
+        except DRegCliException:
+            # refresh failed: fallback on challenge flow
+            with self._auth_lock:
+                self._auth_tokens.pop(key, None)
+            return ''
+
+    def _auth_cached_token_entry(self, url, verb):
+        """
+        :return tuple (token key if any, token if still valid)
+        """
+        if not self.auth:
+            return None, ''
+
+        with self._auth_lock:
+            key = self._auth_scopes.get(self._auth_scope_hint(url, verb))
+            entry = key and self._auth_tokens.get(key)
+        if not entry:
+            return None, ''
+
+        if time.time() < \
+                entry['expires_at'] - self.Meta.auth_token_refresh_margin:
+            return key, entry['token']
+        return key, ''  # to refresh
+
+    def _auth_get_token(self, response, url='', verb='GET', rejected=None):
+        """
+        get token workflow (from current response)
+        :param rejected: token sent with current request ('' if none):
+            a valid cached token of challenge scope other than it is reused.
+            None to always get a new token
+        """
         if not self.auth:
             return False
 
+        key = self._auth_challenge(response, url=url, verb=verb)
+        if rejected is not None:
+            token = self._auth_valid_token(key, rejected=rejected)
+            if token:
+                return token
+        return self._auth_fetch_token(*key)
+
+    def _auth_valid_token(self, key, rejected=''):
+        """
+        cached token of challenge key still valid, if any: token of scope
+        already obtained through another scope hint (other verb, request
+        of same repository)
+        :param rejected: token rejected by registry, not reused
+        :rtype str
+        """
+        with self._auth_lock:
+            entry = self._auth_tokens.get(key)
+        if not entry or entry['token'] == rejected or time.time() >= \
+                entry['expires_at'] - self.Meta.auth_token_refresh_margin:
+            return ''
+        return entry['token']
+
+    def _auth_challenge(self, response, url='', verb='GET'):
+        """
+        token key from current response challenge
+        :return (realm, service, scope)
+        """
         # < Www-Authenticate: Bearer realm="https://host/v2/token",
         # service="docker-registry.host.fr",
         # scope="registry:catalog:*"
@@ -144,19 +806,37 @@ class Client(object):
                 )
             )
 
-        www_authenticate_str = www_authenticate.split('Bearer ')[1]
-        www_authenticate_parts = www_authenticate_str.split(',')
-        realm = www_authenticate_parts[0].split('=')[1].strip('"')
-        service = www_authenticate_parts[1].split('=')[1].strip('"')
-        scope = www_authenticate_parts[2].split('=')[1].strip('"')
+        key = self._auth_parse_challenge(www_authenticate)
+        if url:
+            # next requests of same scope hint will get token up front
+            with self._auth_lock:
+                self._auth_scopes[self._auth_scope_hint(url, verb)] = key
+        return key
 
-        get_token_url = "{realm}?service={service}&scope={scope}".format(
-            realm=realm,
-            service=service,
-            scope=scope,
+    @staticmethod
+    def _auth_parse_challenge(www_authenticate):
+        """
+        :return (realm, service, scope) of Www-Authenticate challenge
+        """
+        # scope could contain commas: repository:foo:pull,push
+        challenge = dict(re.findall(
+            r'(\w+)="([^"]*)"',
+            www_authenticate.split('Bearer ')[-1]
+        ))
+        return (
+            challenge.get('realm', ''),
+            challenge.get('service', ''),
+            challenge.get('scope', ''),
         )
+
+    def _auth_fetch_token(self, realm, service, scope):
+        """
+        get token from realm and cache it
+        with (realm, service, scope) key
+        """
+        get_token_url = self._auth_token_url(realm, service, scope)
         self.display_debug('get token', get_token_url)
-        get_token_response = requests.get(
+        get_token_response = self.session.get(
             get_token_url,
             auth=requests.auth.HTTPBasicAuth(
                 self.auth['login'],
@@ -166,6 +846,25 @@ class Client(object):
         self.display_debug('get token response headers',
                            get_token_response.headers)
 
+        return self._auth_store_token(
+            (realm, service, scope),
+            get_token_response
+        )
+
+    @staticmethod
+    def _auth_token_url(realm, service, scope):
+        return "{realm}?service={service}&scope={scope}".format(
+            realm=realm,
+            service=service,
+            scope=scope,
+        )
+
+    def _auth_store_token(self, key, get_token_response):
+        """
+        cache token of get token response
+        :param key: (realm, service, scope)
+        :return token
+        """
         if get_token_response.status_code != 200:
             self.auth['token'] = ''
             msg = "Get token request: status code error {code}".format(
@@ -173,29 +872,836 @@ class Client(object):
             )
             raise DRegCliException(msg)
 
-        self.auth['token'] = get_token_response.json().get('token', False)
-        if not self.auth['token']:
+        # docker token spec: 'token', oauth2 compatibility: 'access_token'
+        data = get_token_response.json()
+        token = data.get('token') or data.get('access_token') or False
+        self.auth['token'] = token
+        if not token:
             msg = "Get token request: no token found in response"
             raise DRegCliException(msg)
 
-        return self.auth['token']
+        expires_in = data.get('expires_in') or \
+            self.Meta.auth_token_default_expires_in
+        with self._auth_lock:
+            self._auth_tokens[key] = {
+                'token': token,
+                'issued_at': data.get('issued_at', ''),
+                'expires_in': expires_in,
+                # local clock: no skew with registry issued_at
+                'expires_at': time.time() + expires_in,
+            }
 
-    def _auth_decorate_headers(self, headers):
+        return token
+
+    def _auth_decorate_headers(self, headers, token=''):
         """
         decorate headers (auth bearer)
+        :param token: token to use, default to last obtained token
         :return new headers
         :rtype dict
         """
         assert isinstance(headers, dict)
         new_headers = headers.copy()
 
-        if self.auth and self.auth['token']:
+        token = token or self.auth and self.auth['token']
+        if token:
             new_headers['Authorization'] = \
-                self.Meta.auth_bearer_pattern.format(token=self.auth['token'])
+                self.Meta.auth_bearer_pattern.format(token=token)
 
         return new_headers
 
 
+class CircuitBreaker(object):
+    """
+    thread safe circuit breakers per registry host:
+    a host circuit opens when its error rate over last requests reaches
+    threshold, requests fail fast while open, then after a cooldown a probe
+    request is let through (half-open): closed again on its success,
+    reopened on its failure
+    """
+    class Meta:
+        threshold = 0.5  # error rate
+        window = 20  # last requests outcomes per host
+        min_requests = 10  # outcomes before evaluating error rate
+        cooldown = 30.  # seconds open before a probe
+        # registry failures (throttling, 429, left to retries and limiter)
+        error_codes = (500, 502, 503, 504)
+
+    def __init__(self, threshold=None, cooldown=0.):
+        """
+        :param threshold: error rate opening circuit, 0 to disable
+        """
+        super().__init__()
+
+        self.threshold = self.Meta.threshold if threshold is None \
+            else threshold
+        self.cooldown = cooldown or self.Meta.cooldown
+        # host: {'outcomes': deque, 'opened_at': float, 'probing': bool}
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host):
+        return self._hosts.setdefault(host, {
+            'outcomes': collections.deque(maxlen=self.Meta.window),
+            'opened_at': 0.,
+            'probing': False,
+        })
+
+    def is_open(self, host):
+        with self._lock:
+            return bool(self._host_state(host)['opened_at'])
+
+    def available(self, host):
+        """
+        :return True if a request to host would be let through
+            (closed, or half-open without probe in flight)
+        """
+        if not self.threshold:
+            return True
+        with self._lock:
+            state = self._host_state(host)
+            return not state['opened_at'] or not state['probing'] and \
+                time.monotonic() - state['opened_at'] >= self.cooldown
+
+    def retry_in(self, host):
+        """
+        :return seconds before a probe request to host could be let through
+            (0 if closed, or half-open)
+        """
+        if not self.threshold:
+            return 0.
+        with self._lock:
+            state = self._host_state(host)
+            if not state['opened_at']:
+                return 0.
+            return max(
+                state['opened_at'] + self.cooldown - time.monotonic(),
+                0.
+            )
+
+    def before(self, host):
+        """
+        before a request to host
+        :return probe token: True if request is the half-open probe, to
+            pass to record (or release_probe)
+        :rtype bool
+        :raise CircuitOpenError: open circuit, or half-open with probe
+            in flight
+        """
+        if not self.threshold:
+            return False
+        with self._lock:
+            state = self._host_state(host)
+            if not state['opened_at']:
+                return False
+            if not state['probing'] and \
+                    time.monotonic() - state['opened_at'] >= self.cooldown:
+                state['probing'] = True  # half-open: this request probes
+                return True
+        error = CircuitOpenError(
+            "Circuit open for {host}: registry failing".format(host=host)
+        )
+        error.host = host
+        raise error
+
+    def record(self, host, status_code, probe=False):
+        """
+        record request outcome
+        :param status_code: response status code, 0 for a connection error
+        :param probe: probe token of request, see before: only the probe
+            outcome closes or reopens an open circuit
+        :return True if circuit opened by this outcome
+        """
+        if not self.threshold:
+            return False
+
+        failed = not status_code or status_code in self.Meta.error_codes
+        with self._lock:
+            state = self._host_state(host)
+            if state['opened_at']:
+                if not probe:
+                    return False  # request sent before opening
+                state['probing'] = False
+                if failed:
+                    state['opened_at'] = time.monotonic()  # reopen
+                else:
+                    state['opened_at'] = 0.  # close
+                    state['outcomes'].clear()
+                return False
+
+            state['outcomes'].append(failed)
+            outcomes = state['outcomes']
+            if len(outcomes) >= self.Meta.min_requests and \
+                    sum(outcomes) >= self.threshold * len(outcomes):
+                state['opened_at'] = time.monotonic()
+                outcomes.clear()
+                return True
+        return False
+
+    def release_probe(self, host, probe):
+        """
+        request not sent or cancelled, without outcome: a probe is let
+        through again
+        :param probe: probe token of request, see before
+        """
+        if not probe:
+            return
+        with self._lock:
+            self._host_state(host)['probing'] = False
+
+
+class ReadRouter(object):
+    """
+    thread safe balancing of read requests across read replicas:
+    replica with least latency (EWMA) weighted by its requests in flight,
+    replicas with an open circuit skipped (unhealthy)
+    """
+    class Meta:
+        verbs = ('GET', 'HEAD')
+        ewma_alpha = 0.3
+        # seconds added to a failed request latency
+        failure_penalty = 1.
+
+    def __init__(self, urls, breaker):
+        """
+        :param urls: replicas urls
+        :param breaker: CircuitBreaker (replicas health)
+        """
+        super().__init__()
+
+        assert urls
+        assert isinstance(breaker, CircuitBreaker)
+
+        self.urls = [url.rstrip('/') for url in urls]
+        self.breaker = breaker
+        self._latencies = {url: 0. for url in self.urls}
+        self._in_flight = {url: 0 for url in self.urls}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """
+        :return replica url, '' if none healthy
+        """
+        with self._lock:
+            urls = [
+                url for url in self.urls
+                if self.breaker.available(Client._host(url))
+            ]
+            if not urls:
+                return ''
+            # not yet measured replicas (0. latency) tried first
+            return min(urls, key=lambda url: (
+                self._latencies[url] * (self._in_flight[url] + 1),
+                self._in_flight[url]
+            ))
+
+    def _url(self, request_url):
+        for url in self.urls:
+            if request_url.startswith(url):
+                return url
+        return ''
+
+    def start(self, request_url):
+        url = self._url(request_url)
+        if url:
+            with self._lock:
+                self._in_flight[url] += 1
+
+    def cancel(self, request_url):
+        """request not sent or cancelled: no latency sample"""
+        url = self._url(request_url)
+        if url:
+            with self._lock:
+                self._in_flight[url] -= 1
+
+    def done(self, request_url, latency, status_code):
+        """
+        :param status_code: response status code, 0 for a connection error
+        """
+        url = self._url(request_url)
+        if not url:
+            return
+
+        if not status_code or status_code in CircuitBreaker.Meta.error_codes:
+            latency += self.Meta.failure_penalty
+        with self._lock:
+            self._in_flight[url] -= 1
+            previous = self._latencies[url]
+            self._latencies[url] = latency if not previous else \
+                previous + self.Meta.ewma_alpha * (latency - previous)
+
+
+class TimeoutHTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    HTTPAdapter applying client timeouts to requests without explicit one
+    (token requests included)
+    """
+    def __init__(self, timeout, *args, **kwargs):
+        """
+        :param timeout: callable returning (connect, read) timeouts
+        """
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(
+            request,
+            timeout=timeout or self.timeout(),
+            **kwargs
+        )
+
+
+class Deadline(object):
+    """run level time budget"""
+    def __init__(self, seconds):
+        super().__init__()
+
+        assert seconds > 0
+
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        """:rtype float seconds"""
+        return self.expires_at - time.monotonic()
+
+    def check(self, wait=0.):
+        """
+        :param wait: seconds to wait before next request
+        :return remaining seconds
+        :raise DeadlineExceeded
+        """
+        remaining = self.remaining()
+        if remaining <= wait:
+            raise DeadlineExceeded(
+                "Deadline exceeded ({duration})".format(
+                    duration=Tools.format_duration(self.seconds)
+                )
+            )
+        return remaining
+
+
+class RetryPolicy(object):
+    """
+    retry of transient failures (throttling, unavailable registry,
+    connection errors) of idempotent requests:
+    exponential backoff with full jitter, or server Retry-After delay
+    """
+    class Meta:
+        retries = 3
+        backoff = 0.5  # seconds, max delay of first retry
+        backoff_max = 30.  # seconds, max delay (Retry-After included)
+        status_codes = (429, 502, 503, 504)
+        # DELETE idempotent: a manifest deleted by an attempt whose response
+        # was lost answers 404 to next one (see Client._check_response)
+        verbs = ('GET', 'HEAD', 'DELETE')
+        retry_after_header = 'Retry-After'
+
+    def __init__(self, retries=None, backoff=0., backoff_max=0.):
+        """
+        :param retries: max retries of a request, 0 to disable
+        """
+        super().__init__()
+
+        assert retries is None or isinstance(retries, int)
+
+        self.retries = self.Meta.retries if retries is None else retries
+        self.backoff = backoff or self.Meta.backoff
+        self.backoff_max = backoff_max or self.Meta.backoff_max
+
+    def should_retry(self, verb, attempt, status_code=0):
+        """
+        :param attempt: retries already done
+        :param status_code: response status code, 0 for a connection error
+        :rtype bool
+        """
+        return attempt < self.retries and verb in self.Meta.verbs and \
+            (not status_code or status_code in self.Meta.status_codes)
+
+    def delay(self, attempt, response=None):
+        """
+        delay before retry: response Retry-After if any, else exponential
+        backoff with full jitter (workers retries spread out)
+        :rtype float seconds
+        """
+        retry_after = None if response is None else \
+            self._retry_after(response)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(
+            0,
+            min(self.backoff_max, self.backoff * 2 ** attempt)
+        )
+
+    def _retry_after(self, response):
+        """
+        Retry-After header delay: seconds or http date
+        :rtype float or None
+        """
+        value = response.headers.get(self.Meta.retry_after_header, '')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.)
+        except ValueError:
+            pass
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(date.timestamp() - time.time(), 0.)
+
+
+class TokenBucket(object):
+    """
+    thread safe token bucket: requests rate limit shared by workers
+    (a token per request, refilled at rate tokens per second)
+    """
+    def __init__(self, rate, burst=1):
+        """
+        :param rate: requests per second
+        :param burst: max requests sent at once after idle time
+        """
+        super().__init__()
+
+        assert rate > 0
+        assert burst >= 1
+
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        take a token, in advance if bucket empty: next callers queued
+        behind already reserved tokens
+        :return seconds to wait before sending request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            self._tokens -= 1.
+            return self._tokens < 0 and -self._tokens / self.rate or 0.
+
+
+class LatencyTracker(object):
+    """
+    thread safe latencies of last requests (sliding window),
+    for percentiles
+    """
+    def __init__(self, window=100):
+        super().__init__()
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._latencies)
+
+    def add(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, percent):
+        """
+        :param percent: 0-100
+        :return latency, 0. if none tracked
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return 0.
+        index = int(round(percent / 100. * (len(latencies) - 1)))
+        return latencies[index]
+
+
+class AdaptiveLimiter(object):
+    """
+    thread safe AIMD limit of requests in flight:
+    additive increase (about +1 per limit requests) while p95 latency holds
+    steady, multiplicative decrease on throttling (429, 5xx, connection
+    error) or p95 latency rising over its lowest observed value
+    """
+    class Meta:
+        initial_limit = 2
+        min_limit = 1
+        max_limit = 64
+        decrease_factor = 0.5
+        # p95 over lowest p95 ratio considered as congestion
+        latency_tolerance = 2.
+        # latencies tracked before detecting latency congestion
+        latency_warmup = 20
+        latency_window = 100
+        throttle_codes = (429, 500, 502, 503, 504)
+
+    def __init__(self, initial_limit=0, min_limit=0, max_limit=0):
+        super().__init__()
+
+        self.min_limit = min_limit or self.Meta.min_limit
+        self.max_limit = max(max_limit or self.Meta.max_limit, self.min_limit)
+        self._limit = float(min(
+            max(initial_limit or self.Meta.initial_limit, self.min_limit),
+            self.max_limit
+        ))
+        self.in_flight = 0
+        self.latencies = LatencyTracker(window=self.Meta.latency_window)
+        self.latency_p95 = 0.
+        self._latency_p95_base = 0.
+        self._last_decrease = 0.
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def acquire(self):
+        """wait for a free slot"""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def cancel(self):
+        """release slot of a request not sent or cancelled, limit kept"""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def release(self, latency, status_code=0):
+        """
+        release slot and adapt limit from request outcome
+        :param latency: request duration in seconds
+        :param status_code: response status code, 0 for a connection error
+        """
+        with self._condition:
+            self.in_flight -= 1
+
+            if not status_code or status_code in self.Meta.throttle_codes:
+                self._decrease()
+            else:
+                self.latencies.add(latency)
+                self.latency_p95 = self.latencies.percentile(95)
+                if len(self.latencies) >= self.Meta.latency_warmup:
+                    if not self._latency_p95_base or \
+                            self.latency_p95 < self._latency_p95_base:
+                        self._latency_p95_base = self.latency_p95
+                if self._latency_p95_base and self.latency_p95 > \
+                        self._latency_p95_base * self.Meta.latency_tolerance:
+                    if self.limit > self.min_limit:
+                        self._decrease()
+                    else:
+                        # slow even unloaded: registry new normal
+                        self._latency_p95_base = self.latency_p95
+                else:
+                    self._limit = min(self._limit + 1. / self._limit,
+                                      float(self.max_limit))
+
+            self._condition.notify_all()
+
+    def _decrease(self):
+        """
+        multiplicative decrease, once per p95 latency period:
+        failures of requests already in flight at first one not counted
+        """
+        now = time.monotonic()
+        if now - self._last_decrease < self.latency_p95:
+            return
+        self._last_decrease = now
+        self._limit = max(self._limit * self.Meta.decrease_factor,
+                          float(self.min_limit))
+
+
+class Stats(object):
+    """thread safe counters of client activity"""
+    def __init__(self):
+        super().__init__()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set(self, name, value):
+        with self._lock:
+            self._counters[name] = value
+
+    def get(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+class Memo(object):
+    """
+    thread safe memoization: value computed once per key,
+    concurrent getters of a key being computed wait for its value
+    """
+    def __init__(self):
+        super().__init__()
+        self._values = {}
+        self._lock = threading.Lock()
+        self._keys_locks = {}
+
+    def get(self, key, func):
+        """
+        :param func: callable without argument computing key value
+        """
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._keys_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._values:  # computed while waiting
+                    return self._values[key]
+            value = func()
+            with self._lock:
+                self._values[key] = value
+                self._keys_locks.pop(key, None)
+
+        return value
+
+
+class DiskCache(object):
+    """
+    persistent on-disk cache of json data
+    size-bounded with least recently used entries eviction,
+    optional time to live (seconds) of entries
+    designed for immutable content addressed by digest (blobs, manifests)
+    """
+    class Meta:
+        max_size = 256 * 1024 * 1024  # bytes
+        # eviction down to this ratio of max size: no cache walk per write
+        # once full
+        evict_ratio = 0.9
+        dirname = 'dregcli'
+        env_cache_home = 'XDG_CACHE_HOME'
+
+    def __init__(self, path, max_size=0, ttl=0):
+        super().__init__()
+
+        assert isinstance(path, str) and path
+        assert isinstance(max_size, int)
+        assert isinstance(ttl, (int, float))
+
+        self.path = path
+        self.max_size = max_size or self.Meta.max_size
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._size = None  # computed at first write
+
+    @classmethod
+    def default_path(cls):
+        return os.path.join(
+            os.environ.get(cls.Meta.env_cache_home) or
+            os.path.join(os.path.expanduser('~'), '.cache'),
+            cls.Meta.dirname
+        )
+
+    def _entry_path(self, namespace, key):
+        hexdigest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, namespace, hexdigest[:2], hexdigest)
+
+    def _entries(self):
+        """:return [(mtime, size, path)]"""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:  # evicted meanwhile
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def get(self, namespace, key):
+        """
+        :return cached data or None if no entry (or entry expired)
+        """
+        path = self._entry_path(namespace, key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('key') != key:  # hash collision
+            return None
+        if self.ttl and time.time() > entry.get('stored_at', 0) + self.ttl:
+            self.delete(namespace, key)
+            return None
+
+        try:
+            os.utime(path)  # most recently used
+        except OSError:
+            pass
+        return entry.get('data')
+
+    def set(self, namespace, key, data):
+        path = self._entry_path(namespace, key)
+        content = json.dumps({
+            'key': key,
+            'stored_at': time.time(),
+            'data': data,
+        })
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced_size = os.stat(path).st_size  # entry overwritten
+        except OSError:
+            replaced_size = 0
+        # atomic write: concurrent writers and readers of same entry
+        tmp_path = '{path}.{pid}.{thread}.tmp'.format(
+            path=path,
+            pid=os.getpid(),
+            thread=threading.get_ident()
+        )
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry[1] for entry in self._entries())
+            else:
+                self._size += len(content) - replaced_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def delete(self, namespace, key):
+        try:
+            os.remove(self._entry_path(namespace, key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """
+        remove least recently used entries down to Meta.evict_ratio of max
+        size
+        """
+        entries = sorted(self._entries())
+        self._size = sum(entry[1] for entry in entries)
+        low_watermark = self.max_size * self.Meta.evict_ratio
+        for _, size, path in entries:
+            if self._size <= low_watermark:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+
+
+class Journal(object):
+    """
+    append-only write-ahead journal (json lines) of a mass deletion:
+    the plan is written (and fsynced) before any DELETE, then deleted
+    references, fsynced by batches. an interrupted deletion resumes from
+    the plan minus confirmed references, without repository rescan.
+    (references deleted after last fsync are deleted again: 404)
+    """
+    class Meta:
+        fsync_batch = 50  # records
+        fsync_interval = 1.  # seconds
+
+    def __init__(self, path, fsync_batch=0, fsync_interval=0.):
+        super().__init__()
+
+        assert isinstance(path, str) and path
+        assert isinstance(fsync_batch, int)
+        assert isinstance(fsync_interval, (int, float))
+
+        self.path = path
+        self.fsync_batch = fsync_batch or self.Meta.fsync_batch
+        self.fsync_interval = fsync_interval or self.Meta.fsync_interval
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0  # records written since last fsync
+        self._synced_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @classmethod
+    def read(cls, path):
+        """
+        :rtype tuple
+        :return plan (last one, None if no plan), done references since plan
+            (reference: error, empty if deleted)
+        """
+        plan = None
+        done = collections.OrderedDict()
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:  # torn last record (interrupted)
+                        continue
+                    if 'plan' in record:
+                        plan = record['plan']
+                        done = collections.OrderedDict()
+                    elif 'reference' in record:
+                        done[record['reference']] = record.get('error', '')
+        except OSError as e:
+            raise DRegCliException(
+                "Journal {path}: {error}".format(path=path, error=e)
+            )
+        return plan, done
+
+    def write_plan(self, plan):
+        """
+        :param plan: plan dict (tags to delete), synced before returning
+        """
+        self._write({'plan': plan}, sync=True)
+
+    def done(self, reference, error=''):
+        """
+        record a DELETE result
+        :param error: error message, empty if deleted
+        """
+        self._write({'reference': reference, 'error': error})
+
+    def _write(self, record, sync=False):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            self._file.write(json.dumps(record) + "\n")
+            self._pending += 1
+            if sync or self._pending >= self.fsync_batch or \
+                    time.monotonic() - self._synced_at >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+
 class RegistryComponent(object):
     def __init__(self, client, name, digest='', data=dict()):
         super().__init__()
@@ -221,6 +1727,9 @@ class RegistryComponent(object):
 class Repository(RegistryComponent):
     class Meta:
         tags_list = 'tags/list'
+        tags = 'tags'  # tags cache namespace
+        snapshots = 'snapshots'  # repositories snapshots cache namespace
+        snapshot_date_format = '%Y-%m-%dT%H:%M:%S.%f'
 
         manifests = 'manifests'
         manifests_headers = {
@@ -230,74 +1739,270 @@ class Repository(RegistryComponent):
 
         blobs = 'blobs'
 
-    def tags(self):
+        # tag delete (DELETE manifests/<tag>) status codes of registries
+        # only deleting by digest
+        tag_delete_unsupported_codes = (400, 405)
+        tag_delete_probe_prefix = 'dregcli-probe-'
+
+    def tags(self, page_size=0, prefix=''):
         """
         :return list of tags (each tag an str)
         """
-        url = str(
+        return list(self.iter_tags(page_size=page_size, prefix=prefix))
+
+    def iter_tags(self, page_size=0, prefix=''):
+        """
+        iterate over tags, page per page
+        :param page_size: tags per page (registry default if 0)
+        :param prefix: only tags starting with prefix, example: 'release-'
+        :return generator of tags (each tag an str)
+        """
+        return self.client._paginate(self._tags_list_url(), 'tags',
+                                     page_size=page_size, prefix=prefix)
+
+    def _tags_list_url(self):
+        return str(
             Path(self.client.url) /
             Client.Meta.api_version /
             self.name /
             self.Meta.tags_list
         )
 
-        response = self.client._request(url, headers={})
-        return response.json().get("tags", []) or []
-
-    def get_tags_by_date(self):
+    def get_tags_by_date(self, concurrency=1, page_size=0, prefix=''):
         """
         get and sort image by descending date
+        :param concurrency: number of tags images fetched concurrently
+        :param page_size: see iter_tags
+        :param prefix: see iter_tags
         :return [{'date': datetime, 'tag': '', 'image': Image}]
+        :raise DeadlineExceeded: with partial tags data (tags scanned before
+            deadline)
         """
+        snapshot = self._load_snapshot()
+
+        def get_tag_data(tag):
+            entry = snapshot and snapshot.get(tag)
+            digest = entry and self.tag_digest(tag) or ''
+            if entry and digest == entry['digest']:
+                # tag not moved since snapshot: no manifest, no blob
+                image = self._new_snapshot_image(tag, entry)
+            else:
+                # moved tag digest already known: not revalidated
+                image = digest and self.image(tag, digest=digest) or \
+                    self.image(tag)
+            return {
+                'tag': tag,
+                'image': image,
+                'date': image.get_date(),
+            }
+
+        # tags order kept whatever the concurrency: deterministic sort
+        # images of a tags page fetched while next pages are requested
+        try:
+            images = self.client.map(
+                get_tag_data,
+                self.iter_tags(page_size=page_size, prefix=prefix),
+                concurrency=concurrency
+            )
+        except DeadlineExceeded as e:
+            e.partial = self._sort_tags_by_date(e.partial or [])
+            raise
+        self._save_snapshot(snapshot, images, prefix=prefix)
+
+        return self._sort_tags_by_date(images)
+
+    def get_tags_by_date_by_digest(self, concurrency=1, page_size=0,
+                                   prefix=''):
+        """
+        get_tags_by_date from tags digests (HEAD, without manifest):
+        manifest and config blob fetched once per distinct digest
+        :return see get_tags_by_date
+        :raise DeadlineExceeded: see get_tags_by_date
+        """
+        snapshot = self._load_snapshot()
+        snapshot_digests = self._snapshot_digests(snapshot)
+
+        def get_tag_digest(tag):
+            return tag, self.tag_digest(tag)
+
+        def get_dated_image(digest):
+            if digest in snapshot_digests:
+                return self._new_snapshot_image(digest,
+                                                snapshot_digests[digest])
+            image = self.image(digest)
+            image.get_date()
+            return image
+
+        try:
+            tags_digests = self.client.map(
+                get_tag_digest,
+                self.iter_tags(page_size=page_size, prefix=prefix),
+                concurrency=concurrency
+            )
+        except DeadlineExceeded as e:
+            # no tag dated yet
+            e.partial = []
+            raise
+        digests = list(dict.fromkeys(digest for _, digest in tags_digests))
+        try:
+            images = dict(zip(digests, self.client.map(
+                get_dated_image,
+                digests,
+                concurrency=concurrency
+            )))
+        except DeadlineExceeded as e:
+            # tags of digests dated before deadline
+            images = {image.digest: image for image in e.partial or []}
+            e.partial = self._sort_tags_by_date(
+                self._digests_tags_data(tags_digests, images)
+            )
+            raise
+
+        tags_data = self._digests_tags_data(tags_digests, images)
+        self._save_snapshot(snapshot, tags_data, prefix=prefix)
+        return self._sort_tags_by_date(tags_data)
+
+    def _digests_tags_data(self, tags_digests, images):
+        """
+        tags data of tags digests dated images
+        :param tags_digests: [(tag, digest)]
+        :param images: dated image per digest, tags of digests not in are
+            skipped
+        """
+        return [
+            self._digest_tag_data(tag, images[digest])
+            for tag, digest in tags_digests if digest in images
+        ]
+
+    def _digest_tag_data(self, tag, digest_image):
+        """
+        tag data of tag from (dated) image of its digest
+        """
+        image = self._new_image(tag, digest_image.digest, digest_image.data)
+        image.layers_key = digest_image.layers_key
+        image.date = digest_image.date
+        return {
+            'tag': tag,
+            'image': image,
+            'date': image.date,
+        }
+
+    def _snapshot_key(self):
+        """repository snapshot cache key"""
+        return "{url}/{name}".format(url=self.client.url, name=self.name)
+
+    def _load_snapshot(self):
+        """
+        repository snapshot of last scan, if client snapshot enabled
+        (persistent cache required)
+        :rtype dict or None
+        :return tag: {'digest': '', 'layers_key': '', 'date': ''}
+        """
+        if not self.client.snapshot or not self.client.cache:
+            return None
+        return self.client.cache.get(self.Meta.snapshots,
+                                     self._snapshot_key()) or {}
+
+    @staticmethod
+    def _snapshot_digests(snapshot):
+        """:return digest: snapshot entry"""
+        return {entry['digest']: entry for entry in (snapshot or {}).values()}
+
+    def _new_snapshot_image(self, tag, entry):
+        """
+        image of snapshot entry: digest, layers key and date,
+        without manifest data
+        """
+        image = self._new_image(tag, entry['digest'], {})
+        image.layers_key = entry['layers_key']
+        image.date = datetime.datetime.strptime(
+            entry['date'],
+            self.Meta.snapshot_date_format
+        )
+        return image
+
+    def _save_snapshot(self, snapshot, tags_data, prefix=''):
+        """
+        merge scanned tags in snapshot: tags listed again replaced,
+        tags not listed anymore (of prefix) removed
+        :param snapshot: see _load_snapshot, None if disabled
+        :param tags_data: see get_tags_by_date
+        """
+        if snapshot is None:
+            return
+
+        merged = {
+            tag: entry for tag, entry in snapshot.items()
+            if prefix and not tag.startswith(prefix)
+        }
+        for tag_data in tags_data:
+            image = tag_data['image']
+            if image.date:
+                merged[tag_data['tag']] = {
+                    'digest': image.digest,
+                    'layers_key': image.get_layers_key(),
+                    'date': image.date.strftime(
+                        self.Meta.snapshot_date_format
+                    ),
+                }
+        self.client.cache.set(self.Meta.snapshots, self._snapshot_key(),
+                              merged)
+
+    @staticmethod
+    def _sort_tags_by_date(tags_data):
+        """see get_tags_by_date"""
         def cmp_by_date_desc(x, y):
             # descending order
             date_x = x['date']
             date_y = y['date']
             return 1 if date_x < date_y else -1
 
-        images = []
-        for tag in self.tags():
-            image = self.image(tag)
-            images.append({
-                'tag': tag,
-                'image': image,
-                'date': image.get_date(),
-            })
-
-        return sorted(images, key=functools.cmp_to_key(cmp_by_date_desc))
+        return sorted(tags_data, key=functools.cmp_to_key(cmp_by_date_desc))
 
-    def group_tags(self):
+    def group_tags(self, concurrency=1, page_size=0, prefix='',
+                   by_digest=False):
         """
         group tags and return them per common layer(s)
         cotags is a list of tags that share the same layer of current item tag
+        :param concurrency: see get_tags_by_date
+        :param page_size: see iter_tags
+        :param prefix: see iter_tags, IMPORTANT: cotags are only searched
+            in tags of prefix
+        :param by_digest: fast mode, group tags by manifest digest (HEAD),
+            see get_tags_by_date_by_digest: cotags are tags of same manifest
         :rtype tuple (
-            dict (key: layers digests compose key),
+            dict (key: layers digests compose key, or manifest digest),
             [{'date': datetime, 'tag': '', 'image': Image,
              'cotags': ['lastest']}]
         )
             (for tags_by_date see get_tags_by_date() return)
+        :raise DeadlineExceeded: with partial groups (of tags scanned before
+            deadline)
         """
-        def get_layers_digests_compose_key(image):
-            digests = []
-
-            if image.schema_version == 1:
-                # API V2 schema 1
-                for layer in image.data['fsLayers']:
-                    digests.append(layer['blobSum'])
-            else:
-                # API V2 schema 2
-                for layer in image.data['layers']:
-                    digests.append(layer['digest'])
-
-            return '/'.join(sorted(digests))
+        get_tags_by_date = by_digest and self.get_tags_by_date_by_digest \
+            or self.get_tags_by_date
+        try:
+            tags_by_date = get_tags_by_date(
+                concurrency=concurrency,
+                page_size=page_size,
+                prefix=prefix
+            )
+        except DeadlineExceeded as e:
+            e.partial = self._group_tags_data(e.partial or [],
+                                              by_digest=by_digest)
+            raise
+        return self._group_tags_data(tags_by_date, by_digest=by_digest)
 
+    @staticmethod
+    def _group_tags_data(tags_by_date, by_digest=False):
+        """see group_tags"""
         groups = {}
-        tags_by_date = self.get_tags_by_date()
 
         # group by common layer
         for tag_data in tags_by_date:
-            group_key = get_layers_digests_compose_key(tag_data['image'])
-            groups.setdefault(group_key, []).append(tag_data['image'])
+            image = tag_data['image']
+            group_key = by_digest and image.digest or image.get_layers_key()
+            groups.setdefault(group_key, []).append(image)
 
         # per tag dispatch co-tags (in common layer)
         tag_cotags = {}
@@ -325,9 +2030,10 @@ class Repository(RegistryComponent):
         tags_date = []
 
         for key in groups:
+            image = groups[key][0]
             tags_date.append([
                 [result_tag and img.tag or img for img in groups[key]],
-                groups[key][0].get_date()
+                image.date or image.get_date()  # already dated when grouped
             ])
 
         return sorted(tags_date, key=itemgetter(1), reverse=True)
@@ -357,24 +2063,26 @@ class Repository(RegistryComponent):
 
         return filtered_tags
 
-    def image(self, tag):
-        """
-        get image data from tag
-        :rtype Image
-        """
-        assert isinstance(tag, str)
+    def _tag_key(self, tag):
+        """tag cache key"""
+        return "{url}/{name}:{tag}".format(
+            url=self.client.url,
+            name=self.name,
+            tag=tag
+        )
 
-        url = str(
+    def _manifest_url(self, reference):
+        """:param reference: tag or manifest digest"""
+        return str(
             Path(self.client.url) /
             Client.Meta.api_version /
             self.name /
             self.Meta.manifests /
-            tag
+            reference
         )
-        headers = self.Meta.manifests_headers  # important: accept header
-        response = self.client._request(url, headers=headers)
 
-        # image digest: grap the image digest from the header response
+    def _response_digest(self, response):
+        """image digest: grap the image digest from the header response"""
         digest = response.headers.get(
             self.Meta.manifest_response_header_digest,
             False
@@ -384,13 +2092,204 @@ class Repository(RegistryComponent):
                 digest_header=self.Meta.manifest_response_header_digest
             )
             raise DRegCliException(msg)
+        return digest
+
+    def tag_digest(self, tag):
+        """
+        get image manifest digest from tag, without manifest download
+        :rtype str
+        """
+        assert isinstance(tag, str)
+
+        # important: accept header, digest of same manifest than image()
+        headers = self.Meta.manifests_headers
+        response = self.client._request(
+            self._manifest_url(tag),
+            headers=headers,
+            method=self.client.session.head,
+            verb='HEAD'
+        )
+        return self._response_digest(response)
+
+    def supports_tag_delete(self):
+        """
+        detect registry support of OCI tag delete (DELETE manifests/<tag>),
+        probing an unknown tag: 404 if supported, nothing deleted.
+        detected once per client (Client.tag_delete)
+        :rtype bool
+        """
+        if self.client.tag_delete is None:
+            try:
+                self.client._request(
+                    self._tag_delete_probe_url(),
+                    headers=self.Meta.manifests_headers,
+                    method=self.client.session.delete,
+                    verb='DELETE',
+                    expected_code=404
+                )
+                self.client.tag_delete = True
+            except DRegCliException as e:
+                if not self._is_tag_delete_unsupported(e):
+                    raise e
+                self.client.tag_delete = False
+        return self.client.tag_delete
+
+    def _tag_delete_probe_url(self):
+        """manifest url of a tag not in repository"""
+        return self._manifest_url(
+            self.Meta.tag_delete_probe_prefix + uuid.uuid4().hex
+        )
+
+    @classmethod
+    def _is_tag_delete_unsupported(cls, error):
+        """
+        :type error: DRegCliException
+        :rtype bool
+        """
+        return error.status_code in cls.Meta.tag_delete_unsupported_codes
+
+    def delete_tags(self, tags, concurrency=1, tag_delete=False):
+        """
+        delete tags with concurrent workers, see delete_images:
+        tags digests resolved with HEAD requests (no manifest download)
+        :param tags: tags names
+        :param tag_delete: OCI tag delete (see supports_tag_delete)
+        :return see delete_images
+        """
+        def get_tag_image(tag):
+            digest = '' if tag_delete else self.tag_digest(tag)
+            return self._new_image(tag, digest, {})
+
+        images = self.client.map(get_tag_image, tags, concurrency=concurrency)
+        return self.delete_images(images, concurrency=concurrency,
+                                  tag_delete=tag_delete)
+
+    def delete_images(self, images, concurrency=1, tag_delete=False,
+                      journal=None, missing_ok=False):
+        """
+        delete images with concurrent workers (rate limited by client, see
+        Client max_delete_rps): a DELETE per distinct manifest digest,
+        deleting all tags of manifest, or per tag with tag_delete.
+        a failed deletion does not stop others
+        :param images: Image list, example: scanned ones of group_tags
+        :param tag_delete: OCI tag delete (see supports_tag_delete)
+        :param journal: Journal recording DELETEs results
+        :param missing_ok: True for a reference not found (404) counted as
+            deleted, example: resumed deletion
+        :rtype collections.OrderedDict
+        :return reference (see delete_reference): error message,
+            empty if deleted. in images order
+        """
+        references = collections.OrderedDict()
+        for image in images:
+            references.setdefault(
+                self.delete_reference(image, tag_delete),
+                image
+            )
+
+        def delete(image):
+            try:
+                if tag_delete:
+                    image.delete_tag()
+                else:
+                    image.delete()
+                error = ''
+            except (DRegCliException,
+                    requests.exceptions.RequestException) as e:
+                error = str(e)  # deadline exceeded included
+                if missing_ok and getattr(e, 'status_code', 0) == 404:
+                    error = ''
+                elif isinstance(e, DeadlineExceeded):
+                    return error  # not sent: not journaled
+            if journal:
+                journal.done(self.delete_reference(image, tag_delete), error)
+            return error
+
+        return collections.OrderedDict(zip(
+            references.keys(),
+            self.client.map(delete, list(references.values()),
+                            concurrency=concurrency)
+        ))
+
+    @staticmethod
+    def delete_reference(image, tag_delete=False):
+        """
+        reference deleted by image deletion: manifest digest, or tag with
+        tag_delete
+        """
+        return tag_delete and image.tag or image.digest
+
+    def image(self, tag, digest=''):
+        """
+        get image data from tag
+        :param tag: tag or manifest digest
+        :param digest: current digest of tag if already resolved (HEAD),
+            see tag_digest: not revalidated
+        :rtype Image
+        """
+        assert isinstance(tag, str)
+        assert isinstance(digest, str)
+
+        if self.client.cache:
+            known_digest = self._known_digest(tag)
+            # tag already seen: revalidate its digest (HEAD), manifest
+            # downloaded only if tag moved to a not cached manifest
+            digest = digest or (known_digest if Tools.is_digest(tag) else
+                                known_digest and self.tag_digest(tag))
+            image = self._cached_image(tag, digest, known_digest)
+            if image:
+                return image
+
+        headers = self.Meta.manifests_headers  # important: accept header
+        response = self.client._request(self._manifest_url(tag),
+                                        headers=headers, hedge=True)
+        return self._response_image(tag, response)
+
+    def _known_digest(self, tag):
+        """
+        cached digest of tag if any
+        (manifest by digest reference: immutable)
+        """
+        if Tools.is_digest(tag):
+            return tag
+        return self.client.cache.get(self.Meta.tags, self._tag_key(tag))
+
+    def _cached_image(self, tag, digest, known_digest):
+        """
+        image from cached manifest if any
+        :param digest: current digest of tag
+        :param known_digest: cached digest of tag
+        :rtype Image or None
+        """
+        cache = self.client.cache
+        data = cache.get(self.Meta.manifests, digest) if digest else None
+        if data is None:
+            return None
+
+        if digest != known_digest:  # tag moved
+            cache.set(self.Meta.tags, self._tag_key(tag), digest)
+        return self._new_image(tag, digest, data)
+
+    def _response_image(self, tag, response):
+        """image from manifest response"""
+        digest = self._response_digest(response)
+        data = response.json()
 
+        cache = self.client.cache
+        if cache:
+            cache.set(self.Meta.manifests, digest, data)
+            if digest != tag:
+                cache.set(self.Meta.tags, self._tag_key(tag), digest)
+
+        return self._new_image(tag, digest, data)
+
+    def _new_image(self, tag, digest, data):
         return Image(
             self.client,
             self.name,
             tag,
             digest=digest,
-            data=response.json()
+            data=data
         )
 
 
@@ -416,6 +2315,7 @@ class Image(RegistryComponent):
             self.display_debug('image config digest', self.config_digest)
 
         self.date = False
+        self.layers_key = ''  # see get_layers_key
 
     def __str__(self):
         return "{name}:{tag}".format(name=self.name, tag=self.tag)
@@ -428,86 +2328,226 @@ class Image(RegistryComponent):
             "%Y-%m-%dT%H:%M:%S.%f"
         )
 
+    def get_layers_key(self):
+        """
+        layers digests compose key
+        (images with same key share same layers)
+        (memoized)
+        """
+        if self.layers_key:
+            return self.layers_key
+
+        digests = []
+
+        if self.schema_version == 1:
+            # API V2 schema 1
+            for layer in self.data['fsLayers']:
+                digests.append(layer['blobSum'])
+        else:
+            # API V2 schema 2
+            for layer in self.data['layers']:
+                digests.append(layer['digest'])
+
+        self.layers_key = '/'.join(sorted(digests))
+        return self.layers_key
+
     def get_date(self):
         """
         get image date from config blob
+        (memoized)
         """
-        if self.schema_version == 1:
-            # API V2 schema 1: we grab date from v1 compatibility history
-            # https://stackoverflow.com/questions/32605556/
-            # how-to-find-the-creation-date-of-an-image-in-a-private-docker
-            # -registry-api-v2
-            history = self.data.get('history', [])
-            # TO NOTE THAT v1Compatibility is a dict encoded as string
-            v1comp_entries = [
-                json.loads(h.get('v1Compatibility', '{}'))
-                for h in history
-            ]
-            dates = [
-                self._parse_date(entry.get('created'))
-                for entry in v1comp_entries
-                if entry.get('created')
-            ]
-            dates.sort()
-#            self.display_debug('dates schema 1', str(dates))
+        if self.date:
+            return self.date
 
-            if len(dates):
-                self.date = dates[-1]
+        if self.schema_version == 1:
+            self.date = self._get_history_date()
 
         elif self.schema_version > 1:
             # API V2 schema 2: we grab date from config digest blob data
             # https://github.com/docker/distribution/issues/1995
-
-            url = str(
-                Path(self.client.url) /
-                Client.Meta.api_version /
-                self.name /
-                Repository.Meta.blobs /
-                self.config_digest
+            # config blob shared by images (cotags, same build):
+            # fetched once per client
+            self.date = self.client._configs_dates.get(
+                self.config_digest,
+                self._get_config_date
             )
 
-            # important: accept header
-            headers = Repository.Meta.manifests_headers
-            response = self.client._request(
-                url,
-                headers=headers,
-                expected_code=200
-            )
-#           self.display_debug('image {tag} get date schema 2'.format(
-#                tag=self.tag), response.text)
+        return self.date
 
-            created_date = response.json().get('created', False)
-            if not created_date:
-                raise DRegCliException("Image date not found")
+    def _get_history_date(self):
+        """
+        API V2 schema 1: we grab date from v1 compatibility history
+        https://stackoverflow.com/questions/32605556/
+        how-to-find-the-creation-date-of-an-image-in-a-private-docker
+        -registry-api-v2
+        """
+        history = self.data.get('history', [])
+        # TO NOTE THAT v1Compatibility is a dict encoded as string
+        v1comp_entries = [
+            json.loads(h.get('v1Compatibility', '{}'))
+            for h in history
+        ]
+        dates = [
+            self._parse_date(entry.get('created'))
+            for entry in v1comp_entries
+            if entry.get('created')
+        ]
+        dates.sort()
+#        self.display_debug('dates schema 1', str(dates))
+
+        return dates and dates[-1] or False
+
+    def _get_config_date(self):
+        """get image date from config blob (API V2 schema 2)"""
+        data = self._cached_config_blob()
+        if data is None:
+            data = self._get_config_blob()
+            self._cache_config_blob(data)
+        return self._parse_config_date(data)
+
+    def _cached_config_blob(self):
+        cache = self.client.cache
+        return cache and cache.get(Repository.Meta.blobs, self.config_digest)
+
+    def _cache_config_blob(self, data):
+        if self.client.cache:
+            self.client.cache.set(Repository.Meta.blobs, self.config_digest,
+                                  data)
+
+    def _parse_config_date(self, data):
+        created_date = data.get('created', False)
+        if not created_date:
+            raise DRegCliException("Image date not found")
+
+        return self._parse_date(created_date)
+
+    def _config_blob_url(self):
+        return str(
+            Path(self.client.url) /
+            Client.Meta.api_version /
+            self.name /
+            Repository.Meta.blobs /
+            self.config_digest
+        )
 
-            self.date = self._parse_date(created_date)
+    def _get_config_blob(self):
+        """get image config blob data"""
+        # important: accept header
+        headers = Repository.Meta.manifests_headers
+        response = self.client._request(
+            self._config_blob_url(),
+            headers=headers,
+            expected_code=200,
+            hedge=True
+        )
+#       self.display_debug('image {tag} get date schema 2'.format(
+#            tag=self.tag), response.text)
 
-        return self.date
+        return response.json()
 
-    def delete(self):
+    def _manifest_url(self, reference=''):
         """
-        delete image
-        IMPORTANT: all other related tags to image will be removed
+        :param reference: tag or digest, default image digest
         """
-        url = str(
+        return str(
             Path(self.client.url) /
             Client.Meta.api_version /
             self.name /
             Repository.Meta.manifests /
-            self.digest
+            (reference or self.digest)
         )
 
+    def delete(self):
+        """
+        delete image
+        IMPORTANT: all other related tags to image will be removed
+        """
         headers = Repository.Meta.manifests_headers  # important: accept header
-        response = self.client._request(
-            url,
+        self.client._request(
+            self._manifest_url(),
             headers=headers,
-            method=requests.delete,
+            method=self.client.session.delete,
+            verb='DELETE',
+            expected_code=202
+        )
+
+    def delete_tag(self):
+        """
+        delete image tag only (OCI tag delete), other tags of image kept
+        IMPORTANT: registry support required, see
+        Repository.supports_tag_delete, else use delete()
+        """
+        self.client._request(
+            self._manifest_url(self.tag),
+            headers=Repository.Meta.manifests_headers,
+            method=self.client.session.delete,
             verb='DELETE',
             expected_code=202
         )
 
 
 class Tools(object):
+    durations_units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+    @staticmethod
+    def parse_duration(duration):
+        """
+        :param duration: seconds, or with unit, example: '90', '15m', '1h30m'
+        :rtype float seconds
+        :raise ValueError: invalid duration
+        """
+        duration = duration.strip()
+        try:
+            return float(duration)
+        except ValueError:
+            pass
+
+        parts = re.findall(r'(\d+(?:\.\d+)?)([smhd])', duration)
+        if not parts or \
+                ''.join(value + unit for value, unit in parts) != duration:
+            raise ValueError("invalid duration '{duration}'".format(
+                duration=duration
+            ))
+        return float(sum(
+            float(value) * Tools.durations_units[unit]
+            for value, unit in parts
+        ))
+
+    @staticmethod
+    def format_duration(seconds):
+        """example: 900 -> '15m', 90 -> '1m30s'"""
+        seconds = int(seconds)
+        parts = []
+        for unit in ('d', 'h', 'm'):
+            value, seconds = divmod(seconds, Tools.durations_units[unit])
+            if value:
+                parts.append('{value}{unit}'.format(value=value, unit=unit))
+        if seconds or not parts:
+            parts.append('{seconds}s'.format(seconds=seconds))
+        return ''.join(parts)
+
+    @staticmethod
+    def prefix_cursor(prefix):
+        """
+        'last' cursor to list items starting with prefix (lexical order):
+        greatest string below prefix range,
+        example: 'release-' cursor is 'release,' then 'release,~' < 'release-'
+        """
+        assert isinstance(prefix, str) and prefix
+        last_char = prefix[-1]
+        if last_char == '\x00':
+            return prefix[:-1]
+        return prefix[:-1] + chr(ord(last_char) - 1)
+
+    @staticmethod
+    def is_digest(reference):
+        """
+        :return True if reference is a content digest (not a tag)
+            example: sha256:3d2e482b82608d153a374df3357c0291589a61cc194e...
+        """
+        return bool(re.match(r'^[a-z0-9]+(?:[+._-][a-z0-9]+)*:[a-f0-9]{32,}$',
+                             reference))
+
     @staticmethod
     def search(items, regexp_expr, exclude=False):
         """
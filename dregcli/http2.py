@@ -0,0 +1,82 @@
+"""
+HTTP/2 transport of dregcli Client (requires Python 3.7+ and httpx with
+http2 extra)
+
+concurrent requests of client workers (manifests, config blobs) multiplexed
+on a single connection per registry host, instead of a connection each
+"""
+import requests
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from dregcli.dregcli import DRegCliException
+
+
+class Http2Session(object):
+    """
+    requests.Session like transport (get, head, delete, close) over an httpx
+    HTTP/2 client: httpx errors mapped to requests ones (client retries)
+    """
+    def __init__(self, timeout, max_connections=10, keep_alive=True,
+                 **client_kwargs):
+        """
+        :param timeout: callable returning (connect, read) timeouts,
+            see Client._request_timeout
+        :param client_kwargs: extra httpx.Client arguments
+        """
+        if httpx is None:
+            raise DRegCliException(
+                "HTTP/2 transport: httpx[http2] is required"
+            )
+
+        super().__init__()
+        self.timeout = timeout
+        self.headers = {}  # session headers, like requests.Session
+        self._client = httpx.Client(
+            http2=True,
+            follow_redirects=True,  # blobs redirected to storage
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=keep_alive and max_connections or 0
+            ),
+            **client_kwargs
+        )
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def request(self, method, url, headers=None, auth=None):
+        """
+        :param auth: (login, password) or requests.auth.HTTPBasicAuth
+        :rtype httpx.Response
+        """
+        if isinstance(auth, requests.auth.HTTPBasicAuth):
+            auth = (auth.username, auth.password)
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        connect_timeout, read_timeout = self.timeout()
+
+        try:
+            return self._client.request(
+                method,
+                url,
+                headers=request_headers,
+                auth=auth,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+            )
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+    def close(self):
+        self._client.close()
@@ -202,6 +202,7 @@ class TestConsole:
             'sys.argv',
             [
                 'dregcli',
+                '--no-cache',  # exact requests output
                 'image',
                 fixture_registry_url,
                 fixture_repository,
@@ -229,6 +230,7 @@ class TestConsole:
             'sys.argv',
             [
                 'dregcli',
+                '--no-cache',  # exact requests output
                 'image',
                 fixture_registry_url,
                 fixture_repository,
@@ -261,6 +263,7 @@ class TestConsole:
             'sys.argv',
             [
                 'dregcli',
+                '--no-cache',  # exact requests output
                 'image',
                 fixture_registry_url,
                 fixture_repository,
@@ -280,6 +283,7 @@ class TestConsole:
             'sys.argv',
             [
                 'dregcli',
+                '--no-cache',  # exact requests output
                 'image',
                 fixture_registry_url,
                 fixture_repository,
@@ -338,6 +342,7 @@ class TestConsoleImageDelete:
             'sys.argv',
             [
                 'dregcli',
+                '--no-cache',  # exact requests output
                 'image',
                 fixture_registry_url,
                 fixture_repository,
@@ -364,6 +369,7 @@ class TestConsoleImageDelete:
                 'sys.argv',
                 [
                     'dregcli',
+                    '--no-cache',  # exact requests output
                     'image',
                     fixture_registry_url,
                     fixture_repository,
@@ -406,6 +412,7 @@ class TestConsoleImageDelete:
             'sys.argv',
             [
                 'dregcli',
+                '--no-cache',  # exact requests output
                 'image',
                 fixture_registry_url,
                 fixture_repository,
@@ -429,6 +436,7 @@ class TestConsoleImageDelete:
                 'sys.argv',
                 [
                     'dregcli',
+                    '--no-cache',  # exact requests output
                     'image',
                     fixture_registry_url,
                     fixture_repository,
@@ -0,0 +1,394 @@
+import asyncio
+import json
+import os
+import sys
+from unittest import mock
+import pytest
+
+if sys.version_info < (3, 7):
+    # async generators, asyncio.run: not even importable
+    pytest.skip('dregcli.aio requires Python 3.7+', allow_module_level=True)
+pytest.importorskip('aiohttp')
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+)
+from fixtures import (
+    fixture_registry_url,
+    fixture_repository,
+    fixture_tags,
+    fixture_digest,
+    fixture_image_date,
+    fixture_image_date_str,
+    fixture_blob_payload,
+    fixture_auth,
+    fixture_auth_token,
+)
+from dregcli.dregcli import DeadlineExceeded, DRegCliException, Repository
+from dregcli.aio import (
+    AsyncClient,
+    AsyncRepository,
+    AsyncImage,
+    AsyncResponse,
+    AsyncMemo,
+)
+
+
+def response(status_code=200, headers={}, data=None):
+    return AsyncResponse(
+        status_code,
+        headers,
+        json.dumps(data).encode() if data is not None else b''
+    )
+
+
+def manifest(layer, config='config_digest'):
+    return {
+        'schemaVersion': 2,
+        'config': {'digest': config},
+        'layers': [{'digest': layer}],
+    }
+
+
+class TestAsyncClient:
+    @pytest.mark.usefixtures('fixture_registry_url', 'fixture_repository')
+    def test_iter_repositories(self, fixture_registry_url,
+                               fixture_repository):
+        pages = [
+            response(
+                headers={'Link': '</v2/_catalog?last=a&n=1>; rel="next"'},
+                data={'repositories': [fixture_repository]}
+            ),
+            response(data={'repositories': ['other']}),
+        ]
+
+        async def run():
+            async with AsyncClient(fixture_registry_url) as client:
+                with mock.patch.object(
+                    AsyncClient, '_fetch',
+                    side_effect=pages
+                ) as mo_fetch:
+                    repos = await client.repositories(page_size=1)
+            return repos, mo_fetch
+
+        repos, mo_fetch = asyncio.run(run())
+        assert [repo.name for repo in repos] == [fixture_repository, 'other']
+        assert all(isinstance(repo, AsyncRepository) for repo in repos)
+        assert mo_fetch.call_args_list[1][0][1] == \
+            fixture_registry_url + '/v2/_catalog?last=a&n=1'
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_map(self, fixture_registry_url):
+        async def double(item):
+            await asyncio.sleep(0.01 * (3 - item))  # finish in reverse
+            return item * 2
+
+        async def run():
+            async with AsyncClient(fixture_registry_url) as client:
+                return await client.map(double, [0, 1, 2], concurrency=2)
+
+        assert asyncio.run(run()) == [0, 2, 4]
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_map_deadline_partial(self, fixture_registry_url):
+        async def double(item):
+            if item == 2:
+                await asyncio.sleep(0.01)  # items 0 and 1 completed
+                raise DeadlineExceeded('Deadline exceeded (1m)')
+            if item == 3:
+                await asyncio.sleep(1)  # cancelled at deadline
+            return item * 2
+
+        async def run():
+            async with AsyncClient(fixture_registry_url) as client:
+                return await client.map(double, [0, 1, 2, 3], concurrency=3)
+
+        with pytest.raises(DeadlineExceeded) as excinfo:
+            asyncio.run(run())
+        assert excinfo.value.partial == [0, 2]
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_request_cancelled(self, fixture_registry_url):
+        mirror = 'http://mirror:5000'
+
+        async def fetch(verb, url, headers, auth=None):
+            await asyncio.sleep(10)
+
+        async def run():
+            async with AsyncClient(fixture_registry_url,
+                                   read_urls=[mirror]) as client:
+                with mock.patch.object(client, '_fetch', side_effect=fetch):
+                    tasks = [
+                        asyncio.ensure_future(
+                            client._request(fixture_registry_url)
+                        ) for i in range(12)
+                    ]
+                    await asyncio.sleep(0.01)
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                return client
+
+        # cancelled requests: not failures, router slots released
+        client = asyncio.run(run())
+        assert not client.breaker.is_open('mirror:5000')
+        assert not client.stats.get('circuit_opened')
+        assert client.router._in_flight == {mirror: 0}
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_request_status_error(self, fixture_registry_url):
+        async def run():
+            async with AsyncClient(fixture_registry_url) as client:
+                with mock.patch.object(
+                    AsyncClient, '_fetch',
+                    return_value=response(status_code=404)
+                ):
+                    await client._request(fixture_registry_url)
+
+        with pytest.raises(DRegCliException) as excinfo:
+            asyncio.run(run())
+        assert str(excinfo.value) == "Status code error 404"
+        assert excinfo.value.status_code == 404
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_auth',
+        'fixture_auth_token'
+    )
+    def test_auth(self, fixture_registry_url, fixture_auth,
+                  fixture_auth_token):
+        challenge = 'Bearer realm="https://host/token",' \
+            'service="registry",scope="registry:catalog:*"'
+        responses = [
+            response(status_code=401,
+                     headers={'Www-Authenticate': challenge}),
+            response(data={'token': fixture_auth_token}),
+            response(data={'repositories': []}),
+            # same scope: token up front
+            response(data={'repositories': []}),
+        ]
+
+        async def run():
+            async with AsyncClient(fixture_registry_url) as client:
+                client.set_auth(fixture_auth['login'],
+                                fixture_auth['password'])
+                with mock.patch.object(
+                    AsyncClient, '_fetch',
+                    side_effect=responses
+                ) as mo_fetch:
+                    await client.repositories()
+                    await client.repositories()
+            return mo_fetch
+
+        mo_fetch = asyncio.run(run())
+        assert mo_fetch.call_count == 4
+        token_call = mo_fetch.call_args_list[1]
+        assert token_call[0][1] == 'https://host/token?service=registry' \
+            '&scope=registry:catalog:*'
+        assert token_call[1]['auth'].login == fixture_auth['login']
+        expected_auth = 'Bearer {token}'.format(token=fixture_auth_token)
+        for call in mo_fetch.call_args_list[2:]:
+            assert call[0][2]['Authorization'] == expected_auth
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_hedge(self, fixture_registry_url):
+        calls = []
+
+        async def fetch(verb, url, headers, auth=None):
+            calls.append(url)
+            if len(calls) == 1:
+                await asyncio.sleep(5)  # slow primary, cancelled
+            return response(data={'hedge': len(calls) > 1})
+
+        async def run():
+            async with AsyncClient(fixture_registry_url,
+                                   hedge=True) as client:
+                for i in range(AsyncClient.Meta.hedge_min_samples):
+                    client.latencies.add(0.01)
+                client.stats.set('requests', 100)
+                with mock.patch.object(AsyncClient, '_fetch',
+                                       side_effect=fetch):
+                    res = await client._request(fixture_registry_url,
+                                                hedge=True)
+            return client, res
+
+        client, res = asyncio.run(run())
+        assert res.json() == {'hedge': True}
+        assert client.stats.get('hedges_won') == 1
+
+
+class TestAsyncRepository:
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags',
+        'fixture_blob_payload',
+        'fixture_image_date',
+    )
+    def test_group_tags(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        fixture_blob_payload,
+        fixture_image_date,
+    ):
+        # tags 0 and 1 same image, tag 2 other layer of same config
+        tags = fixture_tags[:3]
+        layers = {tags[0]: 'layer_a', tags[1]: 'layer_a', tags[2]: 'layer_b'}
+
+        async def fetch(verb, url, headers, auth=None):
+            if url.endswith('/tags/list'):
+                return response(data={'tags': tags})
+            if '/blobs/' in url:
+                return response(data=fixture_blob_payload)
+            tag = url.split('/')[-1]
+            return response(
+                headers={'Docker-Content-Digest': 'sha256:' + tag},
+                data=manifest(layers[tag])
+            )
+
+        async def run():
+            async with AsyncClient(fixture_registry_url) as client:
+                with mock.patch.object(
+                    AsyncClient, '_fetch',
+                    side_effect=fetch
+                ) as mo_fetch:
+                    repo = AsyncRepository(client, fixture_repository)
+                    groups, tags_by_date = await repo.group_tags()
+            return repo, groups, tags_by_date, mo_fetch
+
+        repo, groups, tags_by_date, mo_fetch = asyncio.run(run())
+        assert sorted(groups.keys()) == ['layer_a', 'layer_b']
+        assert sorted(image.tag for image in groups['layer_a']) == \
+            sorted(tags[:2])
+        assert all(isinstance(image, AsyncImage)
+                   for image in groups['layer_a'])
+        cotags = {data['tag']: data['cotags'] for data in tags_by_date}
+        assert cotags == {tags[0]: [tags[1]], tags[1]: [tags[0]],
+                          tags[2]: []}
+        assert all(data['date'] == fixture_image_date
+                   for data in tags_by_date)
+        # shared config blob fetched once
+        blob_calls = [call for call in mo_fetch.call_args_list
+                      if '/blobs/' in call[0][1]]
+        assert len(blob_calls) == 1
+
+        # images already dated
+        images_dates = repo.group_images_date_desc(groups)
+        assert [date for images, date in images_dates] == \
+            [fixture_image_date] * 2
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags',
+        'fixture_digest',
+    )
+    def test_tag_digest_and_delete(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        fixture_digest,
+    ):
+        responses = [
+            response(headers={'Docker-Content-Digest': fixture_digest}),
+            response(status_code=202),
+        ]
+
+        async def run():
+            async with AsyncClient(fixture_registry_url) as client:
+                with mock.patch.object(
+                    AsyncClient, '_fetch',
+                    side_effect=responses
+                ) as mo_fetch:
+                    repo = AsyncRepository(client, fixture_repository)
+                    digest = await repo.tag_digest(fixture_tags[0])
+                    image = AsyncImage(client, fixture_repository,
+                                       fixture_tags[0], digest=digest)
+                    await image.delete()
+            return digest, mo_fetch
+
+        digest, mo_fetch = asyncio.run(run())
+        assert digest == fixture_digest
+        head, delete = mo_fetch.call_args_list
+        assert head[0][:2] == (
+            'HEAD',
+            '{url}/v2/{repo}/manifests/{tag}'.format(
+                url=fixture_registry_url,
+                repo=fixture_repository,
+                tag=fixture_tags[0]
+            )
+        )
+        assert delete[0][:2] == (
+            'DELETE',
+            '{url}/v2/{repo}/manifests/{digest}'.format(
+                url=fixture_registry_url,
+                repo=fixture_repository,
+                digest=fixture_digest
+            )
+        )
+        assert delete[0][2] == Repository.Meta.manifests_headers
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags',
+    )
+    def test_delete_tags(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+    ):
+        # tags 0 and 1 same manifest
+        digests = {fixture_tags[0]: 'sha256:a', fixture_tags[1]: 'sha256:a',
+                   fixture_tags[2]: 'sha256:b'}
+
+        async def fetch(verb, url, headers, auth=None):
+            reference = url.split('/')[-1]
+            if verb == 'HEAD':
+                return response(
+                    headers={'Docker-Content-Digest': digests[reference]}
+                )
+            return response(status_code=reference == 'sha256:b' and 500
+                            or 202)
+
+        async def run():
+            async with AsyncClient(fixture_registry_url) as client:
+                with mock.patch.object(
+                    AsyncClient, '_fetch',
+                    side_effect=fetch
+                ) as mo_fetch:
+                    repo = AsyncRepository(client, fixture_repository)
+                    results = await repo.delete_tags(fixture_tags[:3])
+            return results, mo_fetch
+
+        results, mo_fetch = asyncio.run(run())
+        assert list(results.items()) == [
+            ('sha256:a', ''),
+            ('sha256:b', 'Status code error 500'),
+        ]
+        delete_calls = [call for call in mo_fetch.call_args_list
+                        if call[0][0] == 'DELETE']
+        assert len(delete_calls) == 2
+
+
+class TestAsyncMemo:
+    def test_get(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'value'
+
+        async def run():
+            memo = AsyncMemo()
+            return await asyncio.gather(
+                *[memo.get('key', compute) for i in range(3)]
+            )
+
+        assert asyncio.run(run()) == ['value'] * 3
+        assert len(calls) == 1
@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+from unittest import mock
+import pytest
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+)
+import tools
+from fixtures import fixture_registry_url, fixture_repository, fixture_tags
+from dregcli.console.apply import ApplyCommandHandler
+from dregcli.console.delete import DeleteCommandHandler
+
+
+class TestApply:
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_plan_apply(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        tmp_path,
+        capsys
+    ):
+        # tags 0 and 1 same manifest
+        tags = fixture_tags[:3]
+        digests = {tags[0]: 'sha256:a', tags[1]: 'sha256:a',
+                   tags[2]: 'sha256:b'}
+        cotags = {tags[0]: [tags[1]], tags[1]: [tags[0]], tags[2]: []}
+        tags_data = []
+        for tag in tags:
+            image = mock.MagicMock(tag=tag, digest=digests[tag], date=False)
+            tags_data.append({'tag': tag, 'cotags': cotags[tag],
+                              'date': None, 'image': image})
+        plan_path = str(tmp_path / 'plan.json')
+
+        # plan: nothing deleted
+        with mock.patch(
+            'dregcli.console.delete.Repository.group_tags',
+            return_value=({}, tags_data)
+        ):
+            DeleteCommandHandler().run(fixture_registry_url,
+                                       fixture_repository, True, all=True,
+                                       plan=plan_path)
+        capsys.readouterr()
+        assert not any(tag_data['image'].delete.called
+                       for tag_data in tags_data)
+        with open(plan_path) as f:
+            plan = json.load(f)
+        assert plan['url'] == fixture_registry_url
+        assert plan['repo'] == fixture_repository
+        assert plan['tags'] == [
+            {'tag': tag, 'digest': digests[tag], 'date': '',
+             'cotags': cotags[tag]}
+            for tag in tags
+        ]
+
+        # apply: tag 2 moved since plan, not deleted; no manifest fetched
+        current_digests = dict(digests)
+        current_digests[tags[2]] = 'sha256:c'
+        with mock.patch(
+            'dregcli.console.delete.Repository.tag_digest',
+            side_effect=current_digests.get
+        ):
+            with mock.patch(
+                'dregcli.console.delete.Repository.image'
+            ) as mo_image:
+                with mock.patch(
+                    'dregcli.console.delete.Image.delete'
+                ) as mo_delete:
+                    deleted = ApplyCommandHandler().run(plan_path, True)
+        mo_image.assert_not_called()
+        mo_delete.assert_called_once_with()  # sha256:a
+        assert deleted == tags[:2]
+        assert tools.get_output_json(capsys) == {
+            'result': [
+                {'tag': tag, 'cotags': cotags[tag]} for tag in tags[:2]
+            ],
+            'errors': [{
+                'reference': 'sha256:b',
+                'tags': [tags[2]],
+                'error': 'changed since plan ({tag}: moved to '
+                         'sha256:c)'.format(tag=tags[2]),
+            }],
+        }
+
+    def test_apply_invalid_plan(self, tmp_path, capsys):
+        plan_path = str(tmp_path / 'plan.json')
+        with open(plan_path, 'w') as f:
+            json.dump({'version': 0}, f)
+
+        ApplyCommandHandler().run(plan_path, True)
+        assert tools.get_output_json(capsys) == {
+            'error': 'Invalid plan {path}: version {version} expected'.format(
+                path=plan_path,
+                version=ApplyCommandHandler.Meta.plan_version
+            )
+        }
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_apply_tag_delete_requested(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        tmp_path,
+        capsys
+    ):
+        tag = fixture_tags[0]
+        plan_path = str(tmp_path / 'plan.json')
+        with open(plan_path, 'w') as f:
+            json.dump({
+                'version': ApplyCommandHandler.Meta.plan_version,
+                'url': fixture_registry_url,
+                'repo': fixture_repository,
+                'tag_delete': 'requested',
+                'tags': [{'tag': tag, 'digest': 'sha256:a', 'date': '',
+                          'cotags': []}],
+            }, f)
+
+        # registry support detected when applying
+        for supported in (True, False):
+            with mock.patch(
+                'dregcli.console.delete.Repository.supports_tag_delete',
+                return_value=supported
+            ) as mo_supports:
+                with mock.patch(
+                    'dregcli.console.delete.Repository.tag_digest',
+                    return_value='sha256:a'
+                ):
+                    with mock.patch(
+                        'dregcli.console.delete.Image.delete_tag'
+                    ) as mo_delete_tag:
+                        with mock.patch(
+                            'dregcli.console.delete.Image.delete'
+                        ) as mo_delete:
+                            deleted = ApplyCommandHandler().run(plan_path,
+                                                                True)
+            mo_supports.assert_called_once_with()
+            assert mo_delete_tag.called == supported
+            assert mo_delete.called == (not supported)
+            assert deleted == [tag]
+            capsys.readouterr()
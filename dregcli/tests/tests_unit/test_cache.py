@@ -0,0 +1,334 @@
+import os
+import sys
+import time
+from unittest import mock
+import pytest
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+)
+from fixtures import (
+    fixture_registry_url,
+    fixture_repository,
+    fixture_repositories,
+    fixture_tags,
+    fixture_digest,
+    fixture_config_payload,
+    fixture_image_date,
+    fixture_image_date_str,
+    fixture_blob_payload,
+    fixture_image_url,
+    fixture_image_json,
+)
+from dregcli.dregcli import Client, DiskCache, Image, Repository
+
+
+class TestDiskCache:
+    @pytest.mark.usefixtures('fixture_digest', 'fixture_blob_payload')
+    def test_get_set(self, tmp_path, fixture_digest, fixture_blob_payload):
+        cache = DiskCache(str(tmp_path))
+        assert cache.get('blobs', fixture_digest) is None
+
+        cache.set('blobs', fixture_digest, fixture_blob_payload)
+        assert cache.get('blobs', fixture_digest) == fixture_blob_payload
+        # namespaced
+        assert cache.get('manifests', fixture_digest) is None
+
+        # persistent
+        cache = DiskCache(str(tmp_path))
+        assert cache.get('blobs', fixture_digest) == fixture_blob_payload
+
+        cache.delete('blobs', fixture_digest)
+        assert cache.get('blobs', fixture_digest) is None
+
+    @pytest.mark.usefixtures('fixture_digest', 'fixture_blob_payload')
+    def test_ttl(self, tmp_path, fixture_digest, fixture_blob_payload):
+        cache = DiskCache(str(tmp_path), ttl=60)
+        cache.set('blobs', fixture_digest, fixture_blob_payload)
+        assert cache.get('blobs', fixture_digest) == fixture_blob_payload
+
+        with mock.patch('time.time', return_value=time.time() + 61):
+            assert cache.get('blobs', fixture_digest) is None
+        # expired entry removed
+        assert cache.get('blobs', fixture_digest) is None
+
+    def test_lru_eviction(self, tmp_path):
+        data = {'created': 'x' * 1000}
+        cache = DiskCache(str(tmp_path), max_size=3600)
+
+        for index in range(3):
+            cache.set('blobs', 'key{index}'.format(index=index), data)
+            # distinct mtimes
+            path = cache._entry_path('blobs', 'key{index}'.format(
+                index=index))
+            os.utime(path, (index, index))
+
+        # key0 used: key1 least recently used
+        assert cache.get('blobs', 'key0') == data
+        cache.set('blobs', 'key3', data)
+
+        assert cache.get('blobs', 'key1') is None
+        assert all(
+            cache.get('blobs', key) == data
+            for key in ('key0', 'key2', 'key3')
+        )
+        assert sum(entry[1] for entry in cache._entries()) <= 3600
+
+    def test_eviction_watermark(self, tmp_path):
+        data = {'created': 'x' * 1000}
+        cache = DiskCache(str(tmp_path), max_size=20000)
+
+        # overwritten entry not counted twice
+        for index in range(50):
+            cache.set('blobs', 'key', data)
+        assert cache._size == sum(entry[1] for entry in cache._entries())
+
+        # full cache: evicted down to low watermark, not walked per write
+        with mock.patch.object(cache, '_entries',
+                               wraps=cache._entries) as mo_entries:
+            for index in range(100):
+                cache.set('blobs', 'key{index}'.format(index=index), data)
+        assert mo_entries.call_count <= 100 // 2
+        assert cache._size <= cache.max_size
+        assert cache._size == sum(entry[1] for entry in cache._entries())
+
+    def test_default_path(self):
+        with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': '/tmp/cache'}):
+            assert DiskCache.default_path() == '/tmp/cache/dregcli'
+
+
+class TestClientCache:
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags',
+        'fixture_digest',
+        'fixture_config_payload',
+        'fixture_image_date',
+        'fixture_blob_payload'
+    )
+    def test_get_date(
+        self,
+        tmp_path,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        fixture_digest,
+        fixture_config_payload,
+        fixture_image_date,
+        fixture_blob_payload
+    ):
+        mock_res = mock.MagicMock()
+        mock_res.json = mock.MagicMock(return_value=fixture_blob_payload)
+        mock_res.status_code = 200
+
+        def get_date():
+            # a new client per run
+            image = Image(
+                Client(fixture_registry_url, cache=DiskCache(str(tmp_path))),
+                fixture_repository,
+                fixture_tags[0],
+                digest=fixture_digest,
+                data=fixture_config_payload
+            )
+            return image.get_date()
+
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
+            assert get_date() == fixture_image_date
+            mo.assert_called_once()
+
+            # next run: from cache
+            mo.reset_mock()
+            assert get_date() == fixture_image_date
+            mo.assert_not_called()
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags',
+        'fixture_digest',
+        'fixture_image_json'
+    )
+    def test_image_by_digest(
+        self,
+        tmp_path,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        fixture_digest,
+        fixture_image_json
+    ):
+        mock_res = mock.MagicMock()
+        mock_res.status_code = 200
+        mock_res.json = mock.MagicMock(return_value=fixture_image_json)
+        mock_res.headers = {
+            Repository.Meta.manifest_response_header_digest: fixture_digest
+        }
+
+        repository = Repository(
+            Client(fixture_registry_url, cache=DiskCache(str(tmp_path))),
+            fixture_repository
+        )
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
+            repository.image(fixture_tags[0])
+            mo.assert_called_once()
+
+            # manifest by digest: from cache
+            mo.reset_mock()
+            image = repository.image(fixture_digest)
+            mo.assert_not_called()
+            assert image.digest == fixture_digest and \
+                image.data == fixture_image_json
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags',
+        'fixture_digest',
+        'fixture_image_url',
+        'fixture_image_json'
+    )
+    def test_image_revalidation(
+        self,
+        tmp_path,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        fixture_digest,
+        fixture_image_url,
+        fixture_image_json
+    ):
+        moved_digest = 'sha256:' + 'a' * 64
+        digest_header = Repository.Meta.manifest_response_header_digest
+        mock_res = mock.MagicMock()
+        mock_res.status_code = 200
+        mock_res.json = mock.MagicMock(return_value=fixture_image_json)
+        mock_res.headers = {digest_header: fixture_digest}
+
+        def image(digest=''):
+            # a new client per run
+            repository = Repository(
+                Client(fixture_registry_url, cache=DiskCache(str(tmp_path))),
+                fixture_repository
+            )
+            return repository.image(fixture_tags[0], digest=digest)
+
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo_get:
+            with mock.patch('requests.Session.head',
+                            return_value=mock_res) as mo_head:
+                # first run: manifest download
+                image()
+                mo_get.assert_called_once()
+                mo_head.assert_not_called()
+
+                # unchanged tag: HEAD only
+                mo_get.reset_mock()
+                img = image()
+                mo_head.assert_called_once_with(
+                    fixture_registry_url + fixture_image_url,
+                    headers=Repository.Meta.manifests_headers
+                )
+                mo_get.assert_not_called()
+                assert img.digest == fixture_digest and \
+                    img.data == fixture_image_json
+
+                # moved tag: HEAD then manifest download
+                mo_head.reset_mock()
+                mock_res.headers = {digest_header: moved_digest}
+                img = image()
+                mo_head.assert_called_once()
+                mo_get.assert_called_once()
+                assert img.digest == moved_digest
+
+                # moved tag now known
+                mo_get.reset_mock()
+                mo_head.reset_mock()
+                assert image().digest == moved_digest
+                mo_head.assert_called_once()
+                mo_get.assert_not_called()
+
+                # digest already resolved: no revalidation
+                mo_head.reset_mock()
+                assert image(digest=moved_digest).digest == moved_digest
+                mo_head.assert_not_called()
+                mo_get.assert_not_called()
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags',
+        'fixture_image_date'
+    )
+    def test_snapshot(
+        self,
+        tmp_path,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        fixture_image_date
+    ):
+        digests = {tag: 'sha256:' + tag for tag in fixture_tags}
+
+        def scan(tags):
+            # a new client per run
+            repository = Repository(
+                Client(fixture_registry_url, cache=DiskCache(str(tmp_path)),
+                       snapshot=True),
+                fixture_repository
+            )
+
+            def image(tag, digest=''):
+                img = Image(repository.client, fixture_repository, tag,
+                            digest=digests[tag],
+                            data={'schemaVersion': 2, 'config': {},
+                                  'layers': [{'digest': 'layer_' + tag}]})
+                img.date = fixture_image_date
+                return img
+
+            with mock.patch.object(repository, 'iter_tags',
+                                   side_effect=lambda **kw: iter(tags)):
+                with mock.patch.object(repository, 'tag_digest',
+                                       side_effect=digests.get) as mo_head:
+                    with mock.patch.object(repository, 'image',
+                                           side_effect=image) as mo_image:
+                        groups, tags_data = repository.group_tags()
+            return groups, tags_data, mo_head, mo_image
+
+        # first run: all manifests fetched
+        tags = fixture_tags[:2]
+        _, _, mo_head, mo_image = scan(tags)
+        mo_head.assert_not_called()
+        assert sorted(call[0][0] for call in mo_image.call_args_list) == \
+            sorted(tags)
+
+        # next run: tag 1 moved, tag 2 new, tag 0 from snapshot (HEAD only)
+        digests[tags[1]] = 'sha256:moved'
+        tags = fixture_tags[:3]
+        groups, tags_data, mo_head, mo_image = scan(tags)
+        assert sorted(call[0][0] for call in mo_head.call_args_list) == \
+            sorted(tags[:2])
+        assert sorted(call[0][0] for call in mo_image.call_args_list) == \
+            sorted(tags[1:])
+        # moved tag digest resolved by snapshot check: single HEAD
+        assert {call[0][0]: call[1].get('digest', '')
+                for call in mo_image.call_args_list} == \
+            {tags[1]: 'sha256:moved', tags[2]: ''}
+        assert sorted(groups.keys()) == sorted('layer_' + tag for tag in tags)
+        assert all(data['date'] == fixture_image_date for data in tags_data)
+        image = [data['image'] for data in tags_data
+                 if data['tag'] == tags[0]][0]
+        assert image.digest == digests[tags[0]]
+
+        # tag 2 removed from registry: removed from snapshot
+        _, _, mo_head, mo_image = scan(tags[:2])
+        mo_image.assert_not_called()
+        snapshot = DiskCache(str(tmp_path)).get(
+            Repository.Meta.snapshots,
+            '{url}/{repo}'.format(url=fixture_registry_url,
+                                  repo=fixture_repository)
+        )
+        assert sorted(snapshot.keys()) == sorted(tags[:2])
+        assert snapshot[tags[1]]['digest'] == 'sha256:moved'
@@ -1,6 +1,9 @@
 import os
 import requests
 import sys
+import threading
+import time
+import urllib.parse
 from unittest import mock
 import pytest
 
@@ -16,7 +19,19 @@ from fixtures import (
     fixture_auth,
     fixture_auth_token
 )
-from dregcli.dregcli import DRegCliException, Client, Repository
+from dregcli.dregcli import (
+    AdaptiveLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    DRegCliException,
+    Client,
+    LatencyTracker,
+    ReadRouter,
+    Repository,
+    RetryPolicy,
+    TokenBucket,
+)
 
 
 @pytest.fixture()
@@ -46,6 +61,74 @@ class TestClient:
         client = Client(fixture_registry_url, verbose=True)
         assert_client(True)
 
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_session(self, fixture_registry_url):
+        client = Client(fixture_registry_url)
+        assert isinstance(client.session, requests.Session)
+        adapter = client.session.get_adapter(fixture_registry_url)
+        assert adapter._pool_maxsize == Client.Meta.pool_maxsize
+        assert 'Connection' not in client.session.headers or \
+            client.session.headers['Connection'] != 'close'
+
+        client = Client(fixture_registry_url, pool_maxsize=32,
+                        keep_alive=False)
+        adapter = client.session.get_adapter(fixture_registry_url)
+        assert adapter._pool_maxsize == 32
+        assert client.session.headers['Connection'] == 'close'
+
+        # context manager: pooled connections released at exit
+        with mock.patch('requests.Session.close') as mo:
+            with Client(fixture_registry_url) as client:
+                assert isinstance(client, Client)
+            mo.assert_called_once_with()
+
+        # same session shared by all requests
+        mock_res = mock.MagicMock()
+        mock_res.status_code = 200
+        client = Client(fixture_registry_url)
+        session = client.session
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
+            client._request(fixture_registry_url)
+            client._request(fixture_registry_url)
+            assert mo.call_count == 2 and client.session is session
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_map(self, fixture_registry_url):
+        client = Client(fixture_registry_url)
+        items = list(range(20))
+        expected = [i * 2 for i in items]
+        assert client.map(lambda i: i * 2, items) == expected
+        assert client.map(lambda i: i * 2, items, concurrency=4) == expected
+        assert client.map(lambda i: i * 2, iter(items), concurrency=4) == \
+            expected
+
+        def fail(i):
+            if i == 3:
+                raise DRegCliException('failed')
+            return i
+
+        with pytest.raises(DRegCliException) as excinfo:
+            client.map(fail, items, concurrency=4)
+        assert str(excinfo.value) == 'failed'
+
+        # items iteration error: queued items not run
+        started = []
+
+        def slow(i):
+            started.append(i)
+            time.sleep(0.05)
+            return i
+
+        def failing_items():
+            yield from items
+            raise DRegCliException('page failed')
+
+        with pytest.raises(DRegCliException) as excinfo:
+            client.map(slow, failing_items(), concurrency=2)
+        assert str(excinfo.value) == 'page failed'
+        assert len(started) <= 2
+
     @pytest.mark.usefixtures('fixture_registry_url')
     def test_debug(self, fixture_registry_url):
         client = Client(fixture_registry_url)
@@ -88,7 +171,8 @@ class TestClient:
         mock_res = mock.MagicMock()
         mock_res.json = mock.MagicMock(return_value=fixture_repositories)
         mock_res.status_code = 200
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             res = client._request(expected_url)
             mo.assert_called_once_with(expected_url, headers=headers)
             assert res.status_code == expected_code and \
@@ -96,7 +180,8 @@ class TestClient:
 
         # headers
         headers = {'foobar': 'foobar2000'}
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             res = client._request(expected_url, headers=headers)
             mo.assert_called_once_with(expected_url, headers=headers)
             assert res.status_code == expected_code and \
@@ -120,7 +205,8 @@ class TestClient:
         # expected_code matching
         expected_code = 202
         mock_res.status_code = expected_code
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             res = client._request(expected_url, expected_code=expected_code)
             mo.assert_called_once_with(
                 expected_url,
@@ -134,7 +220,8 @@ class TestClient:
         other_code = 404    # other result than expected code
         other_code_msg = tools.get_error_status_message(other_code)
         mock_res.status_code = other_code
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             with pytest.raises(DRegCliException) as excinfo:
                 res = client._request(
                     expected_url,
@@ -147,6 +234,7 @@ class TestClient:
                 assert res.status_code == expected_code and \
                     res.json() == fixture_repositories
             assert str(excinfo.value) == other_code_msg
+            assert excinfo.value.status_code == other_code
 
     @pytest.mark.usefixtures(
         'fixture_registry_url',
@@ -162,8 +250,10 @@ class TestClient:
         mock_res = mock.MagicMock()
         mock_res.status_code = 200
         mock_res.json = mock.MagicMock(return_value=fixture_repositories)
+        mock_res.headers = {}  # no Link header: single page
 
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             client = Client(fixture_registry_url, verbose=False)
             repositories = self.repositories(
                 mo,
@@ -178,6 +268,587 @@ class TestClient:
                 [r.name for r in repositories] == expected_repos and \
                 [str(r) for r in repositories] == expected_repos
 
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repositories_url'
+    )
+    def test_iter_repositories(
+        self,
+        fixture_registry_url,
+        fixture_repositories_url
+    ):
+        pages = {
+            fixture_registry_url + fixture_repositories_url + '?n=2': (
+                ['repo-a', 'repo-b'],
+                '</v2/_catalog?last=repo-b&n=2>; rel="next"'
+            ),
+            fixture_registry_url + fixture_repositories_url +
+            '?last=repo-b&n=2': (
+                ['repo-c'],
+                ''
+            ),
+        }
+
+        def get(url, headers={}):
+            res = mock.MagicMock()
+            res.status_code = 200
+            res.json = mock.MagicMock(
+                return_value={'repositories': pages[url][0]}
+            )
+            res.headers = pages[url][1] and {'Link': pages[url][1]} or {}
+            return res
+
+        client = Client(fixture_registry_url, verbose=False)
+        with mock.patch('requests.Session.get', side_effect=get) as mo:
+            repositories = client.iter_repositories(page_size=2)
+            # lazy: no request until iterated
+            mo.assert_not_called()
+            assert str(next(repositories)) == 'repo-a'
+            mo.assert_called_once()
+            assert [str(r) for r in repositories] == ['repo-b', 'repo-c']
+            assert mo.call_count == 2
+
+            mo.reset_mock()
+            assert [str(r) for r in client.repositories(page_size=2)] == \
+                ['repo-a', 'repo-b', 'repo-c']
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repositories_url'
+    )
+    def test_iter_repositories_prefix(
+        self,
+        fixture_registry_url,
+        fixture_repositories_url
+    ):
+        catalog = [
+            'team-,', 'team-a', 'team-a/app', 'team-a/web', 'team-b/app',
+            'team-c/app',
+        ]
+        cursor = 'team-a.'  # team-a/ prefix cursor
+
+        def get(url, headers={}):
+            # registry: 2 items per page after last cursor
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+            last = query['last'][0]
+            items = [item for item in catalog if item > last][:2]
+            res = mock.MagicMock()
+            res.status_code = 200
+            res.json = mock.MagicMock(return_value={'repositories': items})
+            res.headers = {
+                'Link': '</v2/_catalog?last={last}&n=2>; rel="next"'.format(
+                    last=items[-1]
+                )
+            }
+            return res
+
+        client = Client(fixture_registry_url, verbose=False)
+        with mock.patch('requests.Session.get', side_effect=get) as mo:
+            repositories = client.repositories(page_size=2, prefix='team-a/')
+            assert [str(r) for r in repositories] == \
+                ['team-a/app', 'team-a/web']
+            assert mo.call_args_list[0][0][0] == \
+                fixture_registry_url + fixture_repositories_url + \
+                '?' + urllib.parse.urlencode({'n': 2, 'last': cursor})
+            # stopped at first repository out of prefix: no more pages
+            assert mo.call_count == 2
+
+
+def response(status_code, headers={}):
+    res = mock.MagicMock()
+    res.status_code = status_code
+    res.headers = headers
+    return res
+
+
+class TestRetry:
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_retry(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False)
+        with mock.patch('requests.Session.get', side_effect=[
+            response(503),
+            response(429, headers={'Retry-After': '2'}),
+            response(200),
+        ]) as mo:
+            with mock.patch('time.sleep') as mo_sleep:
+                res = client._request(fixture_registry_url)
+        assert res.status_code == 200 and mo.call_count == 3
+        assert mo_sleep.call_count == 2
+        # first: jittered backoff, second: server Retry-After
+        assert 0 <= mo_sleep.call_args_list[0][0][0] <= \
+            RetryPolicy.Meta.backoff
+        assert mo_sleep.call_args_list[1][0][0] == 2.
+        assert client.stats.get('retries') == 2 and \
+            client.stats.get('requests') == 3
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_retry_exhausted(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False,
+                        retry=RetryPolicy(retries=2))
+        with mock.patch('requests.Session.get',
+                        return_value=response(502)) as mo:
+            with mock.patch('time.sleep'):
+                with pytest.raises(DRegCliException) as excinfo:
+                    client._request(fixture_registry_url)
+        assert str(excinfo.value) == 'Status code error 502'
+        assert mo.call_count == 3
+        assert client.stats.get('retries_exhausted') == 1
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_retry_connection_error(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False)
+        with mock.patch('requests.Session.get', side_effect=[
+            requests.exceptions.ConnectionError(),
+            response(200),
+        ]) as mo:
+            with mock.patch('time.sleep'):
+                assert client._request(fixture_registry_url).status_code == \
+                    200
+        assert mo.call_count == 2
+
+        # not idempotent: no retry
+        with mock.patch('requests.post', side_effect=[
+            requests.exceptions.ConnectionError(),
+        ]) as mo:
+            with pytest.raises(requests.exceptions.ConnectionError):
+                client._request(fixture_registry_url, method=requests.post,
+                                verb='POST')
+        assert mo.call_count == 1
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_retry_delete(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False)
+        # first attempt deleted the manifest but its response was lost
+        with mock.patch('requests.Session.delete', side_effect=[
+            requests.exceptions.ReadTimeout(),
+            response(404),
+        ]) as mo:
+            with mock.patch('time.sleep'):
+                client._request(
+                    fixture_registry_url,
+                    method=client.session.delete,
+                    verb='DELETE',
+                    expected_code=202
+                )
+        assert mo.call_count == 2
+        assert client.stats.get('deletes_404_after_retry') == 1
+
+        # 404 at first attempt: error
+        with mock.patch('requests.Session.delete',
+                        return_value=response(404)):
+            with pytest.raises(DRegCliException):
+                client._request(
+                    fixture_registry_url,
+                    method=client.session.delete,
+                    verb='DELETE',
+                    expected_code=202
+                )
+
+    def test_retry_after_date(self):
+        policy = RetryPolicy()
+        date = time.strftime('%a, %d %b %Y %H:%M:%S GMT',
+                             time.gmtime(time.time() + 5))
+        delay = policy.delay(0, response(503, {'Retry-After': date}))
+        assert 3 < delay <= 5
+        # capped
+        delay = policy.delay(0, response(503, {'Retry-After': '3600'}))
+        assert delay == RetryPolicy.Meta.backoff_max
+
+
+class TestAdaptiveLimiter:
+    def test_latency_tracker(self):
+        tracker = LatencyTracker(window=100)
+        assert tracker.percentile(95) == 0.
+        for i in range(200):  # only last 100 kept
+            tracker.add(float(i))
+        assert len(tracker) == 100
+        assert tracker.percentile(95) == 194. and tracker.percentile(0) == 100.
+
+    def test_increase(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=4)
+        for i in range(50):
+            limiter.acquire()
+            limiter.release(0.1, 200)
+        assert limiter.limit == 4 and limiter.in_flight == 0
+
+    def test_decrease_throttled(self):
+        limiter = AdaptiveLimiter(initial_limit=8, max_limit=8)
+        limiter.acquire()
+        limiter.release(0.1, 429)
+        assert limiter.limit == 4
+        # failures of requests in flight: decreased once per p95 period
+        limiter.latency_p95 = 10.
+        for status_code in (503, 0):
+            limiter.acquire()
+            limiter.release(0.1, status_code)
+        assert limiter.limit == 4
+
+    def test_decrease_latency(self):
+        limiter = AdaptiveLimiter(initial_limit=8, max_limit=8)
+        for i in range(AdaptiveLimiter.Meta.latency_warmup):
+            limiter.acquire()
+            limiter.release(0.01, 200)
+        assert limiter.limit == 8
+        # p95 rising over tolerance
+        for i in range(10):
+            limiter.acquire()
+            limiter.release(1., 200)
+        assert limiter.limit < 8
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_client(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False,
+                        limiter=AdaptiveLimiter(initial_limit=2))
+        with mock.patch('requests.Session.get',
+                        return_value=response(200)):
+            client._request(fixture_registry_url)
+        assert client.limiter.in_flight == 0
+        assert client.stats.get('concurrency_limit') == 2
+
+        with mock.patch('requests.Session.get',
+                        side_effect=requests.exceptions.ConnectionError()):
+            with mock.patch('time.sleep'):
+                with pytest.raises(requests.exceptions.ConnectionError):
+                    client._request(fixture_registry_url)
+        assert client.limiter.in_flight == 0
+        assert client.stats.get('concurrency_limit') == 1
+
+
+class TestTokenBucket:
+    def test_reserve(self):
+        with mock.patch('time.monotonic', return_value=100.):
+            bucket = TokenBucket(10.)
+            # burst token, then queued 1/rate apart
+            assert [bucket.reserve() for i in range(3)] == \
+                pytest.approx([0., 0.1, 0.2])
+        with mock.patch('time.monotonic', return_value=101.):
+            # refilled up to burst only
+            assert bucket.reserve() == 0.
+            assert bucket.reserve() == pytest.approx(0.1)
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_client(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False, max_rps=10.,
+                        max_delete_rps=1.)
+        with mock.patch('time.sleep') as mo_sleep:
+            with mock.patch('requests.Session.get',
+                            return_value=response(200)):
+                for i in range(3):
+                    client._request(fixture_registry_url)
+            # separate budget: deletes not delayed by reads
+            with mock.patch('requests.Session.delete',
+                            return_value=response(202)):
+                client._request(fixture_registry_url,
+                                method=client.session.delete,
+                                verb='DELETE', expected_code=202)
+        assert mo_sleep.call_count == 2
+        assert all(0 < c[0][0] <= 0.2 for c in mo_sleep.call_args_list)
+        assert client.stats.get('rate_limited') == 2
+
+
+class TestTimeouts:
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_timeout(self, fixture_registry_url):
+        res = requests.Response()
+        res.status_code = 200
+
+        client = Client(fixture_registry_url, verbose=False,
+                        connect_timeout=2., read_timeout=20.)
+        with mock.patch('requests.adapters.HTTPAdapter.send',
+                        return_value=res) as mo:
+            client._request(fixture_registry_url)
+        assert mo.call_args[1]['timeout'] == (2., 20.)
+
+        # bounded by deadline
+        client = Client(fixture_registry_url, verbose=False, deadline=10.)
+        with mock.patch('requests.adapters.HTTPAdapter.send',
+                        return_value=res) as mo:
+            client._request(fixture_registry_url)
+        connect_timeout, read_timeout = mo.call_args[1]['timeout']
+        assert connect_timeout == Client.Meta.connect_timeout
+        assert 9. < read_timeout <= 10.
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_deadline(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False, deadline=10.)
+        # retry delay beyond deadline: no wait
+        with mock.patch('requests.Session.get', return_value=response(
+            503,
+            headers={'Retry-After': '20'}
+        )) as mo:
+            with mock.patch('time.sleep') as mo_sleep:
+                with pytest.raises(DeadlineExceeded) as excinfo:
+                    client._request(fixture_registry_url)
+        assert str(excinfo.value) == 'Deadline exceeded (10s)'
+        mo.assert_called_once()
+        mo_sleep.assert_not_called()
+
+        # reached: no more requests
+        client.deadline.expires_at = time.monotonic()
+        with mock.patch('requests.Session.get') as mo:
+            with pytest.raises(DeadlineExceeded):
+                client._request(fixture_registry_url)
+        mo.assert_not_called()
+
+
+class TestHedge:
+    def client(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False, hedge=True)
+        for i in range(Client.Meta.hedge_min_samples):
+            client.latencies.add(0.01)  # p95: 10ms
+        client.stats.set('requests', 100)  # hedges budget
+        return client
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_hedge(self, fixture_registry_url):
+        client = self.client(fixture_registry_url)
+        release = threading.Event()
+        calls = []
+
+        def get(url, headers={}):
+            calls.append(url)
+            res = response(200)
+            if len(calls) == 1:
+                release.wait(5)  # slow primary
+                res.primary = True
+            else:
+                res.primary = False
+            return res
+
+        with mock.patch('requests.Session.get', side_effect=get):
+            res = client._request(fixture_registry_url, hedge=True)
+            release.set()
+        client.close()
+        assert res.primary is False and len(calls) == 2
+        assert client.stats.get('hedges') == 1 and \
+            client.stats.get('hedges_won') == 1
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_hedge_budget(self, fixture_registry_url):
+        client = self.client(fixture_registry_url)
+        client.stats.set('requests', 1)  # no budget yet
+
+        def get(url, headers={}):
+            time.sleep(0.05)
+            return response(200)
+
+        with mock.patch('requests.Session.get', side_effect=get) as mo:
+            client._request(fixture_registry_url, hedge=True)
+        client.close()
+        assert mo.call_count == 1 and client.stats.get('hedges') == 0
+
+        # not hedgeable: not a GET, or client without hedging
+        client = self.client(fixture_registry_url)
+        with mock.patch.object(Client, '_hedged_request') as mo:
+            with mock.patch('requests.Session.head',
+                            return_value=response(200)):
+                client._request(fixture_registry_url, hedge=True,
+                                method=client.session.head, verb='HEAD')
+            client.hedge = False
+            with mock.patch('requests.Session.get',
+                            return_value=response(200)):
+                client._request(fixture_registry_url, hedge=True)
+        mo.assert_not_called()
+
+
+class TestCircuitBreaker:
+    def test_breaker(self):
+        breaker = CircuitBreaker(cooldown=10.)
+        host = 'localhost:5002'
+        with mock.patch('time.monotonic', return_value=100.):
+            # under min requests
+            for i in range(CircuitBreaker.Meta.min_requests - 1):
+                breaker.before(host)
+                assert not breaker.record(host, 503)
+            breaker.record('other:5000', 0)
+            assert not breaker.is_open(host)
+            assert breaker.record(host, 0)  # connection error: opened
+            with pytest.raises(CircuitOpenError):
+                breaker.before(host)
+            breaker.before('other:5000')  # per host
+
+        with mock.patch('time.monotonic', return_value=110.):
+            probe = breaker.before(host)  # half-open probe
+            assert probe
+            with pytest.raises(CircuitOpenError):
+                breaker.before(host)  # probe in flight
+            # request sent before opening: probe kept in flight
+            breaker.record(host, 200)
+            assert breaker.is_open(host)
+            with pytest.raises(CircuitOpenError):
+                breaker.before(host)
+            breaker.record(host, 503, probe=probe)  # reopened
+            with pytest.raises(CircuitOpenError):
+                breaker.before(host)
+
+        with mock.patch('time.monotonic', return_value=120.):
+            # probe not sent: next request probes
+            breaker.release_probe(host, breaker.before(host))
+            probe = breaker.before(host)
+            # not a registry failure: closed
+            breaker.record(host, 404, probe=probe)
+            assert not breaker.is_open(host)
+            assert not breaker.before(host)
+
+    def test_disabled(self):
+        breaker = CircuitBreaker(threshold=0)
+        for i in range(CircuitBreaker.Meta.window):
+            breaker.before('localhost')
+            assert not breaker.record('localhost', 503)
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_client(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False,
+                        retry=RetryPolicy(retries=0))
+        with mock.patch('requests.Session.get',
+                        return_value=response(503)) as mo:
+            for i in range(CircuitBreaker.Meta.min_requests):
+                with pytest.raises(DRegCliException):
+                    client._request(fixture_registry_url)
+            # fail fast
+            with pytest.raises(CircuitOpenError):
+                client._request(fixture_registry_url)
+        assert mo.call_count == CircuitBreaker.Meta.min_requests
+        assert client.stats.get('circuit_opened') == 1 and \
+            client.stats.get('circuit_rejected') == 1
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_throttled_scan(self, fixture_registry_url):
+        # throttling (429) left to retries: circuit kept closed
+        throttled = response(429, headers={'Retry-After': '0'})
+        ok = response(200)
+        ok.json.return_value = {'tags': ['latest']}
+        client = Client(fixture_registry_url, verbose=False,
+                        retry=RetryPolicy(retries=3))
+        repos = ['project{i}'.format(i=i) for i in range(6)]
+        with mock.patch('requests.Session.get',
+                        side_effect=[throttled] * 3 + [ok] +
+                        [throttled] * 3 + [ok] +
+                        [throttled] * 3 + [ok] +
+                        [throttled] * 3 + [ok] +
+                        [ok] * 2):
+            tags = client.map(
+                lambda repo: Repository(client, repo).tags(),
+                repos
+            )
+        assert tags == [['latest']] * len(repos)
+        assert not client.stats.get('circuit_rejected')
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_client_cooldown_waited(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False,
+                        retry=RetryPolicy(retries=3, backoff=0.01),
+                        breaker=CircuitBreaker(cooldown=0.05))
+        host = urllib.parse.urlsplit(fixture_registry_url).netloc
+        for i in range(CircuitBreaker.Meta.min_requests):
+            client.breaker.record(host, 503)
+        assert client.breaker.is_open(host)
+
+        # retry budget left: cooldown waited, then probe
+        with mock.patch('requests.Session.get',
+                        return_value=response(200)) as mo:
+            client._request(fixture_registry_url)
+        mo.assert_called_once()
+        assert not client.breaker.is_open(host)
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_client_probe_error(self, fixture_registry_url):
+        client = Client(fixture_registry_url, verbose=False,
+                        retry=RetryPolicy(retries=0),
+                        breaker=CircuitBreaker(cooldown=0.01),
+                        limiter=AdaptiveLimiter(max_limit=2))
+        host = urllib.parse.urlsplit(fixture_registry_url).netloc
+        for i in range(CircuitBreaker.Meta.min_requests):
+            client.breaker.record(host, 503)
+        time.sleep(0.02)
+
+        # probe failing before sent: circuit reopened, not left
+        # half-open with a probe in flight forever
+        incr = client.stats.incr
+
+        def failing_incr(name, *args, **kwargs):
+            if name == 'requests':
+                raise ValueError(name)
+            return incr(name, *args, **kwargs)
+
+        with mock.patch.object(client.stats, 'incr',
+                               side_effect=failing_incr):
+            with pytest.raises(ValueError):
+                client._request(fixture_registry_url)
+        assert client.breaker.is_open(host)
+        time.sleep(0.02)
+        with mock.patch('requests.Session.get',
+                        return_value=response(200)):
+            client._request(fixture_registry_url)
+        assert not client.breaker.is_open(host)
+
+        # rejected request: limiter slot released
+        for i in range(CircuitBreaker.Meta.min_requests):
+            client.breaker.record(host, 503)
+        for i in range(3):
+            with pytest.raises(CircuitOpenError):
+                client._request(fixture_registry_url)
+        assert client.limiter.in_flight == 0
+
+
+class TestReadRouter:
+    def test_choose(self):
+        mirrors = ['http://mirror1:5000', 'http://mirror2:5000/']
+        breaker = CircuitBreaker()
+        router = ReadRouter(mirrors, breaker)
+        # not measured: spread by requests in flight
+        first = router.choose()
+        router.start(first + '/v2/_catalog')
+        second = router.choose()
+        assert {first, second} == {'http://mirror1:5000',
+                                   'http://mirror2:5000'}
+        router.done(first + '/v2/_catalog', 0.3, 200)
+        router.start(second + '/v2/_catalog')
+        router.done(second + '/v2/_catalog', 0.1, 200)
+        # least latency
+        assert router.choose() == second
+
+        # failure penalty
+        router.start(second + '/v2/_catalog')
+        router.done(second + '/v2/_catalog', 0.1, 503)
+        assert router.choose() == first
+
+        # unhealthy replicas skipped
+        for i in range(CircuitBreaker.Meta.min_requests):
+            breaker.record('mirror1:5000', 0)
+        assert router.choose() == second
+        for i in range(CircuitBreaker.Meta.min_requests):
+            breaker.record('mirror2:5000', 0)
+        assert router.choose() == ''
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_client(self, fixture_registry_url):
+        mirror = 'http://mirror1:5000'
+        client = Client(fixture_registry_url, verbose=False,
+                        read_urls=[mirror])
+        url = fixture_registry_url + '/v2/test-project/manifests/latest'
+        with mock.patch('requests.Session.get',
+                        return_value=response(200)) as mo:
+            client._request(url)
+        mo.assert_called_once_with(
+            mirror + '/v2/test-project/manifests/latest',
+            headers={}
+        )
+        with mock.patch('requests.Session.delete',
+                        return_value=response(202)) as mo:
+            client._request(url, method=client.session.delete,
+                            verb='DELETE', expected_code=202)
+        mo.assert_called_once_with(url, headers={})
+
+        # no healthy replica: primary
+        for i in range(CircuitBreaker.Meta.min_requests):
+            client.breaker.record('mirror1:5000', 0)
+        with mock.patch('requests.Session.get',
+                        return_value=response(200)) as mo:
+            client._request(url)
+        mo.assert_called_once_with(url, headers={})
+        assert client.stats.get('reads_primary_fallback') == 1
+
 
 class TestAuth:
     @pytest.mark.usefixtures('fixture_registry_url', 'fixture_auth')
@@ -252,7 +923,7 @@ class TestAuth:
         client = Client(fixture_registry_url, verbose=False)
         client.auth = fixture_auth
 
-        with mock.patch('requests.get',
+        with mock.patch('requests.Session.get',
                         return_value=auth_get_token_inner_get_result) as mo:
             client._auth_get_token(mock_response)
             assert 'token' in client.auth and \
@@ -262,7 +933,7 @@ class TestAuth:
         auth_get_token_inner_get_result.json = mock.MagicMock(
             return_value={'token': ''}
         )
-        with mock.patch('requests.get',
+        with mock.patch('requests.Session.get',
                         return_value=auth_get_token_inner_get_result) as mo:
             with pytest.raises(DRegCliException) as excinfo:
                 client._auth_get_token(mock_response)
@@ -272,7 +943,7 @@ class TestAuth:
         auth_get_token_inner_get_result.json = mock.MagicMock(
             return_value={}
         )
-        with mock.patch('requests.get',
+        with mock.patch('requests.Session.get',
                         return_value=auth_get_token_inner_get_result) as mo:
             with pytest.raises(DRegCliException) as excinfo:
                 client._auth_get_token(mock_response)
@@ -306,7 +977,108 @@ class TestAuth:
         mock_res = mock.MagicMock()
         mock_res.json = mock.MagicMock(return_value=fixture_repositories)
         mock_res.status_code = 200
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             res = client._request(expected_url)
             assert res.status_code == expected_code and \
                 res.json() == fixture_repositories
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_auth',
+        'fixture_auth_token'
+    )
+    def test_token_cache(
+        self,
+        fixture_registry_url,
+        fixture_auth,
+        fixture_auth_token
+    ):
+        realm = "https://myhost/v2/token"
+        service = "docker-registry.myhost.com"
+        scope = "repository:test-project:pull,push"
+        manifest_url = fixture_registry_url + \
+            '/v2/test-project/manifests/latest'
+        tags_url = fixture_registry_url + '/v2/test-project/tags/list'
+        bearer = Client.Meta.auth_bearer_pattern.format(
+            token=fixture_auth_token
+        )
+
+        def get(url, headers={}, auth=None):
+            res = mock.MagicMock()
+            if url.startswith(realm):
+                res.status_code = 200
+                res.json = mock.MagicMock(return_value={
+                    'token': fixture_auth_token,
+                    'expires_in': 300,
+                    'issued_at': '2019-02-05T14:42:38Z',
+                })
+            elif headers.get('Authorization') == bearer:
+                res.status_code = 200
+            else:
+                res.status_code = 401
+                res.headers = {
+                    'Www-Authenticate':
+                        'Bearer realm="{realm}",service="{service}",'
+                        'scope="{scope}"'.format(
+                            realm=realm,
+                            service=service,
+                            scope=scope
+                        )
+                }
+            return res
+
+        client = Client(fixture_registry_url, verbose=False)
+        client.set_auth(fixture_auth['login'], fixture_auth['password'])
+
+        with mock.patch('requests.Session.get', side_effect=get) as mo:
+            # challenge: unauthenticated, get token, authenticated
+            client._request(manifest_url)
+            assert mo.call_count == 3
+            assert mo.call_args_list[1][0][0] == \
+                "{realm}?service={service}&scope={scope}".format(
+                    realm=realm,
+                    service=service,
+                    scope=scope
+                )
+            entry = client._auth_tokens[(realm, service, scope)]
+            assert entry['token'] == fixture_auth_token and \
+                entry['expires_in'] == 300 and \
+                entry['issued_at'] == '2019-02-05T14:42:38Z'
+
+            # same scope: token up front, single round trip
+            mo.reset_mock()
+            client._request(tags_url)
+            mo.assert_called_once_with(
+                tags_url,
+                headers={'Authorization': bearer}
+            )
+
+            # new scope hint, same challenge scope: cached token reused
+            mo.reset_mock()
+            catalog_url = fixture_registry_url + '/v2/_catalog'
+            client._request(catalog_url)
+            assert mo.call_count == 2 and \
+                not any(call[0][0].startswith(realm)
+                        for call in mo.call_args_list)
+
+            # refresh ahead: token about to expire, no challenge
+            mo.reset_mock()
+            entry['expires_at'] = time.time() + 1
+            client._request(tags_url)
+            assert mo.call_count == 2 and \
+                mo.call_args_list[0][0][0].startswith(realm)
+            assert client._auth_tokens[(realm, service, scope)][
+                'expires_at'] > time.time() + 200
+
+            # token rejected (401): challenge flow again
+            mo.reset_mock()
+            client._auth_tokens[(realm, service, scope)]['token'] = 'revoked'
+            client._request(tags_url)
+            assert mo.call_count == 3 and \
+                client._auth_tokens[(realm, service, scope)]['token'] == \
+                fixture_auth_token
+
+        # new credentials: tokens cache reset
+        client.set_auth(fixture_auth['login'], fixture_auth['password'])
+        assert not client._auth_tokens and not client._auth_scopes
@@ -12,11 +12,36 @@ from fixtures import (
     fixture_tags
 )
 from dregcli.console import main as console_main
+from dregcli.dregcli import CircuitBreaker, Client, DiskCache, RetryPolicy
+
+
+@pytest.fixture()
+def fixture_client_options():
+    """default client options (main parser global arguments)"""
+    return {
+        'cache_dir': DiskCache.default_path(),
+        'retries': RetryPolicy.Meta.retries,
+        'connect_timeout': Client.Meta.connect_timeout,
+        'read_timeout': Client.Meta.read_timeout,
+        'deadline': 0.,
+        'http2': False,
+        'read_urls': [],
+        'breaker_threshold': CircuitBreaker.Meta.threshold,
+        'hedge': False,
+        'max_rps': 0.,
+        'max_delete_rps': 0.,
+        'adaptive': False,
+        'stats': False,
+        'snapshot': False,
+    }
 
 
 class TestConsoleCommandLine:
-    @pytest.mark.usefixtures('fixture_registry_url')
-    def test_reps(self, fixture_registry_url):
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_client_options'
+    )
+    def test_reps(self, fixture_registry_url, fixture_client_options):
         with mock.patch(
             'sys.argv',
             ['dregcli', 'reps', fixture_registry_url]
@@ -29,7 +54,10 @@ class TestConsoleCommandLine:
                     fixture_registry_url,
                     False,
                     user=None,
-                    debug=False
+                    debug=False,
+                    page_size=0,
+                    prefix='',
+                    **fixture_client_options
                 )
 
         # json
@@ -45,11 +73,146 @@ class TestConsoleCommandLine:
                     fixture_registry_url,
                     True,
                     user=None,
-                    debug=False
+                    debug=False,
+                    page_size=0,
+                    prefix='',
+                    **fixture_client_options
+                )
+
+        # page size
+        with mock.patch(
+            'sys.argv',
+            ['dregcli', 'reps', fixture_registry_url, '--page-size=100']
+        ):
+            with mock.patch(
+                'dregcli.console.RepositoriesCommandHandler.run'
+            ) as mo:
+                console_main()
+                mo.assert_called_once_with(
+                    fixture_registry_url,
+                    False,
+                    user=None,
+                    debug=False,
+                    page_size=100,
+                    prefix='',
+                    **fixture_client_options
+                )
+
+        # prefix
+        with mock.patch(
+            'sys.argv',
+            ['dregcli', 'reps', fixture_registry_url, '--prefix=team-a/']
+        ):
+            with mock.patch(
+                'dregcli.console.RepositoriesCommandHandler.run'
+            ) as mo:
+                console_main()
+                mo.assert_called_once_with(
+                    fixture_registry_url,
+                    False,
+                    user=None,
+                    debug=False,
+                    page_size=0,
+                    prefix='team-a/',
+                    **fixture_client_options
+                )
+
+        # no cache
+        with mock.patch(
+            'sys.argv',
+            ['dregcli', '--no-cache', 'reps', fixture_registry_url]
+        ):
+            with mock.patch(
+                'dregcli.console.RepositoriesCommandHandler.run'
+            ) as mo:
+                console_main()
+                mo.assert_called_once_with(
+                    fixture_registry_url,
+                    False,
+                    user=None,
+                    debug=False,
+                    page_size=0,
+                    prefix='',
+                    **dict(fixture_client_options, cache_dir='')
+                )
+
+        # transport options
+        with mock.patch(
+            'sys.argv',
+            ['dregcli', '--retries=5', '--read-timeout=10', '--deadline=1h30m',
+             '--http2', '--read-url=http://mirror1',
+             '--read-url=http://mirror2',
+             '--breaker-threshold=0', '--hedge', '--max-rps=20',
+             '--max-delete-rps=2', '--adaptive', '--stats', 'reps',
+             fixture_registry_url]
+        ):
+            with mock.patch(
+                'dregcli.console.RepositoriesCommandHandler.run'
+            ) as mo:
+                console_main()
+                mo.assert_called_once_with(
+                    fixture_registry_url,
+                    False,
+                    user=None,
+                    debug=False,
+                    page_size=0,
+                    prefix='',
+                    **dict(fixture_client_options, retries=5,
+                           read_timeout=10., deadline=5400.,
+                           http2=True,
+                           read_urls=['http://mirror1', 'http://mirror2'],
+                           breaker_threshold=0., hedge=True,
+                           max_rps=20., max_delete_rps=2.,
+                           adaptive=True, stats=True)
+                )
+
+        # cache dir
+        with mock.patch(
+            'sys.argv',
+            [
+                'dregcli',
+                '--cache-dir=/tmp/dregcli',
+                '--snapshot',
+                'reps',
+                fixture_registry_url
+            ]
+        ):
+            with mock.patch(
+                'dregcli.console.RepositoriesCommandHandler.run'
+            ) as mo:
+                console_main()
+                mo.assert_called_once_with(
+                    fixture_registry_url,
+                    False,
+                    user=None,
+                    debug=False,
+                    page_size=0,
+                    prefix='',
+                    **dict(fixture_client_options, cache_dir='/tmp/dregcli',
+                           snapshot=True)
                 )
 
     @pytest.mark.usefixtures('fixture_registry_url')
-    def test_user(self, fixture_registry_url):
+    def test_snapshot_no_cache(self, fixture_registry_url, capsys):
+        with mock.patch(
+            'sys.argv',
+            ['dregcli', '--snapshot', '--no-cache', 'reps',
+             fixture_registry_url]
+        ):
+            with mock.patch(
+                'dregcli.console.RepositoriesCommandHandler.run'
+            ) as mo:
+                with pytest.raises(SystemExit):
+                    console_main()
+                mo.assert_not_called()
+        assert '--snapshot requires persistent cache' in \
+            capsys.readouterr().err
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_client_options'
+    )
+    def test_user(self, fixture_registry_url, fixture_client_options):
         # user
         with mock.patch(
             'sys.argv',
@@ -63,11 +226,17 @@ class TestConsoleCommandLine:
                     fixture_registry_url,
                     False,
                     user='login:pwd',
-                    debug=False
+                    debug=False,
+                    page_size=0,
+                    prefix='',
+                    **fixture_client_options
                 )
 
-    @pytest.mark.usefixtures('fixture_registry_url')
-    def test_debug(self, fixture_registry_url):
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_client_options'
+    )
+    def test_debug(self, fixture_registry_url, fixture_client_options):
         # user
         with mock.patch(
             'sys.argv',
@@ -81,11 +250,23 @@ class TestConsoleCommandLine:
                     fixture_registry_url,
                     False,
                     user=None,
-                    debug=True
+                    debug=True,
+                    page_size=0,
+                    prefix='',
+                    **fixture_client_options
                 )
 
-    @pytest.mark.usefixtures('fixture_registry_url', 'fixture_repository')
-    def test_tags(self, fixture_registry_url, fixture_repository):
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_client_options'
+    )
+    def test_tags(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_client_options
+    ):
         with mock.patch(
             'sys.argv',
             [
@@ -104,7 +285,11 @@ class TestConsoleCommandLine:
                     fixture_repository,
                     False,
                     user=None,
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    page_size=0,
+                    prefix='',
+                    **fixture_client_options
                 )
 
         # json
@@ -127,11 +312,51 @@ class TestConsoleCommandLine:
                     fixture_repository,
                     True,
                     user=None,
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    page_size=0,
+                    prefix='',
+                    **fixture_client_options
+                )
+
+        # concurrency
+        with mock.patch(
+            'sys.argv',
+            [
+                'dregcli',
+                'tags',
+                fixture_registry_url,
+                fixture_repository,
+                '--concurrency=8',
+            ]
+        ):
+            with mock.patch(
+                'dregcli.console.TagsCommandHandler.run'
+            ) as mo:
+                console_main()
+                mo.assert_called_once_with(
+                    fixture_registry_url,
+                    fixture_repository,
+                    False,
+                    user=None,
+                    debug=False,
+                    concurrency=8,
+                    page_size=0,
+                    prefix='',
+                    **fixture_client_options
                 )
 
-    @pytest.mark.usefixtures('fixture_registry_url', 'fixture_repository')
-    def test_images(self, fixture_registry_url, fixture_repository):
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_client_options'
+    )
+    def test_images(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_client_options
+    ):
         with mock.patch(
             'sys.argv',
             [
@@ -150,7 +375,10 @@ class TestConsoleCommandLine:
                     fixture_repository,
                     False,
                     user=None,
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    by_digest=False,
+                    **fixture_client_options
                 )
 
         # json
@@ -173,19 +401,24 @@ class TestConsoleCommandLine:
                     fixture_repository,
                     True,
                     user=None,
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    by_digest=False,
+                    **fixture_client_options
                 )
 
     @pytest.mark.usefixtures(
         'fixture_registry_url',
         'fixture_repository',
-        'fixture_tags'
+        'fixture_tags',
+        'fixture_client_options'
     )
     def test_image(
         self,
         fixture_registry_url,
         fixture_repository,
-        fixture_tags
+        fixture_tags,
+        fixture_client_options
     ):
         with mock.patch(
             'sys.argv',
@@ -210,7 +443,8 @@ class TestConsoleCommandLine:
                     False,
                     False,
                     user=None,
-                    debug=False
+                    debug=False,
+                    **fixture_client_options
                 )
 
         # manifest
@@ -238,7 +472,8 @@ class TestConsoleCommandLine:
                     False,
                     False,
                     user=None,
-                    debug=False
+                    debug=False,
+                    **fixture_client_options
                 )
 
         # json
@@ -266,7 +501,8 @@ class TestConsoleCommandLine:
                     False,
                     False,
                     user=None,
-                    debug=False
+                    debug=False,
+                    **fixture_client_options
                 )
 
         # delete
@@ -294,7 +530,8 @@ class TestConsoleCommandLine:
                     True,
                     False,
                     user=None,
-                    debug=False
+                    debug=False,
+                    **fixture_client_options
                 )
 
         # always yes
@@ -322,14 +559,20 @@ class TestConsoleCommandLine:
                     False,
                     True,
                     user=None,
-                    debug=False
+                    debug=False,
+                    **fixture_client_options
                 )
 
-    @pytest.mark.usefixtures('fixture_registry_url', 'fixture_repository')
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_client_options'
+    )
     def test_delete(
         self,
         fixture_registry_url,
-        fixture_repository
+        fixture_repository,
+        fixture_client_options
     ):
         with mock.patch(
             'sys.argv',
@@ -357,7 +600,15 @@ class TestConsoleCommandLine:
                     single_tag='',
                     include='',
                     # exclude='',
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    prefix='',
+                    by_digest=False,
+                    tag_delete=False,
+                    plan='',
+                    journal='',
+                    resume=False,
+                    **fixture_client_options
                 )
 
         # json
@@ -388,7 +639,15 @@ class TestConsoleCommandLine:
                     single_tag='',
                     include='',
                     # exclude=''
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    prefix='',
+                    by_digest=False,
+                    tag_delete=False,
+                    plan='',
+                    journal='',
+                    resume=False,
+                    **fixture_client_options
                 )
 
         # null
@@ -419,7 +678,15 @@ class TestConsoleCommandLine:
                     single_tag='',
                     include='',
                     # exclude=''
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    prefix='',
+                    by_digest=False,
+                    tag_delete=False,
+                    plan='',
+                    journal='',
+                    resume=False,
+                    **fixture_client_options
                 )
 
         # yes
@@ -450,7 +717,15 @@ class TestConsoleCommandLine:
                     single_tag='',
                     include='',
                     # exclude=''
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    prefix='',
+                    by_digest=False,
+                    tag_delete=False,
+                    plan='',
+                    journal='',
+                    resume=False,
+                    **fixture_client_options
                 )
 
         # all
@@ -481,7 +756,15 @@ class TestConsoleCommandLine:
                     single_tag='',
                     include='',
                     # exclude=''
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    prefix='',
+                    by_digest=False,
+                    tag_delete=False,
+                    plan='',
+                    journal='',
+                    resume=False,
+                    **fixture_client_options
                 )
 
         # from_count
@@ -512,7 +795,15 @@ class TestConsoleCommandLine:
                     single_tag='',
                     include='',
                     # exclude=''
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    prefix='',
+                    by_digest=False,
+                    tag_delete=False,
+                    plan='',
+                    journal='',
+                    resume=False,
+                    **fixture_client_options
                 )
 
         # from_date
@@ -543,7 +834,15 @@ class TestConsoleCommandLine:
                     single_tag='',
                     include='',
                     # exclude=''
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    prefix='',
+                    by_digest=False,
+                    tag_delete=False,
+                    plan='',
+                    journal='',
+                    resume=False,
+                    **fixture_client_options
                 )
 
         # include
@@ -575,7 +874,15 @@ class TestConsoleCommandLine:
                     single_tag='',
                     include=include_option_val,
                     # exclude=''
-                    debug=False
+                    debug=False,
+                    concurrency=1,
+                    prefix='',
+                    by_digest=False,
+                    tag_delete=False,
+                    plan='',
+                    journal='',
+                    resume=False,
+                    **fixture_client_options
                 )
 
         # exclude desactivated: for layers with multiple tags,
@@ -612,3 +919,22 @@ class TestConsoleCommandLine:
         #             exclude=exclude_option_val
         #             debug=False
         #         )
+
+    @pytest.mark.usefixtures('fixture_client_options')
+    def test_apply(self, fixture_client_options):
+        with mock.patch(
+            'sys.argv',
+            ['dregcli', 'apply', 'plan.json', '-j', '--concurrency=8']
+        ):
+            with mock.patch(
+                'dregcli.console.ApplyCommandHandler.run'
+            ) as mo:
+                console_main()
+                mo.assert_called_once_with(
+                    'plan.json',
+                    True,
+                    user=None,
+                    debug=False,
+                    concurrency=8,
+                    **fixture_client_options
+                )
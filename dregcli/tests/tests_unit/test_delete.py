@@ -10,6 +10,7 @@ sys.path.append(
 import tools
 from fixtures import fixture_registry_url, fixture_repository, fixture_tags
 from dregcli.console.delete import DeleteCommandHandler
+from dregcli.dregcli import DeadlineExceeded, DRegCliException, Journal
 
 
 class TestDelete:
@@ -31,10 +32,12 @@ class TestDelete:
         assert tools.get_output_json(capsys) == expected_output_json
 
         expected_output_lines = [self._command, expected_msg]
-        handler.run(fixture_registry_url, fixture_repository, False,
-                    dry_run=True)
+        with mock.patch('dregcli.dregcli.Client.close') as mo_close:
+            handler.run(fixture_registry_url, fixture_repository, False,
+                        dry_run=True)
         out_lines = tools.get_output_lines(capsys)
         assert out_lines == expected_output_lines
+        mo_close.assert_called_once_with()  # aborted run too
 
     @pytest.mark.usefixtures('fixture_registry_url', 'fixture_repository')
     def test_delete_exclusive_options(
@@ -57,3 +60,306 @@ class TestDelete:
                     all=True, from_count=10)  # 2 exclusives filter options
         out_lines = tools.get_output_lines(capsys)
         assert out_lines == expected_output_lines
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_delete_deadline_partial(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        capsys
+    ):
+        images = [
+            mock.MagicMock(tag=tag, digest='sha256:' + tag)
+            for tag in fixture_tags[:3]
+        ]
+        tags = [
+            {'tag': image.tag, 'cotags': [], 'date': None, 'image': image}
+            for image in images
+        ]
+        error = 'Deadline exceeded (1m)'
+        for image in images[1:]:
+            image.delete.side_effect = DeadlineExceeded(error)
+        handler = DeleteCommandHandler()
+
+        with mock.patch(
+            'dregcli.console.delete.Repository.group_tags',
+            return_value=({}, tags)
+        ):
+            deleted = handler.run(fixture_registry_url,
+                                  fixture_repository, True, all=True,
+                                  concurrency=2)
+        # first tag deleted before deadline, others reported per digest
+        assert tools.get_output_json(capsys) == {
+            'result': [{'tag': fixture_tags[0], 'cotags': []}],
+            'errors': [
+                {'reference': image.digest, 'tags': [image.tag],
+                 'error': error}
+                for image in images[1:]
+            ],
+        }
+        assert deleted == [fixture_tags[0]]
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_delete_once_per_digest(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        capsys
+    ):
+        # tags 0 and 1 same manifest
+        tags = fixture_tags[:3]
+        images = {tag: mock.MagicMock(tag=tag) for tag in tags}
+        images[tags[0]].digest = images[tags[1]].digest = 'sha256:a'
+        images[tags[2]].digest = 'sha256:b'
+        cotags = {tags[0]: [tags[1]], tags[1]: [tags[0]], tags[2]: []}
+        tags_data = [
+            {'tag': tag, 'cotags': cotags[tag], 'date': None,
+             'image': images[tag]}
+            for tag in tags
+        ]
+        handler = DeleteCommandHandler()
+
+        with mock.patch(
+            'dregcli.console.delete.Repository.group_tags',
+            return_value=({}, tags_data)
+        ):
+            with mock.patch(
+                'dregcli.console.delete.Repository.image'
+            ) as mo_image:
+                deleted = handler.run(fixture_registry_url,
+                                      fixture_repository, True, all=True)
+
+        # scanned images reused, a single DELETE per manifest digest
+        mo_image.assert_not_called()
+        assert [images[tag].delete.call_count for tag in tags] == [1, 0, 1]
+        assert deleted == tags
+        assert tools.get_output_json(capsys) == {
+            'result': [
+                {'tag': tag, 'cotags': cotags[tag]} for tag in tags
+            ]
+        }
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_delete_tag_delete(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        capsys
+    ):
+        # tags 0 and 1 same manifest
+        tags = fixture_tags[:2]
+        images = {tag: mock.MagicMock(tag=tag, digest='sha256:a')
+                  for tag in tags}
+        tags_data = [
+            {'tag': tags[0], 'cotags': [tags[1]], 'date': None,
+             'image': images[tags[0]]},
+        ]
+        handler = DeleteCommandHandler()
+
+        for supported in (True, False):
+            with mock.patch(
+                'dregcli.console.delete.Repository.group_tags',
+                return_value=({}, tags_data)
+            ):
+                with mock.patch(
+                    'dregcli.console.delete.Repository.supports_tag_delete',
+                    return_value=supported
+                ):
+                    handler.run(fixture_registry_url, fixture_repository,
+                                True, all=True, tag_delete=True)
+            # cotag kept with tag delete, else deleted too (by digest)
+            assert tools.get_output_json(capsys) == {
+                'result': [{
+                    'tag': tags[0],
+                    'cotags': [] if supported else [tags[1]],
+                }]
+            }
+
+        image = images[tags[0]]
+        assert image.delete_tag.call_count == 1
+        assert image.delete.call_count == 1  # fallback
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_delete_tag_delete_dry_run(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        tmp_path,
+        capsys
+    ):
+        images = [mock.MagicMock(tag=tag, digest='sha256:a', date=False)
+                  for tag in fixture_tags[:2]]
+        tags_data = [
+            {'tag': image.tag, 'cotags': [], 'date': None, 'image': image}
+            for image in images
+        ]
+        plan_path = str(tmp_path / 'plan.json')
+        handler = DeleteCommandHandler()
+
+        # dry run and plan: no support probe (DELETE request)
+        for options in ({'dry_run': True}, {'plan': plan_path}):
+            with mock.patch(
+                'dregcli.console.delete.Repository.group_tags',
+                return_value=({}, tags_data)
+            ):
+                with mock.patch('requests.Session.delete') as mo_delete:
+                    handler.run(fixture_registry_url, fixture_repository,
+                                True, all=True, tag_delete=True, **options)
+            mo_delete.assert_not_called()
+            assert tools.get_output_json(capsys) == {
+                'result': [{'tag': image.tag, 'cotags': []}
+                           for image in images]
+            }
+        assert not any(image.delete.called or image.delete_tag.called
+                       for image in images)
+        with open(plan_path) as f:
+            assert json.load(f)['tag_delete'] == 'requested'
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_delete_journal_resume(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        tmp_path,
+        capsys
+    ):
+        tags = fixture_tags[:3]
+        digests = {tags[0]: 'sha256:a', tags[1]: 'sha256:b',
+                   tags[2]: 'sha256:c'}
+        images = [mock.MagicMock(tag=tag, digest=digests[tag], date=False)
+                  for tag in tags]
+        tags_data = [
+            {'tag': image.tag, 'cotags': [], 'date': None, 'image': image}
+            for image in images
+        ]
+        # interrupted: tag 2 deletion not attempted
+        images[2].delete.side_effect = DeadlineExceeded('Deadline exceeded')
+        journal = str(tmp_path / 'journal')
+        handler = DeleteCommandHandler()
+
+        with mock.patch(
+            'dregcli.console.delete.Repository.group_tags',
+            return_value=({}, tags_data)
+        ):
+            handler.run(fixture_registry_url, fixture_repository, True,
+                        all=True, journal=journal)
+        capsys.readouterr()
+        plan, done = Journal.read(journal)
+        assert [tag_data['tag'] for tag_data in plan['tags']] == tags
+        assert done == {'sha256:a': '', 'sha256:b': ''}
+
+        # resume: no rescan, only tag 2 left
+        def tag_digest(tag):
+            return digests[tag]
+
+        with mock.patch(
+            'dregcli.console.delete.Repository.group_tags'
+        ) as mo_group_tags:
+            with mock.patch(
+                'dregcli.console.delete.Repository.tag_digest',
+                side_effect=tag_digest
+            ) as mo_tag_digest:
+                with mock.patch(
+                    'dregcli.console.delete.Image.delete'
+                ) as mo_delete:
+                    deleted = handler.run(fixture_registry_url,
+                                          fixture_repository, True,
+                                          journal=journal, resume=True)
+        mo_group_tags.assert_not_called()
+        mo_tag_digest.assert_called_once_with(tags[2])
+        mo_delete.assert_called_once_with()
+        assert deleted == [tags[2]]
+        assert tools.get_output_json(capsys) == {
+            'result': [{'tag': tags[2], 'cotags': []}]
+        }
+        assert Journal.read(journal)[1] == {
+            'sha256:a': '', 'sha256:b': '', 'sha256:c': ''
+        }
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_delete_journal_resume_missing(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        tmp_path,
+        capsys
+    ):
+        tags = fixture_tags[:3]
+        digests = {tags[0]: 'sha256:a', tags[1]: 'sha256:b',
+                   tags[2]: 'sha256:c'}
+        images = [mock.MagicMock(tag=tag, digest=digests[tag], date=False)
+                  for tag in tags]
+        tags_data = [
+            {'tag': image.tag, 'cotags': [], 'date': None, 'image': image}
+            for image in images
+        ]
+        # interrupted: tags 1 and 2 deleted after last journal sync
+        for image in images[1:]:
+            image.delete.side_effect = DeadlineExceeded('Deadline exceeded')
+        journal = str(tmp_path / 'journal')
+        handler = DeleteCommandHandler()
+
+        with mock.patch(
+            'dregcli.console.delete.Repository.group_tags',
+            return_value=({}, tags_data)
+        ):
+            handler.run(fixture_registry_url, fixture_repository, True,
+                        all=True, journal=journal)
+        capsys.readouterr()
+
+        # resume: tag 1 not found, manifest of tag 2 not found,
+        # both counted as deleted
+        not_found = DRegCliException(
+            tools.get_error_status_message(404)
+        )
+        not_found.status_code = 404
+
+        def tag_digest(tag):
+            if tag == tags[1]:
+                raise not_found
+            return digests[tag]
+
+        with mock.patch(
+            'dregcli.console.delete.Repository.tag_digest',
+            side_effect=tag_digest
+        ):
+            with mock.patch(
+                'dregcli.console.delete.Image.delete',
+                side_effect=not_found
+            ):
+                handler.run(fixture_registry_url, fixture_repository, True,
+                            journal=journal, resume=True)
+        assert 'errors' not in tools.get_output_json(capsys)
+        assert Journal.read(journal)[1] == {
+            'sha256:a': '', 'sha256:b': '', 'sha256:c': ''
+        }
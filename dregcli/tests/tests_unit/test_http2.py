@@ -0,0 +1,97 @@
+import os
+import sys
+import pytest
+import requests
+
+httpx = pytest.importorskip('httpx')
+pytest.importorskip('h2')
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+)
+from fixtures import (
+    fixture_registry_url,
+    fixture_repositories_url,
+    fixture_repository,
+    fixture_repositories,
+    fixture_auth,
+)
+from dregcli.dregcli import Client
+from dregcli.http2 import Http2Session
+
+
+class TestHttp2Session:
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repositories_url',
+        'fixture_repositories',
+        'fixture_auth'
+    )
+    def test_request(
+        self,
+        fixture_registry_url,
+        fixture_repositories_url,
+        fixture_repositories,
+        fixture_auth
+    ):
+        requests_sent = []
+
+        def handler(request):
+            requests_sent.append(request)
+            return httpx.Response(200, json=fixture_repositories)
+
+        session = Http2Session(
+            lambda: (1., 2.),
+            transport=httpx.MockTransport(handler)
+        )
+        session.headers['User-Agent'] = 'dregcli'
+        url = fixture_registry_url + fixture_repositories_url
+        response = session.get(
+            url,
+            headers={'Accept': 'application/json'},
+            auth=requests.auth.HTTPBasicAuth(fixture_auth['login'],
+                                             fixture_auth['password'])
+        )
+        assert response.status_code == 200 and \
+            response.json() == fixture_repositories
+        request = requests_sent[0]
+        assert request.method == 'GET' and str(request.url) == url
+        assert request.headers['User-Agent'] == 'dregcli' and \
+            request.headers['Accept'] == 'application/json'
+        assert request.headers['Authorization'].startswith('Basic ')
+        assert request.extensions['timeout'] == {
+            'connect': 1., 'read': 2., 'write': 2., 'pool': 2.
+        }
+
+        session.delete(url)
+        assert requests_sent[1].method == 'DELETE'
+        session.close()
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_errors(self, fixture_registry_url):
+        # httpx errors as requests ones: client retries
+        for error, expected in (
+            (httpx.ReadTimeout, requests.exceptions.Timeout),
+            (httpx.ConnectError, requests.exceptions.ConnectionError),
+        ):
+            def handler(request):
+                raise error('failed', request=request)
+
+            session = Http2Session(
+                lambda: (1., 2.),
+                transport=httpx.MockTransport(handler)
+            )
+            with pytest.raises(expected):
+                session.head(fixture_registry_url)
+
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_client(self, fixture_registry_url):
+        client = Client(fixture_registry_url, http2=True)
+        assert isinstance(client.session, Http2Session)
+        client.close()
+
+        # pluggable transport
+        session = Http2Session(lambda: (1., 2.))
+        client = Client(fixture_registry_url, session=session)
+        assert client.session is session
+        client.close()
@@ -19,6 +19,7 @@ from fixtures import (
     fixture_blob_payload,
     fixture_schema1_history,
     fixture_delete_url,
+    fixture_image_url,
 )
 from dregcli.dregcli import DRegCliException, Client, Repository, Image
 
@@ -78,7 +79,8 @@ class TestImage:
         mock_res.status_code = 200
 
         # get the date use case
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             image = Image(
                 Client(fixture_registry_url),
                 fixture_repositories["repositories"][0],
@@ -92,7 +94,8 @@ class TestImage:
 
         # could not get the date use case
         mock_res.json = mock.MagicMock(return_value={})
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             image = Image(
                 Client(fixture_registry_url),
                 fixture_repositories["repositories"][0],
@@ -104,6 +107,67 @@ class TestImage:
                 image.get_date()
             assert str(excinfo.value) == "Image date not found"
 
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repositories',
+        'fixture_tags',
+        'fixture_digest',
+        'fixture_config_payload',
+        'fixture_image_date',
+        'fixture_blob_payload'
+    )
+    def test_get_date_memoized(
+        self,
+        fixture_registry_url,
+        fixture_repositories,
+        fixture_tags,
+        fixture_digest,
+        fixture_config_payload,
+        fixture_image_date,
+        fixture_blob_payload
+    ):
+        mock_res = mock.MagicMock()
+        mock_res.json = mock.MagicMock(return_value=fixture_blob_payload)
+        mock_res.status_code = 200
+
+        client = Client(fixture_registry_url)
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
+            # tags sharing config: config blob fetched once
+            images = [
+                Image(
+                    client,
+                    fixture_repositories["repositories"][0],
+                    tag,
+                    digest=fixture_digest,
+                    data=fixture_config_payload
+                ) for tag in fixture_tags
+            ]
+            for image in images:
+                assert image.get_date() == fixture_image_date
+                assert image.get_date() == fixture_image_date
+            mo.assert_called_once()
+
+            # concurrent getters of same config
+            client = Client(fixture_registry_url)
+            mo.reset_mock()
+            images = [
+                Image(
+                    client,
+                    fixture_repositories["repositories"][0],
+                    tag,
+                    digest=fixture_digest,
+                    data=fixture_config_payload
+                ) for tag in fixture_tags
+            ]
+            dates = client.map(
+                lambda image: image.get_date(),
+                images,
+                concurrency=len(images)
+            )
+            assert dates == [fixture_image_date] * len(images)
+            mo.assert_called_once()
+
     @pytest.mark.usefixtures(
         'fixture_registry_url',
         'fixture_repositories',
@@ -152,7 +216,8 @@ class TestImage:
         mock_res = mock.MagicMock()
         mock_res.status_code = 202  # 202 for delete
 
-        with mock.patch('requests.delete', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.delete',
+                        return_value=mock_res) as mo:
             image = Image(
                 Client(fixture_registry_url),
                 fixture_repositories["repositories"][0],
@@ -164,3 +229,36 @@ class TestImage:
                 fixture_delete_url,
                 headers=Repository.Meta.manifests_headers,
             )
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repositories',
+        'fixture_tags',
+        'fixture_digest',
+        'fixture_image_url'
+    )
+    def test_delete_tag(
+        self,
+        fixture_registry_url,
+        fixture_repositories,
+        fixture_tags,
+        fixture_digest,
+        fixture_image_url,
+    ):
+        mock_res = mock.MagicMock()
+        mock_res.status_code = 202  # 202 for delete
+
+        with mock.patch('requests.Session.delete',
+                        return_value=mock_res) as mo:
+            image = Image(
+                Client(fixture_registry_url),
+                fixture_repositories["repositories"][0],
+                fixture_tags[0],
+                digest=fixture_digest
+            )
+            image.delete_tag()
+            # by tag, not by digest
+            mo.assert_called_once_with(
+                fixture_registry_url + fixture_image_url,
+                headers=Repository.Meta.manifests_headers,
+            )
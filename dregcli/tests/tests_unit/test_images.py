@@ -0,0 +1,74 @@
+import datetime
+import os
+import sys
+from unittest import mock
+import pytest
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+)
+import tools
+from fixtures import fixture_registry_url, fixture_repository, fixture_tags
+from dregcli.console.images import ImagesCommandHandler
+from dregcli.dregcli import DeadlineExceeded
+
+
+class TestImages:
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    @pytest.mark.parametrize('concurrency', [1, 2])
+    def test_images_deadline_partial(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        concurrency,
+        capsys
+    ):
+        # tags 0 and 1 same layers, tag 2 not scanned before deadline
+        tags = fixture_tags[:3]
+        date = datetime.datetime(2020, 1, 1)
+        error = 'Deadline exceeded (1m)'
+
+        def image(tag):
+            if tag == tags[2]:
+                raise DeadlineExceeded(error)
+            return mock.MagicMock(tag=tag, date=date, **{
+                'get_date.return_value': date,
+                'get_layers_key.return_value': 'layers',
+            })
+
+        handler = ImagesCommandHandler()
+        with mock.patch(
+            'dregcli.console.images.Repository.iter_tags',
+            return_value=iter(tags)
+        ):
+            with mock.patch(
+                'dregcli.console.images.Repository.image',
+                side_effect=image
+            ):
+                handler.run(fixture_registry_url, fixture_repository, True,
+                            concurrency=concurrency)
+        output_json = tools.get_output_json(capsys)
+        assert output_json['error'] == error
+        assert len(output_json['result']) == 1
+        assert sorted(output_json['result'][0]['tags']) == sorted(tags[:2])
+        assert output_json['result'][0]['date'] == handler.date2str(date)
+
+        # table output
+        with mock.patch(
+            'dregcli.console.images.Repository.iter_tags',
+            return_value=iter(tags)
+        ):
+            with mock.patch(
+                'dregcli.console.images.Repository.image',
+                side_effect=image
+            ):
+                handler.run(fixture_registry_url, fixture_repository, False,
+                            concurrency=concurrency)
+        out_lines = tools.get_output_lines(capsys)
+        assert sorted(out_lines[3].split()[0].split(',')) == sorted(tags[:2])
+        assert out_lines[-1] == "{error}, partial result".format(error=error)
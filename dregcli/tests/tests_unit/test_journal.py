@@ -0,0 +1,50 @@
+import os
+import sys
+from unittest import mock
+import pytest
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+)
+from fixtures import fixture_tags
+from dregcli.dregcli import DRegCliException, Journal
+
+
+class TestJournal:
+    @pytest.mark.usefixtures('fixture_tags')
+    def test_read_write(self, tmp_path, fixture_tags):
+        path = str(tmp_path / 'journal')
+        plan = {'repo': 'project', 'tags': fixture_tags}
+
+        with mock.patch('os.fsync') as mo_fsync:
+            with Journal(path, fsync_batch=2, fsync_interval=60) as journal:
+                journal.write_plan(plan)
+                assert mo_fsync.call_count == 1  # plan synced
+                journal.done('sha256:a')
+                journal.done('sha256:b', error='Status code error 500')
+                assert mo_fsync.call_count == 2  # batch of 2
+                journal.done('sha256:c')
+            assert mo_fsync.call_count == 3  # close
+
+        # interrupted while writing a record
+        with open(path, 'a') as f:
+            f.write('{"reference": "sha2')
+
+        read_plan, done = Journal.read(path)
+        assert read_plan == plan
+        assert list(done.items()) == [
+            ('sha256:a', ''),
+            ('sha256:b', 'Status code error 500'),
+            ('sha256:c', ''),
+        ]
+
+        # new plan: previous results discarded
+        with open(path, 'a') as f:
+            f.write('\n')
+        with Journal(path) as journal:
+            journal.write_plan(plan)
+        assert Journal.read(path) == (plan, {})
+
+    def test_read_missing(self, tmp_path):
+        with pytest.raises(DRegCliException):
+            Journal.read(str(tmp_path / 'journal'))
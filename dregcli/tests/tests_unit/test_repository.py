@@ -1,3 +1,4 @@
+import datetime
 import os
 import sys
 from unittest import mock
@@ -38,8 +39,10 @@ class TestRepository:
         mock_res = mock.MagicMock()
         mock_res.status_code = 200
         mock_res.json = mock.MagicMock(return_value=fixture_tags_json)
+        mock_res.headers = {}  # no Link header: single page
 
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             repository = Repository(
                 Client(fixture_registry_url),
                 fixture_repository
@@ -48,6 +51,57 @@ class TestRepository:
             assert isinstance(tags, list) and \
                 tags == fixture_tags_json['tags']
 
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags',
+        'fixture_tags_url'
+    )
+    def test_iter_tags(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        fixture_tags_url
+    ):
+        tags_url = fixture_registry_url + fixture_tags_url
+        pages = {
+            tags_url + '?n=2': (
+                fixture_tags[:2],
+                '<{url}?n=2&last={last}>; rel="next"'.format(
+                    url=fixture_tags_url,
+                    last=fixture_tags[1]
+                )
+            ),
+            tags_url + '?n=2&last=' + fixture_tags[1]: (
+                fixture_tags[2:],
+                ''
+            ),
+        }
+
+        def get(url, headers={}):
+            res = mock.MagicMock()
+            res.status_code = 200
+            res.json = mock.MagicMock(return_value={
+                'name': fixture_repository,
+                'tags': pages[url][0]
+            })
+            res.headers = pages[url][1] and {'Link': pages[url][1]} or {}
+            return res
+
+        repository = Repository(
+            Client(fixture_registry_url),
+            fixture_repository
+        )
+        with mock.patch('requests.Session.get', side_effect=get) as mo:
+            tags = repository.iter_tags(page_size=2)
+            assert next(tags) == fixture_tags[0]
+            mo.assert_called_once()  # first page only
+            assert list(tags) == fixture_tags[1:]
+            assert mo.call_count == 2
+
+            assert repository.tags(page_size=2) == fixture_tags
+
     @pytest.mark.usefixtures(
         'fixture_registry_url',
         'fixture_repository',
@@ -85,7 +139,8 @@ class TestRepository:
             tag=fixture_tags[0]
         )
 
-        with mock.patch('requests.get', return_value=mock_res) as mo:
+        with mock.patch('requests.Session.get',
+                        return_value=mock_res) as mo:
             repository = Repository(
                 Client(fixture_registry_url),
                 fixture_repository
@@ -103,3 +158,236 @@ class TestRepository:
                 str(image) == "{repo}:{tag}".format(
                     repo=fixture_repository,
                     tag=fixture_tags[0])
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags',
+        'fixture_digest',
+        'fixture_image_url'
+    )
+    def test_tag_digest(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        fixture_digest,
+        fixture_image_url
+    ):
+        mock_res = mock.MagicMock()
+        mock_res.status_code = 200
+        mock_res.headers = {
+            Repository.Meta.manifest_response_header_digest: fixture_digest
+        }
+        repository = Repository(
+            Client(fixture_registry_url),
+            fixture_repository
+        )
+
+        with mock.patch('requests.Session.head',
+                        return_value=mock_res) as mo:
+            assert repository.tag_digest(fixture_tags[0]) == fixture_digest
+            mo.assert_called_once_with(
+                fixture_registry_url + fixture_image_url,
+                headers=Repository.Meta.manifests_headers
+            )
+
+        mock_res.headers = {}
+        with mock.patch('requests.Session.head', return_value=mock_res):
+            with pytest.raises(DRegCliException) as excinfo:
+                repository.tag_digest(fixture_tags[0])
+            assert str(excinfo.value) == \
+                "No image digest in response header {header}".format(
+                    header=Repository.Meta.manifest_response_header_digest
+                )
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_get_tags_by_date(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags
+    ):
+        def image(tag):
+            img = mock.MagicMock()
+            img.tag = tag
+            # same date for 2 first tags: sort should stay deterministic
+            img.get_date.return_value = datetime.datetime(2019, 1, 1) - \
+                datetime.timedelta(days=max(fixture_tags.index(tag), 1))
+            return img
+
+        repository = Repository(
+            Client(fixture_registry_url),
+            fixture_repository
+        )
+        results = []
+        with mock.patch.object(repository, 'iter_tags',
+                               side_effect=lambda **kw: iter(fixture_tags)):
+            with mock.patch.object(repository, 'image', side_effect=image):
+                for concurrency in (1, 4):
+                    results.append([
+                        (tag_data['tag'], tag_data['date'])
+                        for tag_data in repository.get_tags_by_date(
+                            concurrency=concurrency
+                        )
+                    ])
+        assert results[0] == results[1]
+        assert [r[0] for r in results[0]][2:] == fixture_tags[2:]
+        assert sorted([r[0] for r in results[0]]) == sorted(fixture_tags)
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_group_tags_by_digest(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags
+    ):
+        # tags 0 and 1 same manifest
+        tags = fixture_tags[:3]
+        digests = {
+            tags[0]: 'sha256:a',
+            tags[1]: 'sha256:a',
+            tags[2]: 'sha256:b',
+        }
+
+        def image(digest):
+            img = Image(repository.client, fixture_repository, digest,
+                        digest=digest, data={})
+            img.get_date = mock.MagicMock()
+            img.date = datetime.datetime(2019, 1, 1)
+            return img
+
+        repository = Repository(
+            Client(fixture_registry_url),
+            fixture_repository
+        )
+        with mock.patch.object(repository, 'iter_tags',
+                               side_effect=lambda **kw: iter(tags)):
+            with mock.patch.object(repository, 'tag_digest',
+                                   side_effect=digests.get):
+                with mock.patch.object(repository, 'image',
+                                       side_effect=image) as mo_image:
+                    groups, tags_by_date = repository.group_tags(
+                        concurrency=2,
+                        by_digest=True
+                    )
+
+        # manifest (and config) fetched once per distinct digest
+        assert sorted(call[0][0] for call in mo_image.call_args_list) == \
+            ['sha256:a', 'sha256:b']
+        assert sorted(groups.keys()) == ['sha256:a', 'sha256:b']
+        assert sorted(img.tag for img in groups['sha256:a']) == \
+            sorted(tags[:2])
+        cotags = {data['tag']: data['cotags'] for data in tags_by_date}
+        assert cotags == {tags[0]: [tags[1]], tags[1]: [tags[0]],
+                          tags[2]: []}
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository'
+    )
+    def test_supports_tag_delete(
+        self,
+        fixture_registry_url,
+        fixture_repository
+    ):
+        mock_res = mock.MagicMock()
+        mock_res.status_code = 404  # unknown probe tag: supported
+
+        client = Client(fixture_registry_url)
+        repository = Repository(client, fixture_repository)
+        with mock.patch('requests.Session.delete',
+                        return_value=mock_res) as mo:
+            assert repository.supports_tag_delete()
+            assert repository.supports_tag_delete()  # detected once
+            mo.assert_called_once()
+            probe_url = mo.call_args[0][0]
+            assert probe_url.startswith(
+                '{url}/v2/{repo}/manifests/{prefix}'.format(
+                    url=fixture_registry_url,
+                    repo=fixture_repository,
+                    prefix=Repository.Meta.tag_delete_probe_prefix
+                )
+            )
+
+        for status_code in Repository.Meta.tag_delete_unsupported_codes:
+            client.tag_delete = None
+            mock_res.status_code = status_code
+            with mock.patch('requests.Session.delete',
+                            return_value=mock_res):
+                assert not repository.supports_tag_delete()
+
+        # other errors raised
+        client.tag_delete = None
+        mock_res.status_code = 401
+        with mock.patch('requests.Session.delete', return_value=mock_res):
+            with pytest.raises(DRegCliException):
+                repository.supports_tag_delete()
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_delete_images(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags
+    ):
+        # tags 0 and 1 same manifest, tag 2 deletion fails
+        tags = fixture_tags[:3]
+        digests = ['sha256:a', 'sha256:a', 'sha256:b']
+        images = [mock.MagicMock(tag=tag, digest=digest)
+                  for tag, digest in zip(tags, digests)]
+        images[2].delete.side_effect = DRegCliException(
+            'Status code error 500'
+        )
+        repository = Repository(
+            Client(fixture_registry_url),
+            fixture_repository
+        )
+
+        results = repository.delete_images(images, concurrency=4)
+        # a DELETE per digest, in images order
+        assert list(results.items()) == [
+            ('sha256:a', ''),
+            ('sha256:b', 'Status code error 500'),
+        ]
+        assert [image.delete.call_count for image in images] == [1, 0, 1]
+
+        results = repository.delete_images(images, tag_delete=True)
+        assert list(results.keys()) == tags
+        assert all(image.delete_tag.call_count == 1 for image in images)
+
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    def test_delete_tags(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags
+    ):
+        tags = fixture_tags[:3]
+        repository = Repository(
+            Client(fixture_registry_url),
+            fixture_repository
+        )
+        with mock.patch.object(repository, 'tag_digest',
+                               side_effect=lambda tag: 'sha256:a'):
+            with mock.patch('dregcli.dregcli.Image.delete') as mo_delete:
+                results = repository.delete_tags(tags, concurrency=2)
+        # same manifest: deleted once
+        assert results == {'sha256:a': ''}
+        mo_delete.assert_called_once_with()
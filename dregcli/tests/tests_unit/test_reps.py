@@ -0,0 +1,47 @@
+import os
+import sys
+from unittest import mock
+import pytest
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+)
+import tools
+from fixtures import fixture_registry_url
+from dregcli.console.reps import RepositoriesCommandHandler
+from dregcli.dregcli import DeadlineExceeded
+
+
+class TestRepositories:
+    @pytest.mark.usefixtures('fixture_registry_url')
+    def test_reps_deadline_partial(self, fixture_registry_url, capsys):
+        repositories = ['team-a/app', 'team-b/app']
+        error = 'Deadline exceeded (1m)'
+
+        def paginate(*args, **kwargs):
+            # first page listed, next page request after deadline
+            yield from repositories
+            raise DeadlineExceeded(error)
+
+        handler = RepositoriesCommandHandler()
+        with mock.patch('dregcli.dregcli.Client._paginate',
+                        side_effect=paginate):
+            with mock.patch('dregcli.dregcli.Client.close') as mo_close:
+                res = handler.run(fixture_registry_url, True)
+        mo_close.assert_called_once_with()  # client closed at command end
+        assert tools.get_output_json(capsys) == {
+            'result': repositories,
+            'error': error,
+        }
+        assert res == repositories
+
+        # table output: repositories printed as they arrive
+        with mock.patch('dregcli.dregcli.Client._paginate',
+                        side_effect=paginate):
+            handler.run(fixture_registry_url, False)
+        assert tools.get_output_lines(capsys) == [
+            'reps',
+            repositories[0],
+            repositories[1],
+            "{error}, partial result".format(error=error),
+        ]
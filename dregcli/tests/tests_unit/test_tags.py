@@ -0,0 +1,83 @@
+import datetime
+import os
+import sys
+from unittest import mock
+import pytest
+
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), os.pardir)
+)
+import tools
+from fixtures import fixture_registry_url, fixture_repository, fixture_tags
+from dregcli.console.tags import TagsCommandHandler
+from dregcli.dregcli import DeadlineExceeded
+
+
+class TestTags:
+    @pytest.mark.usefixtures(
+        'fixture_registry_url',
+        'fixture_repository',
+        'fixture_tags'
+    )
+    @pytest.mark.parametrize('concurrency', [1, 2])
+    def test_tags_deadline_partial(
+        self,
+        fixture_registry_url,
+        fixture_repository,
+        fixture_tags,
+        concurrency,
+        capsys
+    ):
+        tags = fixture_tags[:3]
+        dates = {
+            tags[0]: datetime.datetime(2020, 1, 1),
+            tags[1]: datetime.datetime(2020, 1, 2),
+        }
+        error = 'Deadline exceeded (1m)'
+
+        def image(tag):
+            if tag not in dates:
+                raise DeadlineExceeded(error)
+            return mock.MagicMock(tag=tag, **{
+                'get_date.return_value': dates[tag]
+            })
+
+        handler = TagsCommandHandler()
+        with mock.patch(
+            'dregcli.console.tags.Repository.iter_tags',
+            return_value=iter(tags)
+        ):
+            with mock.patch(
+                'dregcli.console.tags.Repository.image',
+                side_effect=image
+            ):
+                tags_by_date = handler.run(
+                    fixture_registry_url, fixture_repository, True,
+                    concurrency=concurrency
+                )
+        # tags dated before deadline, by date desc
+        assert tools.get_output_json(capsys) == {
+            'result': [
+                {'tag': tag, 'date': handler.date2str(dates[tag])}
+                for tag in (tags[1], tags[0])
+            ],
+            'error': error,
+        }
+        assert [tag_data['tag'] for tag_data in tags_by_date] == \
+            [tags[1], tags[0]]
+
+        # table output
+        with mock.patch(
+            'dregcli.console.tags.Repository.iter_tags',
+            return_value=iter(tags)
+        ):
+            with mock.patch(
+                'dregcli.console.tags.Repository.image',
+                side_effect=image
+            ):
+                handler.run(fixture_registry_url, fixture_repository, False,
+                            concurrency=concurrency)
+        out_lines = tools.get_output_lines(capsys)
+        assert [line.split()[0] for line in out_lines[3:5]] == \
+            [tags[1], tags[0]]
+        assert out_lines[-1] == "{error}, partial result".format(error=error)
@@ -50,3 +50,30 @@ class TestTools:
         res = Tools.search(fixture_tags, r"^st.*-[0-9]{4}", exclude=True)
         # all excluded
         assert res == []
+
+    def test_prefix_cursor(self):
+        items = [
+            'release,', 'release,~', 'release-', 'release-1', 'release-2',
+            'release.', 'releasf'
+        ]
+        cursor = Tools.prefix_cursor('release-')
+        assert cursor == 'release,'
+        # all prefix items after cursor
+        assert all(
+            item > cursor for item in items if item.startswith('release-')
+        )
+        assert Tools.prefix_cursor('a\x00') == 'a'
+
+    def test_parse_duration(self):
+        assert Tools.parse_duration('90') == 90.
+        assert Tools.parse_duration('15m') == 900.
+        assert Tools.parse_duration('1h30m') == 5400.
+        assert Tools.parse_duration('0.5s') == 0.5
+        for duration in ('', 'm', '15x', '15m foo'):
+            with pytest.raises(ValueError):
+                Tools.parse_duration(duration)
+
+    def test_format_duration(self):
+        assert Tools.format_duration(900) == '15m'
+        assert Tools.format_duration(90) == '1m30s'
+        assert Tools.format_duration(0) == '0s'
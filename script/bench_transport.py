@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+benchmark HTTP/1.1 pooled transport against HTTP/2 multiplexed transport:
+fetch manifests and config blobs of all tags of a repository
+(Repository.get_tags_by_date) with concurrent workers, no cache
+
+usage:
+    python script/bench_transport.py https://registry.example.com project \
+        --concurrency=64 --rounds=3 [-u login:password]
+
+HTTP/2 requires httpx[http2] and a registry front-end speaking HTTP/2
+(TLS with ALPN h2)
+"""
+import argparse
+import statistics
+import time
+
+from tabulate import tabulate
+
+from dregcli.dregcli import Client, Repository
+
+
+def bench(url, repo, http2, concurrency, user=''):
+    """
+    :return (seconds, requests count)
+    """
+    with Client(url, pool_maxsize=concurrency, http2=http2) as client:
+        if user:
+            login, password = user.split(':')
+            client.set_auth(login, password)
+        start = time.monotonic()
+        Repository(client, repo).get_tags_by_date(concurrency=concurrency)
+        return time.monotonic() - start, client.stats.get('requests')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark HTTP/1.1 and HTTP/2 transports'
+    )
+    parser.add_argument('url', help='registry url')
+    parser.add_argument('repo', help='repository')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('-u', '--user', default='',
+                        help='user credentials login:password')
+    args = parser.parse_args()
+
+    rows = []
+    for name, http2 in (('HTTP/1.1 pool', False), ('HTTP/2', True)):
+        durations = []
+        for i in range(args.rounds):
+            duration, requests_count = bench(args.url, args.repo, http2,
+                                             args.concurrency, args.user)
+            durations.append(duration)
+        median = statistics.median(durations)
+        rows.append([
+            name,
+            requests_count,
+            '{:.2f}'.format(median),
+            '{:.2f}'.format(min(durations)),
+            '{:.0f}'.format(requests_count / median),
+        ])
+
+    print(tabulate(
+        rows,
+        headers=['Transport', 'Requests', 'Median (s)', 'Best (s)', 'Req/s']
+    ))
+
+
+if __name__ == '__main__':
+    main()
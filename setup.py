@@ -43,6 +43,10 @@ setup(
     zip_safe=False,
     namespace_packages=['dregcli'],
     install_requires=requires,
+    extras_require={
+        'aio': ['aiohttp'],
+        'http2': ['httpx[http2]'],
+    },
     tests_require=requires + tests_requires,
     entry_points="""
     [console_scripts]